@@ -0,0 +1,108 @@
+"""Message Batches for bulk agent runs.
+
+A batch trades latency for price: requests are answered within 24
+hours at half the standard cost, and do not count against the
+per-minute rate limits that ``scheduler`` manages. ``submit`` sends a
+set of ``structured.JsonRequest`` calls as one batch; once it has
+ended, ``resolve`` turns each result into the agent's JSON.
+
+A batch result cannot be continued the way a direct call is, so any
+result that is not a complete, usable answer (errored, expired or
+canceled, cut off at max_tokens, or unparseable) falls back to a direct
+call. A usable answer that the route would escalate is escalated
+directly, since only the first model's call is worth batching. Every
+succeeded result is booked at batch prices, used or not.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import AsyncIterator, Mapping
+from typing import Any
+
+from app.agents import llm
+from app.agents.structured import JsonRequest, StructuredOutputError, message_text, parse_response
+from app.services import metrics, usage
+
+logger = logging.getLogger(__name__)
+
+
+def to_params(request: JsonRequest) -> dict:
+    """The Messages API parameters for ``request``'s first-choice call."""
+    route = request.route
+    params = {
+        "model": route.model,
+        "max_tokens": route.max_tokens,
+        "system": request.system,
+        "messages": [{"role": "user", "content": request.user_content}],
+    }
+    if route.temperature is not None:
+        params["temperature"] = route.temperature
+    return params
+
+
+async def submit(requests: Mapping[str, JsonRequest]) -> str:
+    """Send ``requests``, keyed by custom id, as one batch and return
+    its id."""
+    batch = await llm.get_client().messages.batches.create(
+        requests=[{"custom_id": custom_id, "params": to_params(r)} for custom_id, r in requests.items()]
+    )
+    logger.info("Submitted message batch %s with %d requests", batch.id, len(requests))
+    return batch.id
+
+
+async def retrieve(batch_id: str):
+    """The batch's current state (``processing_status`` is "ended" once
+    every result is available)."""
+    return await llm.get_client().messages.batches.retrieve(batch_id)
+
+
+async def results(batch_id: str) -> AsyncIterator[tuple[str, Any]]:
+    """Yield ``(custom_id, result)`` for every request in an ended batch."""
+    async for entry in await llm.get_client().messages.batches.results(batch_id):
+        yield entry.custom_id, entry.result
+
+
+def _fallback_reason(result) -> str | None:
+    if result is None:
+        return "missing"
+    if result.type != "succeeded":
+        return result.type
+    if getattr(result.message, "stop_reason", None) == "max_tokens":
+        return "max_tokens"
+    return None
+
+
+def record_usage(agent: str, result) -> None:
+    """Book a succeeded result's tokens at batch prices. Results are
+    billed whether or not their answer is used."""
+    if getattr(result, "type", None) != "succeeded":
+        return
+    message = result.message
+    try:
+        usage.record(agent, message.model, getattr(message, "usage", None), 0.0, batch=True)
+    except Exception:
+        logger.exception("Could not record %s batch usage", agent)
+
+
+async def resolve(request: JsonRequest, result, stale: bool = False) -> tuple[Any, bool]:
+    """Return the JSON for ``request`` from its batch ``result`` (None
+    if the batch returned nothing for it), and whether it had to fall
+    back to a direct call. A ``stale`` result, generated for a different
+    request than the one now planned, is only paid for."""
+    agent = request.agent
+    record_usage(agent, result)
+    reason = "stale" if stale else _fallback_reason(result)
+    metrics.llm_batch_results.inc(agent=agent, result=reason or "succeeded")
+    if reason is None:
+        try:
+            data = parse_response(agent, message_text(result.message))
+        except StructuredOutputError:
+            reason = "unparseable"
+        else:
+            escalation = request.escalation_reason(data)
+            return (data if escalation is None else await request.escalate(escalation)), False
+
+    metrics.llm_batch_fallbacks.inc(agent=agent, reason=reason)
+    logger.warning("%s batch result %s; calling directly", agent, reason)
+    return await request.run(), True
@@ -7,11 +7,9 @@ and suggests probe questions.
 
 from __future__ import annotations
 
-import json
+import logging
 
-import anthropic
-
-from app.config import settings
+from app.agents import routing, structured
 from app.models.guide import (
     AiFlag,
     AiFlagType,
@@ -20,6 +18,11 @@ from app.models.guide import (
     Question,
     ResearchGuide,
 )
+from app.services.prompt_budget import plan_call
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 4096
 
 SYSTEM_PROMPT = """\
 You are an expert UX research methodologist. You are reviewing an interview \
@@ -78,6 +81,34 @@ Schema:
 """
 
 
+def _assess(data) -> float:
+    """Fail if the review lacks fields the result is built from."""
+    if not isinstance(data, dict) or not isinstance(data.get("sections"), list):
+        raise ValueError("incomplete guide review: sections missing")
+    for s in data["sections"]:
+        _require(s, "section", ("section_id", "section_name"))
+        questions = s.get("questions", [])
+        if not isinstance(questions, list):
+            raise ValueError("incomplete guide review: questions is not a list")
+        for q in questions:
+            _require(q, "question", ("question_id", "question_text"))
+    flags = data.get("flags", [])
+    if not isinstance(flags, list):
+        raise ValueError("incomplete guide review: flags is not a list")
+    for f in flags:
+        _require(f, "flag", ("flag_type", "message"))
+        AiFlagType(f["flag_type"])
+    return 1.0
+
+
+def _require(item, kind: str, keys: tuple[str, ...]) -> None:
+    if not isinstance(item, dict):
+        raise ValueError(f"incomplete guide review: {kind} is not an object")
+    for key in keys:
+        if key not in item:
+            raise ValueError(f"incomplete guide review: {kind} lacks {key}")
+
+
 async def review_guide(
     guide_text: str,
     project_name: str,
@@ -86,8 +117,6 @@ async def review_guide(
 ) -> GuideReviewResult:
     """Send the guide text to Claude for parsing and review."""
 
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
-
     user_content = f"Project: {project_name}\n"
     if objective:
         user_content += f"Objective: {objective}\n"
@@ -97,25 +126,24 @@ async def review_guide(
             user_content += f"  {i}. {goal}\n"
     user_content += f"\n---\n\nInterview Guide:\n\n{guide_text}"
 
-    message = await client.messages.create(
-        model=settings.claude_model,
-        max_tokens=4096,
+    # A guide has to be reviewed as a whole, so it is never chunked
+    route = routing.route_for("guide_reviewer", MAX_TOKENS)
+    plan = plan_call(SYSTEM_PROMPT, user_content, max_output_tokens=route.max_tokens)
+    if plan.chunked:
+        logger.warning(
+            "Guide for %s is ~%d tokens and may not fit in one call",
+            project_name,
+            plan.estimated_input_tokens,
+        )
+
+    data = await structured.create_json(
+        agent="guide_reviewer",
         system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_content}],
+        user_content=user_content,
+        max_tokens=MAX_TOKENS,
+        assess=_assess,
     )
 
-    response_text = message.content[0].text
-
-    # Strip markdown code fences if present
-    if response_text.startswith("```"):
-        lines = response_text.split("\n")
-        lines = lines[1:]  # remove opening fence
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        response_text = "\n".join(lines)
-
-    data = json.loads(response_text)
-
     # Build structured result
     sections = []
     for s in data.get("sections", []):
@@ -0,0 +1,536 @@
+"""Insight Synthesiser Agent.
+
+Combines accepted themes across all sessions into candidate insights
+in map-reduce form so prompt size stays bounded as a study grows:
+
+  map     Sessions are split into batches. Each batch's themes are
+          pre-grouped locally (TF-IDF clustering) and Claude names and
+          summarises the groups. Batches run concurrently.
+  reduce  Draft insights from several batches are merged by Claude,
+          level by level and concurrently, until a single set remains.
+
+Claude only ever refers to evidence and drafts by local ids — quotes,
+session ids and participant ids are carried locally, so the citation
+trail can never be paraphrased or lost.
+
+Results are stored as a ``SynthesisSnapshot`` that records which version
+of each session's accepted themes it consumed. Later runs only fold in
+the delta: new theme groups that match an existing insight are merged
+locally, and only unmatched groups are sent to Claude.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+
+from app.agents import structured
+from app.models.insight import (
+    CandidateThemeGroup,
+    EvidenceQuote,
+    HighlightQuote,
+    Insight,
+    InsightStatus,
+    InsightSynthesisResult,
+    SynthesisSnapshot,
+)
+from app.models.theme import SessionThemes, ThemeStatus
+from app.services.search import tokenise
+from app.services.theme_clustering import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+    NAME_WEIGHT,
+    group_themes,
+    tfidf_matrix,
+    theme_tokens,
+)
+
+# Sessions summarised per map call
+SESSIONS_PER_BATCH = 4
+
+# Partial results merged per reduce call
+REDUCE_FAN_IN = 4
+
+# Concurrent Claude calls per synthesis run
+MAX_CONCURRENT_CALLS = 8
+
+# Incremental updates fall back to a full rebuild when more than this
+# fraction of the project's sessions are new, changed or removed
+REBUILD_DELTA_FRACTION = 0.5
+
+MAP_SYSTEM_PROMPT = """\
+You are an expert qualitative research analyst synthesising interview \
+themes into candidate insights.
+
+You are given groups of related themes from several participants. Themes \
+were grouped automatically by wording, so a group may occasionally mix \
+two ideas — describe the dominant pattern.
+
+For each group:
+1. Write a short list of theme names that the insight covers.
+2. Write an insight summary — one paragraph capturing the finding and \
+why it matters for product design (customer pains, goals, behaviours).
+3. Pick the single evidence id whose quote best represents the insight.
+
+Refer to evidence only by its id (e.g. "E3"). Never rewrite quotes.
+
+Return your response as valid JSON matching the schema below. Do not \
+include any text outside the JSON.
+
+Schema:
+{
+  "insights": [
+    {
+      "group_id": "G01",
+      "theme_group": ["string"],
+      "insight_summary": "string",
+      "highlight_evidence_id": "E1"
+    }
+  ]
+}
+"""
+
+REDUCE_SYSTEM_PROMPT = """\
+You are an expert qualitative research analyst merging draft insights \
+produced from different batches of interviews in the same study.
+
+Your job:
+1. Merge drafts that describe the same underlying pattern. Drafts that \
+are distinct stay on their own.
+2. For each resulting insight, rewrite the summary as one paragraph \
+covering all merged drafts.
+3. Pick the draft whose highlight quote best represents the merged insight.
+
+Every draft id must appear in exactly one insight's "merge" list.
+
+Return your response as valid JSON matching the schema below. Do not \
+include any text outside the JSON.
+
+Schema:
+{
+  "insights": [
+    {
+      "merge": ["D1", "D4"],
+      "theme_group": ["string"],
+      "insight_summary": "string",
+      "highlight_draft_id": "D4"
+    }
+  ]
+}
+"""
+
+
+@dataclass
+class _Draft:
+    """An insight under construction. Evidence never leaves this process."""
+
+    theme_group: list[str]
+    summary: str
+    evidence: list[EvidenceQuote]
+    highlight: EvidenceQuote
+    instances_by_session: dict[str, int]
+    insight_id: str | None = None
+    status: InsightStatus = InsightStatus.PROPOSED
+
+    @property
+    def instances(self) -> int:
+        return sum(self.instances_by_session.values())
+
+    @property
+    def participants(self) -> set[str]:
+        return {e.participant_id for e in self.evidence}
+
+
+async def _call(
+    limiter: asyncio.Semaphore,
+    system: str,
+    user_content: str,
+) -> dict:
+    async with limiter:
+        return await structured.create_json(
+            agent="insight_synthesiser",
+            system=system,
+            user_content=user_content,
+            max_tokens=4096,
+            temperature=0.3,
+        )
+
+
+def themes_version(session_themes: SessionThemes) -> str:
+    """Content hash of a session's accepted themes.
+
+    Status changes to non-accepted themes and researcher notes do not
+    change the version, so they never trigger re-synthesis.
+    """
+    accepted = [
+        t.model_dump(mode="json", exclude={"status", "researcher_notes"})
+        for t in session_themes.themes
+        if t.status == ThemeStatus.ACCEPTED
+    ]
+    payload = json.dumps([session_themes.participant_id, accepted], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# ── Map ──────────────────────────────────────────────────────
+
+def _group_evidence(group: CandidateThemeGroup) -> list[EvidenceQuote]:
+    return [
+        EvidenceQuote(
+            quote=e.quote,
+            participant_id=e.participant_id or m.participant_id,
+            timestamp=e.timestamp,
+            session_id=m.session_id,
+            guide_section=e.guide_section,
+        )
+        for m in group.members
+        for e in m.theme.evidence
+    ]
+
+
+def _group_instances(group: CandidateThemeGroup) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for m in group.members:
+        n = m.theme.instance_count or len(m.theme.evidence)
+        counts[m.session_id] = counts.get(m.session_id, 0) + n
+    return counts
+
+
+def _format_groups(groups: list[CandidateThemeGroup]) -> tuple[str, dict[str, EvidenceQuote]]:
+    """Format groups for the map prompt, assigning local evidence ids."""
+    evidence_ids: dict[str, EvidenceQuote] = {}
+    parts = []
+    for group in groups:
+        parts.append(
+            f"## {group.group_id} — {group.participant_count} participant(s), "
+            f"{group.total_instances} instance(s)"
+        )
+        for m in group.members:
+            parts.append(f"- {m.participant_id}: {m.theme.theme_name} — {m.theme.theme_description}")
+            for e in m.theme.evidence:
+                eid = f"E{len(evidence_ids) + 1}"
+                evidence_ids[eid] = EvidenceQuote(
+                    quote=e.quote,
+                    participant_id=e.participant_id or m.participant_id,
+                    timestamp=e.timestamp,
+                    session_id=m.session_id,
+                    guide_section=e.guide_section,
+                )
+                parts.append(f"    {eid}: \"{e.quote}\"")
+        parts.append("")
+    return "\n".join(parts), evidence_ids
+
+
+def _fallback_draft(group: CandidateThemeGroup) -> _Draft:
+    evidence = _group_evidence(group)
+    lead = group.members[0].theme
+    return _Draft(
+        theme_group=sorted({m.theme.theme_name for m in group.members}),
+        summary=lead.theme_description,
+        evidence=evidence,
+        highlight=evidence[0],
+        instances_by_session=_group_instances(group),
+    )
+
+
+def _grounded_groups(session_themes: list[SessionThemes]) -> list[CandidateThemeGroup]:
+    # Every insight must be grounded in at least one quote
+    return [
+        g for g in group_themes(session_themes)
+        if any(m.theme.evidence for m in g.members)
+    ]
+
+
+async def _summarise_groups(
+    limiter: asyncio.Semaphore,
+    groups: list[CandidateThemeGroup],
+) -> list[_Draft]:
+    if not groups:
+        return []
+
+    prompt, evidence_ids = _format_groups(groups)
+    data = await _call(
+        limiter,
+        MAP_SYSTEM_PROMPT,
+        f"Name and summarise these theme groups.\n\n{prompt}",
+    )
+    by_group = {i.get("group_id"): i for i in data.get("insights", [])}
+
+    drafts = []
+    for group in groups:
+        item = by_group.get(group.group_id)
+        draft = _fallback_draft(group)
+        if item:
+            draft.theme_group = item.get("theme_group") or draft.theme_group
+            draft.summary = item.get("insight_summary") or draft.summary
+            highlight = evidence_ids.get(item.get("highlight_evidence_id", ""))
+            if highlight is not None and highlight in draft.evidence:
+                draft.highlight = highlight
+        drafts.append(draft)
+    return drafts
+
+
+async def _map_batch(
+    limiter: asyncio.Semaphore,
+    batch: list[SessionThemes],
+) -> list[_Draft]:
+    return await _summarise_groups(limiter, _grounded_groups(batch))
+
+
+# ── Reduce ───────────────────────────────────────────────────
+
+def _format_drafts(drafts: list[_Draft]) -> str:
+    parts = []
+    for i, d in enumerate(drafts, 1):
+        parts.append(
+            f"## D{i} — {', '.join(d.theme_group)} "
+            f"({len(d.participants)} participant(s), {d.instances} instance(s))\n"
+            f"{d.summary}\n"
+            f"Highlight: \"{d.highlight.quote}\" — {d.highlight.participant_id}\n"
+        )
+    return "\n".join(parts)
+
+
+def _merge_drafts(merged: list[_Draft], theme_group: list[str], summary: str, highlight: _Draft) -> _Draft:
+    instances: dict[str, int] = {}
+    for d in merged:
+        for sid, n in d.instances_by_session.items():
+            instances[sid] = instances.get(sid, 0) + n
+    return _Draft(
+        theme_group=theme_group or sorted({n for d in merged for n in d.theme_group}),
+        summary=summary or merged[0].summary,
+        evidence=[e for d in merged for e in d.evidence],
+        highlight=highlight.highlight,
+        instances_by_session=instances,
+    )
+
+
+async def _reduce_partials(
+    limiter: asyncio.Semaphore,
+    partials: list[list[_Draft]],
+) -> list[_Draft]:
+    drafts = [d for p in partials for d in p]
+    if len(partials) < 2 or len(drafts) < 2:
+        return drafts
+
+    data = await _call(
+        limiter,
+        REDUCE_SYSTEM_PROMPT,
+        f"Merge these draft insights.\n\n{_format_drafts(drafts)}",
+    )
+    by_id = {f"D{i}": d for i, d in enumerate(drafts, 1)}
+    used: set[str] = set()
+
+    result = []
+    for item in data.get("insights", []):
+        ids = [i for i in item.get("merge", []) if i in by_id and i not in used]
+        if not ids:
+            continue
+        used.update(ids)
+        merged = [by_id[i] for i in ids]
+        highlight_id = item.get("highlight_draft_id")
+        highlight = by_id[highlight_id] if highlight_id in ids else merged[0]
+        result.append(
+            _merge_drafts(merged, item.get("theme_group", []), item.get("insight_summary", ""), highlight)
+        )
+
+    # Drafts Claude did not mention are carried forward unchanged
+    result.extend(d for i, d in by_id.items() if i not in used)
+    return result
+
+
+async def _full_synthesis(
+    limiter: asyncio.Semaphore,
+    session_themes: list[SessionThemes],
+) -> list[_Draft]:
+    ordered = sorted(session_themes, key=lambda st: st.participant_id)
+    batches = [
+        ordered[i : i + SESSIONS_PER_BATCH]
+        for i in range(0, len(ordered), SESSIONS_PER_BATCH)
+    ]
+    partials = await asyncio.gather(*(_map_batch(limiter, b) for b in batches))
+    partials = [p for p in partials if p]
+
+    while len(partials) > 1:
+        chunks = [
+            partials[i : i + REDUCE_FAN_IN]
+            for i in range(0, len(partials), REDUCE_FAN_IN)
+        ]
+        partials = list(
+            await asyncio.gather(*(_reduce_partials(limiter, c) for c in chunks))
+        )
+
+    return partials[0] if partials else []
+
+
+# ── Incremental update ───────────────────────────────────────
+
+def _draft_from_insight(insight: Insight, instances: dict[str, int]) -> _Draft:
+    hq = insight.highlight_quote
+    return _Draft(
+        theme_group=list(insight.theme_group),
+        summary=insight.insight_summary,
+        evidence=list(insight.supporting_evidence),
+        highlight=EvidenceQuote(
+            quote=hq.text,
+            participant_id=hq.participant_id,
+            timestamp=hq.timestamp,
+            session_id=hq.session_id,
+            guide_section=hq.guide_section,
+        ),
+        instances_by_session=dict(instances),
+        insight_id=insight.insight_id,
+        status=insight.status,
+    )
+
+
+def _strip_sessions(drafts: list[_Draft], session_ids: set[str]) -> list[_Draft]:
+    """Remove evidence from the given sessions; drop insights left empty."""
+    kept = []
+    for d in drafts:
+        d.evidence = [e for e in d.evidence if e.session_id not in session_ids]
+        if not d.evidence:
+            continue
+        for sid in session_ids:
+            d.instances_by_session.pop(sid, None)
+        if d.highlight not in d.evidence:
+            d.highlight = d.evidence[0]
+        kept.append(d)
+    return kept
+
+
+def _draft_tokens(draft: _Draft) -> list[str]:
+    tokens = [t for name in draft.theme_group for t in tokenise(name)] * NAME_WEIGHT
+    tokens += tokenise(draft.summary)
+    for e in draft.evidence:
+        tokens += tokenise(e.quote)
+    return tokens
+
+
+def _match_groups(
+    drafts: list[_Draft], groups: list[CandidateThemeGroup]
+) -> dict[int, int]:
+    """Map delta group index -> existing draft index by cosine similarity."""
+    if not drafts or not groups:
+        return {}
+    docs = [_draft_tokens(d) for d in drafts] + [
+        [t for m in g.members for t in theme_tokens(m.theme)] for g in groups
+    ]
+    matrix, _ = tfidf_matrix(docs)
+    similarity = (matrix[len(drafts):] @ matrix[: len(drafts)].T).toarray()
+    matches = {}
+    for gi, row in enumerate(similarity):
+        best = int(row.argmax())
+        if row[best] >= DEFAULT_SIMILARITY_THRESHOLD:
+            matches[gi] = best
+    return matches
+
+
+async def _incremental_synthesis(
+    limiter: asyncio.Semaphore,
+    previous: SynthesisSnapshot,
+    delta: list[SessionThemes],
+    stale: set[str],
+) -> list[_Draft]:
+    drafts = [
+        _draft_from_insight(i, previous.instance_counts.get(i.insight_id, {}))
+        for i in previous.result.insights
+    ]
+    drafts = _strip_sessions(drafts, stale)
+
+    groups = _grounded_groups(delta)
+    matches = _match_groups(drafts, groups)
+    for gi, di in matches.items():
+        group, draft = groups[gi], drafts[di]
+        draft.evidence.extend(_group_evidence(group))
+        for sid, n in _group_instances(group).items():
+            draft.instances_by_session[sid] = draft.instances_by_session.get(sid, 0) + n
+        for m in group.members:
+            if m.theme.theme_name not in draft.theme_group:
+                draft.theme_group.append(m.theme.theme_name)
+
+    unmatched = [g for gi, g in enumerate(groups) if gi not in matches]
+    return drafts + await _summarise_groups(limiter, unmatched)
+
+
+# ── Entry point ──────────────────────────────────────────────
+
+def _to_insight(insight_id: str, draft: _Draft) -> Insight:
+    participants = sorted(draft.participants)
+    return Insight(
+        insight_id=insight_id,
+        theme_group=draft.theme_group,
+        insight_summary=draft.summary,
+        highlight_quote=HighlightQuote(
+            text=draft.highlight.quote,
+            participant_id=draft.highlight.participant_id,
+            timestamp=draft.highlight.timestamp,
+            session_id=draft.highlight.session_id,
+            guide_section=draft.highlight.guide_section,
+        ),
+        supporting_evidence=draft.evidence,
+        participant_count=len(participants),
+        total_instances=draft.instances,
+        participants=participants,
+        status=draft.status,
+    )
+
+
+async def synthesise_insights(
+    project_id: str,
+    project_name: str,
+    session_themes: list[SessionThemes],
+    previous: SynthesisSnapshot | None = None,
+) -> SynthesisSnapshot:
+    """Synthesise accepted themes from every session into insights.
+
+    With a ``previous`` snapshot only new, changed or removed sessions
+    are processed; otherwise (or when most of the project changed) a full
+    map-reduce runs, whose wall-clock time grows with the depth of the
+    reduce tree — logarithmically in session count.
+    """
+    versions = {st.session_id: themes_version(st) for st in session_themes}
+
+    if previous is not None:
+        old = previous.consumed_versions
+        changed = {sid for sid, v in versions.items() if old.get(sid) != v}
+        stale = {sid for sid in old if versions.get(sid) != old[sid]}
+        if not changed and not stale:
+            return previous
+        if len(changed | stale) > REBUILD_DELTA_FRACTION * max(len(versions), 1):
+            previous = None
+
+    limiter = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+
+    if previous is None:
+        drafts = await _full_synthesis(limiter, session_themes)
+        next_id = 1
+    else:
+        delta = [st for st in session_themes if st.session_id in changed]
+        drafts = await _incremental_synthesis(limiter, previous, delta, stale)
+        next_id = 1 + max(
+            (int(i.insight_id.rsplit("-", 1)[-1]) for i in previous.result.insights),
+            default=0,
+        )
+
+    drafts.sort(key=lambda d: (-len(d.participants), -d.instances))
+    insights = []
+    instance_counts = {}
+    for d in drafts:
+        if d.insight_id is None:
+            d.insight_id = f"INS-{next_id:03d}"
+            next_id += 1
+        insights.append(_to_insight(d.insight_id, d))
+        instance_counts[d.insight_id] = d.instances_by_session
+
+    return SynthesisSnapshot(
+        project_id=project_id,
+        result=InsightSynthesisResult(
+            project_name=project_name,
+            total_sessions=len(session_themes),
+            total_participants=len({st.participant_id for st in session_themes}),
+            insights=insights,
+        ),
+        consumed_versions=versions,
+        instance_counts=instance_counts,
+    )
@@ -0,0 +1,164 @@
+"""Shared Claude client and call wrapper for all agents.
+
+Every agent call goes through ``create_message`` so cross-cutting
+concerns live in one place: it waits for rate-limit admission from the
+scheduler, retries rate-limit, overload and connection errors with
+backoff, logs the locally estimated input tokens against the count
+Claude reports, records latency, token and in-flight metrics per agent,
+and books each call's tokens and cost against the current project and
+session.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from app.agents import scheduler
+from app.config import settings
+from app.services import metrics, usage
+from app.services.prompt_budget import estimate_tokens
+
+if TYPE_CHECKING:
+    import anthropic
+
+logger = logging.getLogger(__name__)
+
+_client: anthropic.AsyncAnthropic | None = None
+
+
+def get_client() -> anthropic.AsyncAnthropic:
+    global _client
+    if _client is None:
+        # The SDK takes over a second to import, so it is loaded on first use
+        import anthropic
+
+        # Retries are ours, so they queue behind the rate limiter
+        _client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key, max_retries=0)
+    return _client
+
+
+async def _send(client, **params):
+    """Create a message, returning it with the response headers when the
+    client exposes them (test doubles only have ``messages.create``)."""
+    raw = getattr(client.messages, "with_raw_response", None)
+    if raw is None:
+        return await client.messages.create(**params), None
+    response = await raw.create(**params)
+    return await response.parse(), response.headers
+
+
+def _retry_reason(error: Exception) -> str | None:
+    """Why ``error`` is worth retrying, or None if it is not."""
+    import anthropic
+
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code == 429 or error.status_code >= 500:
+            return str(error.status_code)
+        return None
+    if isinstance(error, anthropic.APIConnectionError):
+        return "connection"
+    return None
+
+
+async def _back_off(limiter: scheduler.Scheduler, agent: str, reserved: int, error: Exception, attempt: int) -> None:
+    """Wait before retrying a failed call, or re-raise its error."""
+    # A rejected call consumes no tokens
+    limiter.settle(reserved, 0, 0)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    limiter.observe_headers(headers)
+    reason = _retry_reason(error)
+    if reason is None or attempt >= settings.llm_max_retries:
+        metrics.llm_errors.inc(agent=agent, error=type(error).__name__)
+        raise error
+
+    after = scheduler.retry_after(headers)
+    delay = scheduler.retry_delay(attempt, after)
+    metrics.llm_retries.inc(agent=agent, reason=reason)
+    logger.warning("%s call failed (%s); retry %d in %.1fs", agent, reason, attempt + 1, delay)
+    if reason == "429" or after is not None:
+        # The limit is shared, so every queued call waits it out
+        limiter.pause(delay)
+    else:
+        await asyncio.sleep(delay)
+
+
+async def create_message(
+    *,
+    agent: str,
+    system: str,
+    user_content: str,
+    max_tokens: int,
+    temperature: float | None = None,
+    assistant_prefix: str | None = None,
+    model: str | None = None,
+):
+    """Send one single-turn request to Claude and return the message.
+
+    ``assistant_prefix`` starts Claude's reply, which it continues from
+    there (used to resume a response cut off at ``max_tokens``).
+    ``model`` defaults to ``settings.claude_model``.
+    """
+    model = model or settings.claude_model
+    # The prefix is sent back as input, and continuations carry the most
+    estimated = estimate_tokens(system) + estimate_tokens(user_content) + estimate_tokens(assistant_prefix or "")
+    kwargs = {}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    messages = [{"role": "user", "content": user_content}]
+    if assistant_prefix:
+        messages.append({"role": "assistant", "content": assistant_prefix})
+
+    limiter = scheduler.get_scheduler()
+    attempt = 0
+    while True:
+        await limiter.acquire(estimated)
+        metrics.llm_in_flight.inc(agent=agent)
+        start = time.perf_counter()
+        try:
+            with metrics.span(f"llm.{agent}"):
+                message, headers = await _send(
+                    get_client(),
+                    model=model,
+                    max_tokens=max_tokens,
+                    system=system,
+                    messages=messages,
+                    **kwargs,
+                )
+        except Exception as e:
+            error = e
+        else:
+            break
+        finally:
+            metrics.llm_in_flight.dec(agent=agent)
+        await _back_off(limiter, agent, estimated, error, attempt)
+        attempt += 1
+    latency = time.perf_counter() - start
+    metrics.llm_request_seconds.observe(latency, agent=agent, model=model)
+    limiter.observe_headers(headers)
+
+    message_usage = getattr(message, "usage", None)
+    actual = getattr(message_usage, "input_tokens", None)
+    limiter.settle(
+        estimated,
+        estimated if actual is None else actual + (getattr(message_usage, "cache_creation_input_tokens", 0) or 0),
+        getattr(message_usage, "output_tokens", 0) or 0,
+    )
+    if actual is not None:
+        metrics.llm_input_tokens.observe(actual, agent=agent)
+        metrics.llm_output_tokens.observe(getattr(message_usage, "output_tokens", 0) or 0, agent=agent)
+    try:
+        usage.record(agent, model, message_usage, latency * 1000)
+    except Exception:
+        # Accounting must never cost us a generation we already paid for
+        logger.exception("Could not record %s usage", agent)
+    logger.info(
+        "%s call: estimated %d input tokens, actual %s, output %s",
+        agent,
+        estimated,
+        actual,
+        getattr(message_usage, "output_tokens", None),
+    )
+    return message
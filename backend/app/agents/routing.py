@@ -0,0 +1,38 @@
+"""Per-agent model routing.
+
+Each agent passes its own defaults (max_tokens, temperature) to
+``route_for``, which applies any override in ``settings.agent_routes``.
+The model falls back to ``settings.claude_model``. A route with
+``escalate_to`` lets ``structured.create_json`` retry on a stronger
+model when the first model's output fails validation or reports low
+confidence.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    max_tokens: int
+    temperature: float | None = None
+    escalate_to: str | None = None
+    min_confidence: float = 0.0
+
+
+def route_for(agent: str, max_tokens: int, temperature: float | None = None) -> Route:
+    """The model and limits to call ``agent`` with."""
+    override = settings.agent_routes.get(agent)
+    if override is None:
+        return Route(settings.claude_model, max_tokens, temperature)
+    return Route(
+        model=override.model or settings.claude_model,
+        max_tokens=override.max_tokens or max_tokens,
+        temperature=override.temperature if override.temperature is not None else temperature,
+        escalate_to=override.escalate_to,
+        min_confidence=override.min_confidence,
+    )
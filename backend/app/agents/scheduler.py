@@ -0,0 +1,269 @@
+"""Admission control and retry policy for Claude calls.
+
+Claude's rate limits are token buckets per organisation: requests,
+input tokens and output tokens per minute, each refilled continuously.
+``Scheduler`` keeps a local copy of those buckets and admits a call only
+when all three can pay for it, so concurrent sessions queue here
+instead of bursting into 429s.
+
+- Limits come from settings, and are corrected at runtime from the
+  ``anthropic-ratelimit-*`` headers on every response.
+- A ``retry-after`` on an error pauses admission for everyone, since the
+  limit it reports is shared.
+- Waiting calls are admitted by priority class, then arrival order:
+  interactive single-session calls go ahead of bulk project runs. The
+  class travels in a context variable, set with ``priority()``.
+
+The retry loop itself lives in ``llm.create_message``; ``retry_delay``
+gives it jittered exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+
+from app.config import settings
+from app.services import metrics
+
+
+class Priority(IntEnum):
+    # Lower values are admitted first
+    INTERACTIVE = 0
+    BULK = 1
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Run Claude calls made inside the block at ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+# ── Buckets ──────────────────────────────────────────────────
+
+
+class TokenBucket:
+    """Holds up to ``per_minute`` units and refills at that rate.
+
+    A limit of 0 means unlimited. The level may go negative when a call
+    turns out to cost more than was reserved; later calls then wait for
+    the debt to be repaid.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def limited(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float) -> None:
+        if self.limited:
+            self.level = min(self.capacity, self.level + max(0.0, now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available."""
+        if not self.limited:
+            return 0.0
+        self._refill(now)
+        # A call larger than the whole bucket waits for a full bucket
+        shortfall = min(amount, self.capacity) - self.level
+        return max(0.0, shortfall * 60 / self.capacity)
+
+    def take(self, amount: float, now: float) -> None:
+        if self.limited:
+            self._refill(now)
+            self.level -= amount
+
+    def resize(self, per_minute: float, now: float) -> None:
+        self._refill(now)
+        if per_minute != self.capacity:
+            self.level = min(self.level, per_minute) if self.limited else float(per_minute)
+            self.capacity = float(per_minute)
+
+    def observe_remaining(self, remaining: float, now: float) -> None:
+        """Trust the server when it has less left than we think."""
+        if self.limited:
+            self._refill(now)
+            self.level = min(self.level, remaining)
+
+
+# ── Headers ──────────────────────────────────────────────────
+
+RATE_LIMIT_HEADERS = {
+    "requests": "anthropic-ratelimit-requests",
+    "input_tokens": "anthropic-ratelimit-input-tokens",
+    "output_tokens": "anthropic-ratelimit-output-tokens",
+}
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Seconds to wait from ``retry-after-ms`` or ``retry-after``
+    (seconds or an HTTP date)."""
+    if not headers:
+        return None
+    ms = _number(headers.get("retry-after-ms"))
+    if ms is not None:
+        return max(0.0, ms / 1000)
+    value = headers.get("retry-after")
+    seconds = _number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    if value:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def retry_delay(attempt: int, after: float | None = None) -> float:
+    """Backoff before retry ``attempt`` (0-based): full jitter over an
+    exponentially growing cap, or the server's ``retry-after`` plus a
+    little jitter so queued calls do not all return at once."""
+    base = settings.llm_backoff_base_seconds
+    if after is not None:
+        return after + random.uniform(0, base)
+    return random.uniform(0, min(settings.llm_backoff_max_seconds, base * 2**attempt))
+
+
+# ── Scheduler ────────────────────────────────────────────────
+
+
+class _Waiter:
+    __slots__ = ("input_tokens", "priority", "ready")
+
+    def __init__(self, input_tokens: int, priority: Priority):
+        self.input_tokens = input_tokens
+        self.priority = priority
+        self.ready = asyncio.Event()
+
+
+class Scheduler:
+    def __init__(self, requests_per_minute: float, input_tokens_per_minute: float, output_tokens_per_minute: float):
+        self.buckets = {
+            "requests": TokenBucket(requests_per_minute),
+            "input_tokens": TokenBucket(input_tokens_per_minute),
+            "output_tokens": TokenBucket(output_tokens_per_minute),
+        }
+        self._paused_until = 0.0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_settings(cls) -> Scheduler:
+        return cls(
+            settings.llm_requests_per_minute,
+            settings.llm_input_tokens_per_minute,
+            settings.llm_output_tokens_per_minute,
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    def _delay(self, input_tokens: int, now: float) -> float:
+        return max(
+            self._paused_until - now,
+            self.buckets["requests"].delay(1, now),
+            self.buckets["input_tokens"].delay(input_tokens, now),
+            # Output is unknown until the call ends; only wait out a debt
+            self.buckets["output_tokens"].delay(0, now),
+        )
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0][2].ready.set()
+
+    async def acquire(self, input_tokens: int, level: Priority | None = None) -> None:
+        """Wait until the buckets can pay for one call of
+        ``input_tokens`` and every higher-priority call has gone."""
+        waiter = _Waiter(input_tokens, current_priority() if level is None else level)
+        heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+        start = time.monotonic()
+        try:
+            while True:
+                timeout = None
+                if self._queue[0][2] is waiter:
+                    now = time.monotonic()
+                    timeout = self._delay(input_tokens, now)
+                    if timeout <= 0:
+                        heapq.heappop(self._queue)
+                        self.buckets["requests"].take(1, now)
+                        self.buckets["input_tokens"].take(input_tokens, now)
+                        return
+                waiter.ready.clear()
+                try:
+                    await asyncio.wait_for(waiter.ready.wait(), timeout)
+                except TimeoutError:
+                    pass
+        finally:
+            if any(entry[2] is waiter for entry in self._queue):
+                self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+                heapq.heapify(self._queue)
+            metrics.llm_queue_seconds.observe(time.monotonic() - start, priority=waiter.priority.name.lower())
+            self._wake_head()
+
+    def settle(self, reserved_input: int, input_tokens: int, output_tokens: int) -> None:
+        """Charge the difference between the reserved and actual cost."""
+        now = time.monotonic()
+        self.buckets["input_tokens"].take(input_tokens - reserved_input, now)
+        self.buckets["output_tokens"].take(output_tokens, now)
+
+    def pause(self, seconds: float) -> None:
+        """Admit nothing for ``seconds``."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._wake_head()
+
+    def observe_headers(self, headers: Mapping[str, str] | None) -> None:
+        """Adopt the limits and remaining capacity reported by the API."""
+        if not headers:
+            return
+        now = time.monotonic()
+        for name, prefix in RATE_LIMIT_HEADERS.items():
+            bucket = self.buckets[name]
+            limit = _number(headers.get(f"{prefix}-limit"))
+            if limit:
+                bucket.resize(limit, now)
+            remaining = _number(headers.get(f"{prefix}-remaining"))
+            if remaining is not None:
+                bucket.observe_remaining(remaining, now)
+
+
+_scheduler: Scheduler | None = None
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler.from_settings()
+    return _scheduler
@@ -0,0 +1,289 @@
+"""JSON responses from Claude that survive truncation and stray text.
+
+Every agent asks for one JSON document. ``create_json`` gets it back
+without re-generating work Claude has already done:
+
+- If the response stops at ``max_tokens``, the partial text is sent back
+  as the start of the assistant turn and Claude continues from where it
+  stopped, up to ``MAX_CONTINUATIONS`` times.
+- Code fences, a preamble before the JSON, trailing prose, comments and
+  trailing commas are tolerated.
+- If the document is still incomplete, every complete element of the
+  arrays that were open is salvaged and the rest is dropped.
+
+The model comes from the agent's route (see ``routing``), and a route
+may escalate an unusable or unsure answer to a stronger model. Only
+when nothing usable can be recovered is ``StructuredOutputError``
+raised.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from app.agents import llm, routing
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Continuation requests after a max_tokens stop before salvaging
+MAX_CONTINUATIONS = 2
+
+# Salvage cut points to try, latest first
+MAX_SALVAGE_ATTEMPTS = 50
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredOutputError(ValueError):
+    """Claude's response held no recoverable JSON document."""
+
+
+# ── Text repair ──────────────────────────────────────────────
+
+
+def strip_fences(text: str) -> str:
+    stripped = text.strip()
+    if stripped.startswith("```"):
+        stripped = stripped.split("\n", 1)[1] if "\n" in stripped else ""
+        if stripped.rstrip().endswith("```"):
+            stripped = stripped.rstrip()[:-3]
+    return stripped
+
+
+def _json_start(text: str) -> int:
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise StructuredOutputError("No JSON object in response")
+    return min(starts)
+
+
+def _clean(text: str) -> str:
+    """Drop // and /* */ comments and trailing commas outside strings."""
+    out: list[str] = []
+    i, n = 0, len(text)
+    in_string = False
+    while i < n:
+        c = text[i]
+        if in_string:
+            out.append(c)
+            if c == "\\" and i + 1 < n:
+                out.append(text[i + 1])
+                i += 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+            out.append(c)
+        elif text.startswith("//", i):
+            while i < n and text[i] != "\n":
+                i += 1
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        elif c in "]}":
+            # Remove a trailing comma before this closer
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            out.append(c)
+        else:
+            out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def _cut_points(text: str) -> list[tuple[int, str]]:
+    """Places where the text can be cut and closed to give valid JSON.
+
+    A cut point sits right after an array opens or right after one of
+    its elements is complete, so only whole elements are kept. Each
+    comes with the closers needed at that point.
+    """
+    points: list[tuple[int, str]] = []
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+            if c == "[":
+                points.append((i + 1, "".join(CLOSERS[s] for s in reversed(stack))))
+        elif c in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if stack and stack[-1] == "[":
+                points.append((i + 1, "".join(CLOSERS[s] for s in reversed(stack))))
+        elif c == "," and stack and stack[-1] == "[":
+            points.append((i, "".join(CLOSERS[s] for s in reversed(stack))))
+    return points
+
+
+def salvage(text: str) -> Any:
+    """Recover the complete elements of a truncated JSON document."""
+    text = _clean(text)
+    for cut, closers in reversed(_cut_points(text)[-MAX_SALVAGE_ATTEMPTS:]):
+        try:
+            return json.loads(text[:cut] + closers)
+        except json.JSONDecodeError:
+            continue
+    raise StructuredOutputError("Truncated JSON could not be salvaged")
+
+
+def parse_json(text: str) -> tuple[Any, str]:
+    """Parse the JSON document in a response.
+
+    Returns the value and how it was obtained: "parsed", "repaired"
+    (comments or trailing commas removed) or "salvaged" (cut down from
+    an incomplete document).
+    """
+    body = strip_fences(text)
+    body = body[_json_start(body):]
+    decoder = json.JSONDecoder()
+    for candidate, how in ((body, "parsed"), (_clean(body), "repaired")):
+        try:
+            # raw_decode ignores anything after the document
+            return decoder.raw_decode(candidate)[0], how
+        except json.JSONDecodeError:
+            continue
+    return salvage(body), "salvaged"
+
+
+# ── Calls ────────────────────────────────────────────────────
+
+
+def message_text(message) -> str:
+    return "".join(getattr(block, "text", "") for block in message.content)
+
+
+async def _generate(agent: str, model: str, route: routing.Route, system: str, user_content: str) -> Any:
+    message = await llm.create_message(
+        agent=agent,
+        system=system,
+        user_content=user_content,
+        max_tokens=route.max_tokens,
+        temperature=route.temperature,
+        model=model,
+    )
+    text = message_text(message)
+
+    continuations = 0
+    while getattr(message, "stop_reason", None) == "max_tokens" and continuations < MAX_CONTINUATIONS:
+        continuations += 1
+        metrics.llm_output_repairs.inc(agent=agent, kind="continued")
+        logger.info("%s hit max_tokens; continuing (%d)", agent, continuations)
+        # The API rejects a prefill ending in whitespace
+        text = text.rstrip()
+        message = await llm.create_message(
+            agent=agent,
+            system=system,
+            user_content=user_content,
+            max_tokens=route.max_tokens,
+            temperature=route.temperature,
+            assistant_prefix=text,
+            model=model,
+        )
+        text += message_text(message)
+
+    return parse_response(agent, text)
+
+
+def parse_response(agent: str, text: str) -> Any:
+    """``parse_json``, counting and logging any repair."""
+    data, how = parse_json(text)
+    if how != "parsed":
+        metrics.llm_output_repairs.inc(agent=agent, kind=how)
+    if how == "salvaged":
+        logger.warning("%s returned incomplete JSON; kept the complete elements", agent)
+    return data
+
+
+@dataclass(frozen=True)
+class JsonRequest:
+    """One agent call, built ahead so it can be sent on its own or as
+    part of a message batch.
+
+    If the agent's route escalates, ``assess`` checks the first model's
+    answer: it raises ``ValueError`` if the answer is unusable and
+    otherwise returns a confidence in [0, 1]. An unusable or
+    low-confidence answer is replaced by the escalation model's.
+    """
+
+    agent: str
+    system: str
+    user_content: str
+    max_tokens: int
+    temperature: float | None = None
+    assess: Callable[[Any], float] | None = None
+
+    @property
+    def route(self) -> routing.Route:
+        return routing.route_for(self.agent, self.max_tokens, self.temperature)
+
+    def escalation_reason(self, data: Any) -> str | None:
+        """Why the first model's answer should be escalated, or None
+        to keep it."""
+        route = self.route
+        if not route.escalate_to:
+            return None
+        try:
+            confidence = self.assess(data) if self.assess else 1.0
+        except ValueError as e:
+            logger.warning("%s output from %s unusable (%s)", self.agent, route.model, e)
+            return "invalid"
+        if confidence < route.min_confidence:
+            logger.info("%s confidence %.2f from %s below %.2f", self.agent, confidence, route.model, route.min_confidence)
+            return "low_confidence"
+        return None
+
+    async def escalate(self, reason: str) -> Any:
+        route = self.route
+        metrics.llm_escalations.inc(agent=self.agent, model=route.model, escalated_to=route.escalate_to, reason=reason)
+        logger.info("Escalating %s from %s to %s (%s)", self.agent, route.model, route.escalate_to, reason)
+        return await _generate(self.agent, route.escalate_to, route, self.system, self.user_content)
+
+    async def run(self) -> Any:
+        """Call Claude and return the JSON response, continuing truncated
+        output, repairing what comes back and escalating if needed."""
+        route = self.route
+        metrics.llm_routed_calls.inc(agent=self.agent, model=route.model)
+        try:
+            data = await _generate(self.agent, route.model, route, self.system, self.user_content)
+        except StructuredOutputError:
+            if not route.escalate_to:
+                raise
+            return await self.escalate("invalid")
+        reason = self.escalation_reason(data)
+        return data if reason is None else await self.escalate(reason)
+
+
+async def create_json(
+    *,
+    agent: str,
+    system: str,
+    user_content: str,
+    max_tokens: int,
+    temperature: float | None = None,
+    assess: Callable[[Any], float] | None = None,
+) -> Any:
+    """Call Claude and return its JSON response (see ``JsonRequest``)."""
+    return await JsonRequest(agent, system, user_content, max_tokens, temperature, assess).run()
@@ -3,17 +3,36 @@
 Works through an organised transcript and surfaces emergent themes
 with full traceability — every theme grounded in specific quotes
 with participant ID, timestamp, and guide section.
+
+Claude references evidence by turn index and short anchors; quotes,
+timestamps and sections are resolved locally from the organised
+transcript so they are always verbatim.
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from app.agents import routing, structured
+from app.models.session import OrganisedTranscript, SectionMapping, Turn
+from app.models.theme import SessionThemes, Theme, ThemeStatus
+from app.services.evidence_resolver import SourceTurn, resolve_evidence, source_turns
+from app.services.prompt_budget import (
+    estimate_tokens,
+    is_acknowledgement,
+    plan_call,
+    split_evenly,
+)
+
+logger = logging.getLogger(__name__)
 
-import anthropic
+MAX_TOKENS = 4096
 
-from app.config import settings
-from app.models.session import OrganisedTranscript
-from app.models.theme import SessionThemes, Theme, ThemeEvidence, ThemeStatus
+# Evidence is referenced by anchors, so the response is a small share
+# of the input
+REFERENCE_OUTPUT_RATIO = 0.15
 
 SYSTEM_PROMPT = """\
 You are an expert qualitative research analyst performing inductive \
@@ -26,8 +45,8 @@ strong sentiments, or significant behaviours expressed by the participant.
 3. For each theme:
    - Give it a clear, descriptive name
    - Write a 1-2 sentence description of the pattern
-   - List ALL supporting quotes with exact text, timestamp, and which \
-guide section they came from
+   - List ALL supporting quotes, each referenced by its turn index and \
+the first and last few words of the quote (see below)
    - Count the number of distinct instances
 4. Themes must be grounded in evidence. Never propose a theme without \
 at least one verbatim quote.
@@ -36,6 +55,13 @@ guide sections.
 6. Also look at off-script responses — they often contain the most \
 interesting emergent patterns.
 
+Referencing evidence: do not write out quotes. A quote is a contiguous \
+passage within one turn. Give its turn_index, "start" — the first 3 to 6 \
+words of the passage — and "end" — the last 3 to 6 words — copied exactly \
+as they appear. For a short quote, "start" may be the whole quote and \
+"end" may be omitted. Quote text, timestamps and sections are filled in \
+from the transcript afterwards.
+
 Return your response as valid JSON matching the schema below. Do not \
 include any text outside the JSON.
 
@@ -48,11 +74,9 @@ Schema:
       "theme_description": "string",
       "evidence": [
         {
-          "quote": "exact verbatim quote from transcript",
-          "participant_id": "P01",
-          "timestamp": "00:12:34",
           "turn_index": 5,
-          "guide_section": "section name or Off-script",
+          "start": "first words of the quote",
+          "end": "last words of the quote",
           "guide_question_id": "Q01 or null"
         }
       ],
@@ -63,76 +87,68 @@ Schema:
 """
 
 
-def _format_organised_transcript(organised: OrganisedTranscript) -> str:
-    """Format the organised transcript for the prompt."""
-    parts = [f"Participant: {organised.participant_id}\n"]
-
-    for mapping in organised.section_mappings:
-        parts.append(
-            f"## {mapping.section_name} ({mapping.time_bracket}) "
-            f"— {mapping.coverage_status.value}"
-        )
-        for mt in mapping.mapped_turns:
-            ts = f"[{mt.timestamp}] " if mt.timestamp else ""
-            parts.append(f"  {ts}(turn {mt.turn_index}): \"{mt.text}\"")
-        if mapping.coverage_notes:
-            parts.append(f"  Note: {mapping.coverage_notes}")
-        parts.append("")
+def _format_mapping(mapping: SectionMapping) -> str:
+    parts = [
+        f"## {mapping.section_name} ({mapping.time_bracket}) "
+        f"— {mapping.coverage_status.value}"
+    ]
+    for mt in mapping.mapped_turns:
+        if is_acknowledgement(mt.text, is_interviewer=False):
+            continue
+        ts = f"[{mt.timestamp}] " if mt.timestamp else ""
+        parts.append(f"  {ts}(turn {mt.turn_index}): \"{mt.text}\"")
+    if mapping.coverage_notes:
+        parts.append(f"  Note: {mapping.coverage_notes}")
+    parts.append("")
+    return "\n".join(parts)
 
-    if organised.off_script_turns:
-        parts.append("## Off-script responses")
-        for turn in organised.off_script_turns:
-            ts = f"[{turn.timestamp}] " if turn.timestamp else ""
-            parts.append(f"  {ts}(turn {turn.turn_index}): \"{turn.text}\"")
 
+def _format_off_script(turns: list[Turn]) -> str:
+    parts = ["## Off-script responses"]
+    for turn in turns:
+        if is_acknowledgement(turn.text, is_interviewer=False):
+            continue
+        ts = f"[{turn.timestamp}] " if turn.timestamp else ""
+        parts.append(f"  {ts}(turn {turn.turn_index}): \"{turn.text}\"")
     return "\n".join(parts)
 
 
-async def extract_themes(
-    organised: OrganisedTranscript,
-    session_id: str,
-    participant_id: str,
-) -> SessionThemes:
-    """Send organised transcript to Claude for theme extraction."""
+def _section_blocks(organised: OrganisedTranscript) -> list[str]:
+    blocks = [_format_mapping(m) for m in organised.section_mappings]
+    if organised.off_script_turns:
+        blocks.append(_format_off_script(organised.off_script_turns))
+    return blocks
 
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
 
-    user_content = (
-        f"Analyse this organised transcript and extract emergent themes.\n\n"
-        f"{_format_organised_transcript(organised)}"
-    )
+def _format_organised_transcript(organised: OrganisedTranscript) -> str:
+    """Format the organised transcript for the prompt."""
+    header = f"Participant: {organised.participant_id}\n"
+    return "\n".join([header, *_section_blocks(organised)])
 
-    message = await client.messages.create(
-        model=settings.claude_model,
-        max_tokens=4096,
-        temperature=0.3,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_content}],
-    )
 
-    response_text = message.content[0].text
+THEME_FIELDS = ("theme_id", "theme_name", "theme_description")
+
 
-    # Strip markdown code fences if present
-    if response_text.startswith("```"):
-        lines = response_text.split("\n")
-        lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        response_text = "\n".join(lines)
+def _assess(data) -> float:
+    """Fail unless the response holds usable themes (it carries no
+    confidence score)."""
+    themes = data.get("themes") if isinstance(data, dict) else None
+    if not isinstance(themes, list):
+        raise ValueError("themes missing")
+    if themes and not any(isinstance(t, dict) and all(k in t for k in THEME_FIELDS) for t in themes):
+        raise ValueError("no complete theme")
+    return 1.0
 
-    data = json.loads(response_text)
 
+def _build_themes(data: dict, participant_id: str, sources: dict[int, SourceTurn]) -> list[Theme]:
     themes = []
     for t in data.get("themes", []):
+        if not all(k in t for k in THEME_FIELDS):
+            # Cut short by a truncated response
+            logger.warning("Skipping incomplete theme from %s: %r", participant_id, t)
+            continue
         evidence = [
-            ThemeEvidence(
-                quote=e["quote"],
-                participant_id=e.get("participant_id", participant_id),
-                timestamp=e.get("timestamp", ""),
-                turn_index=e.get("turn_index", 0),
-                guide_section=e.get("guide_section", ""),
-                guide_question_id=e.get("guide_question_id"),
-            )
+            resolve_evidence(e, sources, participant_id)
             for e in t.get("evidence", [])
         ]
         themes.append(
@@ -145,9 +161,95 @@ async def extract_themes(
                 status=ThemeStatus.PROPOSED,
             )
         )
+    return themes
+
+
+def _merge_chunk_themes(chunks: list[list[Theme]]) -> list[Theme]:
+    """Merge same-named themes from separate chunks and renumber them."""
+    by_name: dict[str, Theme] = {}
+    for themes in chunks:
+        for theme in themes:
+            key = theme.theme_name.strip().lower()
+            existing = by_name.get(key)
+            if existing is None:
+                by_name[key] = theme
+                continue
+            existing.evidence.extend(theme.evidence)
+            existing.instance_count += theme.instance_count
+    merged = list(by_name.values())
+    for i, theme in enumerate(merged, 1):
+        theme.theme_id = f"T{i:02d}"
+    return merged
+
+
+def _request(header: str, blocks: list[str]) -> structured.JsonRequest:
+    return structured.JsonRequest(
+        agent="theme_extractor",
+        system=SYSTEM_PROMPT,
+        user_content=(
+            f"Analyse this organised transcript and extract emergent themes.\n\n"
+            f"{header}\n" + "\n".join(blocks)
+        ),
+        max_tokens=MAX_TOKENS,
+        temperature=0.3,
+        assess=_assess,
+    )
 
-    return SessionThemes(
+
+@dataclass
+class ThemePlan:
+    """The Claude calls for one session and what is needed to resolve
+    their evidence. Rebuilt deterministically from the organised
+    transcript when results arrive later (see ``bulk_processing``)."""
+
+    session_id: str
+    participant_id: str
+    sources: dict[int, SourceTurn]
+    requests: list[structured.JsonRequest] = field(default_factory=list)
+
+
+def plan_themes(organised: OrganisedTranscript, session_id: str, participant_id: str) -> ThemePlan:
+    """Build one request per chunk of guide sections."""
+    header = f"Participant: {organised.participant_id}\n"
+    blocks = _section_blocks(organised)
+    body = "\n".join(blocks)
+
+    budget = plan_call(
+        SYSTEM_PROMPT + header,
+        body,
+        max_output_tokens=routing.route_for("theme_extractor", MAX_TOKENS).max_tokens,
+        expected_output_tokens=int(estimate_tokens(body) * REFERENCE_OUTPUT_RATIO),
+    )
+    groups = split_evenly([estimate_tokens(b) for b in blocks], budget.chunks) or [[]]
+    return ThemePlan(
         session_id=session_id,
         participant_id=participant_id,
+        sources=source_turns(organised),
+        requests=[_request(header, [blocks[i] for i in g]) for g in groups],
+    )
+
+
+def finish_themes(plan: ThemePlan, results: list[dict]) -> SessionThemes:
+    """Resolve evidence in Claude's answers and merge chunked themes."""
+    chunks = [_build_themes(data, plan.participant_id, plan.sources) for data in results]
+    themes = chunks[0] if len(chunks) == 1 else _merge_chunk_themes(chunks)
+    return SessionThemes(
+        session_id=plan.session_id,
+        participant_id=plan.participant_id,
         themes=themes,
     )
+
+
+async def extract_themes(
+    organised: OrganisedTranscript,
+    session_id: str,
+    participant_id: str,
+) -> SessionThemes:
+    """Send organised transcript to Claude for theme extraction.
+
+    Long transcripts are split by guide section into several calls
+    whose themes are merged by name.
+    """
+    plan = plan_themes(organised, session_id, participant_id)
+    results = await asyncio.gather(*(r.run() for r in plan.requests))
+    return finish_themes(plan, list(results))
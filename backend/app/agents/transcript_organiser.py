@@ -1,18 +1,24 @@
 """Transcript Organiser Agent.
 
 Maps anonymised transcript turns against the locked research guide sections.
-Uses time brackets as a primary signal, supplemented by semantic matching
-via Claude.
+Time brackets are applied locally first: participant turns that sit well
+inside a section's bracket are assigned without Claude. Only ambiguous
+turns (near a boundary, untimestamped or off-topic) are sent to Claude
+for semantic matching, along with the question that prompted them.
+
+Claude answers with turn indices, confidences and section ids only. The
+organised transcript is rebuilt locally from the session's turns, so no
+output tokens are spent echoing text we already hold.
 """
 
 from __future__ import annotations
 
-import json
-
-import anthropic
+import asyncio
+import logging
+from dataclasses import dataclass, field
 
-from app.config import settings
-from app.models.guide import ResearchGuide
+from app.agents import routing, structured
+from app.models.guide import GuideSection, ResearchGuide
 from app.models.session import (
     CoverageStatus,
     MappedTurn,
@@ -20,59 +26,77 @@ from app.models.session import (
     SectionMapping,
     Turn,
 )
+from app.services.prompt_budget import (
+    CompactTurn,
+    compact_turns,
+    estimate_tokens,
+    expansion_map,
+    format_compact_turns,
+    plan_call,
+    split_evenly,
+)
+from app.services.time_brackets import PreAssignment, pre_assign_turns
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 8192
+
+# Output tokens per mapped turn reference (index, confidence, JSON)
+TOKENS_PER_TURN_REF = 16
+
+# A mapped turn with at least this many words counts as substantive
+SUBSTANTIVE_WORDS = 12
 
 SYSTEM_PROMPT = """\
 You are an expert qualitative research analyst. You are organising an \
 interview transcript against a research guide.
 
+Most participant turns have already been assigned to sections from their \
+timestamps. They are listed under "Pre-assigned turns" for context only — \
+do not repeat them in mapped_turns.
+
 Your job:
-1. Map each participant response (non-interviewer turn) to the most \
+1. Map each participant response listed under "Turns to map" to the most \
 relevant guide section based on:
    - Time brackets (primary signal — if a response falls within a \
 section's time range, it likely belongs there)
    - Content relevance (semantic match between the response and the \
 section's questions)
-2. For each section, determine coverage status:
+2. For each section, determine coverage status, taking both pre-assigned \
+and newly mapped turns into account:
    - "covered" — at least one substantive response maps to this section
    - "partial" — responses touch on the section but lack depth
    - "not_covered" — no responses map to this section
 3. If a section is not covered, provide a brief note explaining why \
 (e.g. "Ran long on previous section", "Question was skipped").
-4. Identify off-script responses — participant turns that don't map to \
-any guide section.
+4. Identify off-script responses — turns to map that don't fit any guide \
+section.
 5. Assign a mapping_confidence (0.0 to 1.0) for each mapped turn.
 
+Interviewer lines that restate a guide question are shortened to a \
+reference such as "[asks Q03]". A line covering several turns lists all \
+of their indices — map it using the first index.
+
 Return your response as valid JSON matching the schema below. Do not \
 include any text outside the JSON.
 
+Refer to turns by turn_index only — never repeat speaker, text or \
+timestamps; they are filled in from the transcript afterwards. Include \
+every guide section in section_mappings.
+
 Schema:
 {
   "section_mappings": [
     {
       "section_id": "S01",
-      "section_name": "string",
-      "time_bracket": "0:00-10:00",
       "coverage_status": "covered|partial|not_covered",
       "mapped_turns": [
-        {
-          "turn_index": 0,
-          "speaker": "string",
-          "text": "string",
-          "timestamp": "00:00:00",
-          "mapping_confidence": 0.95
-        }
+        {"turn_index": 0, "mapping_confidence": 0.95}
       ],
       "coverage_notes": "string"
     }
   ],
-  "off_script_turns": [
-    {
-      "turn_index": 0,
-      "speaker": "string",
-      "text": "string",
-      "timestamp": "00:00:00"
-    }
-  ]
+  "off_script_turns": [0]
 }
 """
 
@@ -93,89 +117,320 @@ def _format_guide_for_prompt(guide: ResearchGuide) -> str:
     return "\n".join(parts)
 
 
-def _format_transcript_for_prompt(turns: list[Turn]) -> str:
-    """Format transcript turns into a readable text block."""
+def _format_pre_assigned(pre: PreAssignment, guide: ResearchGuide) -> str:
+    """Summarise local assignments as turn indices per section."""
     parts = []
+    for section in guide.sections:
+        assigned = pre.assigned.get(section.section_id, [])
+        if assigned:
+            indices = ", ".join(str(mt.turn_index) for mt in assigned)
+            parts.append(f"{section.section_id}: turns {indices}")
+    return "\n".join(parts) or "(none)"
+
+
+def _turns_to_map(turns: list[Turn], ambiguous: list[Turn]) -> list[Turn]:
+    """Ambiguous turns, each preceded by the interviewer turn that prompted it."""
+    wanted = {t.turn_index for t in ambiguous}
+    selected: list[Turn] = []
+    last_interviewer: Turn | None = None
     for turn in turns:
-        role = "INTERVIEWER" if turn.is_interviewer else "PARTICIPANT"
-        ts = f"[{turn.timestamp}] " if turn.timestamp else ""
-        parts.append(f"{ts}{role} (turn {turn.turn_index}): {turn.text}")
-    return "\n".join(parts)
+        if turn.is_interviewer:
+            last_interviewer = turn
+            continue
+        if turn.turn_index not in wanted:
+            continue
+        if last_interviewer is not None and last_interviewer not in selected:
+            selected.append(last_interviewer)
+        selected.append(turn)
+    return selected
 
 
-async def organise_transcript(
+def _local_coverage(mapped: list[MappedTurn]) -> tuple[CoverageStatus, str]:
+    if not mapped:
+        return CoverageStatus.NOT_COVERED, "No participant responses in this section."
+    if any(len(mt.text.split()) >= SUBSTANTIVE_WORDS for mt in mapped):
+        return CoverageStatus.COVERED, ""
+    return CoverageStatus.PARTIAL, "Only brief responses in this section."
+
+
+# Coverage statuses ranked for combining chunked results
+_COVERAGE_RANK = {
+    CoverageStatus.NOT_COVERED: 0,
+    CoverageStatus.PARTIAL: 1,
+    CoverageStatus.COVERED: 2,
+}
+
+
+def _blocks(compact: list[CompactTurn]) -> list[list[CompactTurn]]:
+    """Group compacted lines so each interviewer line stays with its answers."""
+    blocks: list[list[CompactTurn]] = []
+    for ct in compact:
+        if ct.is_interviewer or not blocks:
+            blocks.append([])
+        blocks[-1].append(ct)
+    return blocks
+
+
+def _coverage_status(mapping: dict) -> CoverageStatus:
+    """The mapping's coverage status; missing or unknown values count
+    as not covered."""
+    try:
+        return CoverageStatus(mapping["coverage_status"])
+    except (KeyError, ValueError):
+        logger.warning(
+            "Organiser gave section %r an invalid coverage status %r",
+            mapping.get("section_id"), mapping.get("coverage_status"),
+        )
+        return CoverageStatus.NOT_COVERED
+
+
+def _combine_chunks(results: list[dict]) -> dict:
+    """Combine per-chunk responses into one response-shaped dict."""
+    sections: dict[str, dict] = {}
+    off_script: list[dict] = []
+    for data in results:
+        for sm in data.get("section_mappings", []):
+            merged = sections.setdefault(
+                sm.get("section_id"),
+                {**sm, "mapped_turns": [], "coverage_status": CoverageStatus.NOT_COVERED.value},
+            )
+            merged["mapped_turns"].extend(sm.get("mapped_turns", []))
+            status = _coverage_status(sm)
+            if _COVERAGE_RANK[status] > _COVERAGE_RANK[CoverageStatus(merged["coverage_status"])]:
+                merged["coverage_status"] = status.value
+                merged["coverage_notes"] = sm.get("coverage_notes", "")
+        off_script.extend(data.get("off_script_turns", []))
+    return {"section_mappings": list(sections.values()), "off_script_turns": off_script}
+
+
+def _turn_ref(entry) -> tuple[int | None, dict]:
+    """Read a turn reference given as a bare index or an object."""
+    if isinstance(entry, dict):
+        index = entry.get("turn_index")
+    else:
+        index, entry = entry, {}
+    return (index if isinstance(index, int) else None), entry
+
+
+def _expand(
+    entries: list,
+    expansions: dict[int, list[int]],
+    ambiguous: set[int],
+) -> list[tuple[int, dict]]:
+    """Validate turn references and expand merged lines to every index
+    they cover.
+
+    Only turns Claude was asked to map are accepted; anything else is
+    logged and dropped.
+    """
+    expanded = []
+    for raw in entries:
+        index, entry = _turn_ref(raw)
+        if index is None or index not in ambiguous:
+            logger.warning("Organiser referenced unknown or pre-assigned turn %r", raw)
+            continue
+        for i in expansions.get(index, [index]):
+            if i in ambiguous:
+                expanded.append((i, entry))
+    return expanded
+
+
+def _merge_section(
+    section: GuideSection,
+    pre_assigned: list[MappedTurn],
+    model_mapping: dict | None,
+    model_turns: list[tuple[int, dict]],
+    by_index: dict[int, Turn],
+) -> SectionMapping:
+    mapped = list(pre_assigned)
+    status, notes = None, ""
+    if model_mapping:
+        for index, mt in model_turns:
+            turn = by_index[index]
+            mapped.append(
+                MappedTurn(
+                    turn_index=index,
+                    speaker=turn.speaker,
+                    text=turn.text,
+                    timestamp=turn.timestamp,
+                    mapping_confidence=mt.get("mapping_confidence", 0.0),
+                )
+            )
+        status = _coverage_status(model_mapping)
+        notes = model_mapping.get("coverage_notes", "")
+    mapped.sort(key=lambda mt: mt.turn_index)
+
+    # Fall back to local judgement if Claude skipped the section or
+    # called it uncovered despite confidently assigned turns
+    if status is None or (status == CoverageStatus.NOT_COVERED and mapped):
+        status, notes = _local_coverage(mapped)
+
+    return SectionMapping(
+        section_id=section.section_id,
+        section_name=section.section_name,
+        time_bracket=section.time_bracket,
+        coverage_status=status,
+        mapped_turns=mapped,
+        coverage_notes=notes,
+    )
+
+
+def _assess(data) -> float:
+    """Check the response can be merged and return its mean mapping
+    confidence, so a fast model's unsure answers can be escalated.
+    A missing or unknown coverage status is not checked: merging treats
+    it as not covered (see ``_coverage_status``)."""
+    if not isinstance(data, dict) or not isinstance(data.get("section_mappings"), list):
+        raise ValueError("section_mappings missing")
+    confidences = []
+    for sm in data["section_mappings"]:
+        if not isinstance(sm, dict):
+            raise ValueError("section mapping is not an object")
+        mapped_turns = sm.get("mapped_turns", [])
+        if not isinstance(mapped_turns, list):
+            raise ValueError("mapped_turns is not a list")
+        for raw in mapped_turns:
+            confidence = _turn_ref(raw)[1].get("mapping_confidence")
+            if isinstance(confidence, (int, float)):
+                confidences.append(confidence)
+    return sum(confidences) / len(confidences) if confidences else 1.0
+
+
+def _request(user_content: str) -> structured.JsonRequest:
+    return structured.JsonRequest(
+        agent="transcript_organiser",
+        system=SYSTEM_PROMPT,
+        user_content=user_content,
+        max_tokens=MAX_TOKENS,
+        assess=_assess,
+    )
+
+
+@dataclass
+class OrganisePlan:
+    """Local pre-assignment plus the Claude calls for what is left.
+
+    Built deterministically from the session, so a plan can be rebuilt
+    to finish results that arrive later (see ``bulk_processing``).
+    """
+
+    turns: list[Turn]
+    guide: ResearchGuide
+    session_id: str
+    participant_id: str
+    pre: PreAssignment
+    expansions: dict[int, list[int]] = field(default_factory=dict)
+    requests: list[structured.JsonRequest] = field(default_factory=list)
+
+
+def plan_organise(
     turns: list[Turn],
     guide: ResearchGuide,
     session_id: str,
     participant_id: str,
-) -> OrganisedTranscript:
-    """Send transcript and guide to Claude for organisation."""
+) -> OrganisePlan:
+    """Pre-assign confident turns and build one request per chunk of
+    the ambiguous remainder."""
+    plan = OrganisePlan(turns, guide, session_id, participant_id, pre_assign_turns(turns, guide))
+    pre = plan.pre
+    if not pre.ambiguous:
+        return plan
 
-    client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
-
-    user_content = (
+    compact = compact_turns(_turns_to_map(turns, pre.ambiguous), guide)
+    plan.expansions = expansion_map(compact)
+    context = (
         f"## Research Guide\n\n"
         f"{_format_guide_for_prompt(guide)}\n\n"
         f"---\n\n"
-        f"## Transcript (Participant {participant_id})\n\n"
-        f"{_format_transcript_for_prompt(turns)}"
+        f"## Pre-assigned turns\n\n"
+        f"{_format_pre_assigned(pre, guide)}\n\n"
+        f"---\n\n"
     )
 
-    message = await client.messages.create(
-        model=settings.claude_model,
-        max_tokens=8192,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_content}],
+    blocks = _blocks(compact)
+    block_texts = [format_compact_turns(b) for b in blocks]
+    budget = plan_call(
+        SYSTEM_PROMPT + context,
+        "\n".join(block_texts),
+        max_output_tokens=routing.route_for("transcript_organiser", MAX_TOKENS).max_tokens,
+        expected_output_tokens=TOKENS_PER_TURN_REF * len(pre.ambiguous),
     )
+    for group in split_evenly([estimate_tokens(t) for t in block_texts], budget.chunks):
+        chunk = [ct for i in group for ct in blocks[i]]
+        plan.requests.append(
+            _request(
+                f"{context}"
+                f"## Turns to map (Participant {participant_id})\n\n"
+                f"{format_compact_turns(chunk)}"
+            )
+        )
+    return plan
 
-    response_text = message.content[0].text
-
-    # Strip markdown code fences if present
-    if response_text.startswith("```"):
-        lines = response_text.split("\n")
-        lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        response_text = "\n".join(lines)
 
-    data = json.loads(response_text)
+def finish_organise(plan: OrganisePlan, results: list[dict]) -> OrganisedTranscript:
+    """Merge Claude's answers (one per request) with the local
+    pre-assignment into the organised transcript."""
+    turns, guide, pre, expansions = plan.turns, plan.guide, plan.pre, plan.expansions
+    data = _combine_chunks(results) if len(results) > 1 else (results[0] if results else {})
 
-    section_mappings = []
+    ambiguous = {t.turn_index for t in pre.ambiguous}
+    by_index = {t.turn_index: t for t in turns}
+    section_ids = {s.section_id for s in guide.sections}
+    by_section = {}
     for sm in data.get("section_mappings", []):
-        mapped_turns = [
-            MappedTurn(
-                turn_index=mt["turn_index"],
-                speaker=mt["speaker"],
-                text=mt["text"],
-                timestamp=mt.get("timestamp", ""),
-                mapping_confidence=mt.get("mapping_confidence", 0.0),
-            )
-            for mt in sm.get("mapped_turns", [])
-        ]
+        if sm.get("section_id") in section_ids:
+            by_section[sm["section_id"]] = sm
+        else:
+            logger.warning("Organiser returned unknown section %r", sm.get("section_id"))
+    section_mappings = []
+    for section in guide.sections:
+        model_mapping = by_section.get(section.section_id)
+        model_turns = (
+            _expand(model_mapping.get("mapped_turns", []), expansions, ambiguous)
+            if model_mapping
+            else []
+        )
         section_mappings.append(
-            SectionMapping(
-                section_id=sm["section_id"],
-                section_name=sm["section_name"],
-                time_bracket=sm.get("time_bracket", ""),
-                coverage_status=CoverageStatus(sm["coverage_status"]),
-                mapped_turns=mapped_turns,
-                coverage_notes=sm.get("coverage_notes", ""),
+            _merge_section(
+                section,
+                pre.assigned.get(section.section_id, []),
+                model_mapping,
+                model_turns,
+                by_index,
             )
         )
 
     off_script = [
-        Turn(
-            turn_index=t["turn_index"],
-            speaker=t["speaker"],
-            text=t["text"],
-            timestamp=t.get("timestamp", ""),
-        )
-        for t in data.get("off_script_turns", [])
+        by_index[index].model_copy()
+        for index, _ in _expand(data.get("off_script_turns", []), expansions, ambiguous)
     ]
 
+    placed = {mt.turn_index for sm in section_mappings for mt in sm.mapped_turns}
+    placed.update(t.turn_index for t in off_script)
+    unplaced = sorted(ambiguous - placed)
+    if unplaced:
+        logger.warning("Organiser left turns unplaced for %s: %s", plan.session_id, unplaced)
+
     return OrganisedTranscript(
-        session_id=session_id,
-        participant_id=participant_id,
+        session_id=plan.session_id,
+        participant_id=plan.participant_id,
         section_mappings=section_mappings,
         off_script_turns=off_script,
     )
+
+
+async def organise_transcript(
+    turns: list[Turn],
+    guide: ResearchGuide,
+    session_id: str,
+    participant_id: str,
+) -> OrganisedTranscript:
+    """Organise a transcript against the guide.
+
+    Confident time-bracket assignments are made locally; Claude is only
+    called for the remaining ambiguous turns, compacted and split into
+    chunks if they would not fit in one call.
+    """
+    plan = plan_organise(turns, guide, session_id, participant_id)
+    results = await asyncio.gather(*(r.run() for r in plan.requests))
+    return finish_organise(plan, list(results))
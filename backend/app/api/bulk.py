@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+
+from app.db import store
+from app.models.batch import BatchJob
+from app.services import bulk_processing
+
+router = APIRouter()
+
+
+@router.post("", response_model=BatchJob, status_code=202)
+async def start_bulk_run(project_id: str):
+    """Organise and theme every ready session through Message Batches.
+
+    Returns the first submitted batch; results are saved as batches end,
+    typically within hours. Use the per-session endpoints for results
+    now.
+    """
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        job = await bulk_processing.start(project)
+    except bulk_processing.BulkRunInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    bulk_processing.run_in_background(job)
+    return job
+
+
+@router.get("", response_model=list[BatchJob])
+async def list_bulk_batches(project_id: str):
+    """The project's bulk-run batches, oldest first."""
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return store.list_batch_jobs(project_id)
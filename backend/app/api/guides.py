@@ -4,6 +4,8 @@ from pydantic import BaseModel
 from app.agents.guide_reviewer import review_guide
 from app.db import store
 from app.models.guide import GuideReviewResult, ResearchGuide
+from app.services.content_hash import guide_review_key
+from app.services.usage import attribute, check_budget
 
 router = APIRouter()
 
@@ -20,7 +22,11 @@ async def upload_and_review_guide(
     objective: str = "",
     research_goals: str = "",
 ):
-    """Upload a research guide file and get AI review."""
+    """Upload a research guide file and get AI review.
+
+    An identical guide (same text, objective and goals) reuses the
+    stored review instead of calling the reviewer again.
+    """
     project = store.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -30,12 +36,18 @@ async def upload_and_review_guide(
 
     goals = [g.strip() for g in research_goals.split(",") if g.strip()] if research_goals else []
 
-    result = await review_guide(
-        guide_text=guide_text,
-        project_name=project.name,
-        objective=objective,
-        research_goals=goals,
-    )
+    review_key = guide_review_key(guide_text, project.name, objective, goals)
+    result = store.get_guide_review(project_id, review_key)
+    if result is None:
+        check_budget(project)
+        with attribute(project_id):
+            result = await review_guide(
+                guide_text=guide_text,
+                project_name=project.name,
+                objective=objective,
+                research_goals=goals,
+            )
+        store.save_guide_review(project_id, review_key, result)
 
     # Attach project_id and review metadata to the parsed guide
     result.parsed_guide.project_id = project_id
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+
+from app.agents.insight_synthesiser import synthesise_insights
+from app.agents.scheduler import Priority, priority
+from app.db import store
+from app.models.insight import InsightSynthesisResult
+from app.models.theme import ThemeStatus
+from app.services.usage import attribute, check_budget
+
+router = APIRouter()
+
+
+@router.get("", response_model=InsightSynthesisResult | None)
+async def get_insights(project_id: str):
+    """Get the most recent insight synthesis for the project."""
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    snapshot = store.get_synthesis(project_id)
+    return snapshot.result if snapshot else None
+
+
+@router.post("/synthesise", response_model=InsightSynthesisResult)
+async def synthesise_project_insights(project_id: str, full: bool = False):
+    """AI synthesises accepted themes across all sessions into insights.
+
+    Only sessions whose accepted themes changed since the last run are
+    processed unless ``full`` is set.
+    """
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    session_themes = [
+        st
+        for st in store.list_all_themes(project_id)
+        if any(t.status == ThemeStatus.ACCEPTED for t in st.themes)
+    ]
+    if not session_themes:
+        raise HTTPException(status_code=400, detail="No accepted themes to synthesise")
+
+    check_budget(project)
+    # A project-wide run queues behind single-session calls
+    with attribute(project_id), priority(Priority.BULK):
+        snapshot = await synthesise_insights(
+            project_id=project_id,
+            project_name=project.name,
+            session_themes=session_themes,
+            previous=None if full else store.get_synthesis(project_id),
+        )
+    store.save_synthesis(snapshot)
+
+    return snapshot.result
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
 
 from app.db import store
-from app.models.project import Project, ProjectCreate, ProjectSummary
+from app.models.project import DenyListEntry, Project, ProjectCreate, ProjectSummary
+from app.models.usage import BudgetUpdate, ProjectUsage
+from app.services.usage import project_usage
 
 router = APIRouter()
 
@@ -40,3 +42,40 @@ async def delete_project(project_id: str):
     if not store.delete_project(project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     return {"deleted": True}
+
+
+@router.get("/{project_id}/deny-list", response_model=list[DenyListEntry])
+async def get_deny_list(project_id: str):
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project.deny_list
+
+
+@router.put("/{project_id}/deny-list", response_model=list[DenyListEntry])
+async def update_deny_list(project_id: str, entries: list[DenyListEntry]):
+    """Replace the project's deny-list of names and terms that are
+    always redacted during PII scanning."""
+    project = store.update_deny_list(project_id, entries)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project.deny_list
+
+
+@router.get("/{project_id}/usage", response_model=ProjectUsage)
+async def get_usage(project_id: str):
+    """LLM tokens and cost for the project, by stage, model and session."""
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project_usage(project)
+
+
+@router.put("/{project_id}/budget", response_model=ProjectUsage)
+async def update_budget(project_id: str, body: BudgetUpdate):
+    """Set the project's LLM budget. Once spend reaches it, new guide
+    reviews, organise, theme and synthesis runs are refused."""
+    project = store.update_project_budget(project_id, body.budget_usd)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project_usage(project)
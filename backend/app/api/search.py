@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.db import store
+from app.models.search import SearchResponse, SearchSource
+from app.services import search
+
+router = APIRouter()
+
+
+@router.get("", response_model=SearchResponse)
+async def search_project(
+    project_id: str,
+    q: str,
+    participant: str | None = None,
+    section: str | None = None,
+    ts_from: str | None = None,
+    ts_to: str | None = None,
+    source: SearchSource | None = None,
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Full-text search over anonymised participant turns and theme evidence."""
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    index = search.get_index(project_id)
+    if index is None:
+        index = search.build_index(
+            project_id,
+            store.list_sessions(project_id),
+            store.list_all_themes(project_id),
+        )
+
+    return index.search(
+        q,
+        participant=participant,
+        section=section,
+        ts_from=ts_from,
+        ts_to=ts_to,
+        source=source,
+        limit=limit,
+    )
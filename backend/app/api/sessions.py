@@ -1,45 +1,165 @@
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Response, UploadFile
 from pydantic import BaseModel
 
 from app.agents.theme_extractor import extract_themes
 from app.agents.transcript_organiser import organise_transcript
 from app.db import store
+from app.models.project import Project
 from app.models.session import (
     AnonymisationLog,
+    BulkUploadItem,
+    BulkUploadReport,
+    BulkUploadStatus,
     OrganisedTranscript,
     PiiDetection,
     Session,
     SessionStatus,
 )
 from app.services.anonymiser import apply_redactions, scan_turns_for_pii
-from app.services.parser import parse_markdown_transcript
+from app.services.bulk_upload import expand_uploads, parse_uploads
+from app.services.content_hash import content_hash
+from app.services.deny_list import matcher_for
+from app.services.transcript_formats import parse_transcript
+from app.services.usage import attribute, check_budget
 
 router = APIRouter()
 
 
 @router.post("/upload", response_model=Session)
-async def upload_transcript(project_id: str, file: UploadFile):
-    """Upload a markdown transcript. Parses into turns but does NOT
-    run AI yet — PII scan happens first."""
+async def upload_transcript(
+    project_id: str,
+    file: UploadFile,
+    response: Response,
+    allow_duplicate: bool = False,
+):
+    """Upload a transcript (markdown, WebVTT, SRT or JSON cues; the
+    format is detected). Parses into turns but does NOT run AI yet —
+    PII scan happens first.
+
+    If the same transcript was already uploaded to this project, the
+    existing session is returned (flagged with an ``X-Duplicate-Of``
+    header) unless ``allow_duplicate`` is set.
+    """
     project = store.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     content = await file.read()
     text = content.decode("utf-8")
-
-    turns = parse_markdown_transcript(text)
+    digest = content_hash(text)
+
+    if not allow_duplicate:
+        existing = store.find_session_by_hash(project_id, digest)
+        if existing:
+            response.headers["X-Duplicate-Of"] = existing.session_id
+            return existing
+
+    try:
+        turns = parse_transcript(text, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse transcript: {e}")
     if not turns:
         raise HTTPException(status_code=400, detail="Could not parse any turns from transcript")
 
     session = store.create_session(project_id)
     session.transcript = turns
     session.status = SessionStatus.UPLOADED
+    session.content_hash = digest
     store.update_session(session)
 
     return session
 
 
+@router.post("/bulk-upload", response_model=BulkUploadReport)
+async def bulk_upload_transcripts(
+    project_id: str,
+    files: list[UploadFile],
+    background_tasks: BackgroundTasks,
+    scan_pii: bool = False,
+    allow_duplicate: bool = False,
+):
+    """Upload many transcripts, or zip archives of them, at once.
+
+    Files are parsed in parallel and all new sessions are created in one
+    store operation, with participant ids following file order. Files
+    already uploaded to the project (or repeated within the batch) are
+    reported as duplicates unless ``allow_duplicate`` is set. With
+    ``scan_pii`` the PII scan of each new session starts in the
+    background.
+    """
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    raw = [(f.filename or f"file{i + 1}", await f.read()) for i, f in enumerate(files)]
+    parsed = await parse_uploads(expand_uploads(raw))
+
+    known: dict[str, Session] = {}
+    if not allow_duplicate:
+        known = {s.content_hash: s for s in store.list_sessions(project_id) if s.content_hash}
+
+    items: list[BulkUploadItem] = []
+    to_create: list[int] = []
+    batch_hashes: dict[str, int] = {}
+    for p in parsed:
+        if p.error:
+            items.append(BulkUploadItem(filename=p.filename, status=BulkUploadStatus.FAILED, error=p.error))
+        elif p.content_hash in known:
+            items.append(
+                BulkUploadItem(
+                    filename=p.filename,
+                    status=BulkUploadStatus.DUPLICATE,
+                    session_id=known[p.content_hash].session_id,
+                    participant_id=known[p.content_hash].participant_id,
+                    turn_count=len(p.turns),
+                )
+            )
+        elif not allow_duplicate and p.content_hash in batch_hashes:
+            # Points at the first copy's session once it is created
+            items.append(BulkUploadItem(filename=p.filename, status=BulkUploadStatus.DUPLICATE))
+        else:
+            items.append(
+                BulkUploadItem(filename=p.filename, status=BulkUploadStatus.CREATED, turn_count=len(p.turns))
+            )
+            batch_hashes[p.content_hash] = len(items) - 1
+            to_create.append(len(items) - 1)
+
+    sessions = store.create_sessions(
+        project_id, [(parsed[i].turns, parsed[i].content_hash) for i in to_create]
+    )
+    for i, session in zip(to_create, sessions):
+        items[i].session_id = session.session_id
+        items[i].participant_id = session.participant_id
+    for item, p in zip(items, parsed):
+        if item.status == BulkUploadStatus.DUPLICATE and item.session_id is None:
+            first = items[batch_hashes[p.content_hash]]
+            item.session_id = first.session_id
+            item.participant_id = first.participant_id
+            item.turn_count = first.turn_count
+
+    if scan_pii and sessions:
+        background_tasks.add_task(_scan_sessions, project, [s.session_id for s in sessions])
+
+    return BulkUploadReport(
+        items=items,
+        created=len(sessions),
+        duplicates=sum(1 for i in items if i.status == BulkUploadStatus.DUPLICATE),
+        failed=sum(1 for i in items if i.status == BulkUploadStatus.FAILED),
+        pii_scan_started=scan_pii and bool(sessions),
+    )
+
+
+def _scan_sessions(project: Project, session_ids: list[str]) -> None:
+    """Background PII scan for freshly uploaded sessions."""
+    deny_list = matcher_for(project)
+    for session_id in session_ids:
+        session = store.get_session(session_id)
+        if not session:
+            continue
+        session.anonymisation_log.detections = scan_turns_for_pii(session.transcript, deny_list=deny_list)
+        store.update_session(session)
+
+
 @router.get("", response_model=list[Session])
 async def list_sessions(project_id: str):
     project = store.get_project(project_id)
@@ -73,11 +193,13 @@ async def scan_pii(
     session = store.get_session(session_id)
     if not session or session.project_id != project_id:
         raise HTTPException(status_code=404, detail="Session not found")
+    project = store.get_project(project_id)
 
     detections = scan_turns_for_pii(
         session.transcript,
         interviewer_name=body.interviewer_name if body else None,
         participant_name=body.participant_name if body else None,
+        deny_list=matcher_for(project) if project else None,
     )
 
     # Store detections on the session for later
@@ -131,12 +253,16 @@ async def organise_session_transcript(project_id: str, session_id: str):
     if not guide.locked:
         raise HTTPException(status_code=400, detail="Guide must be locked before organising transcripts")
 
-    organised = await organise_transcript(
-        turns=session.transcript,
-        guide=guide,
-        session_id=session.session_id,
-        participant_id=session.participant_id,
-    )
+    project = store.get_project(project_id)
+    if project:
+        check_budget(project)
+    with attribute(project_id, session_id):
+        organised = await organise_transcript(
+            turns=session.transcript,
+            guide=guide,
+            session_id=session.session_id,
+            participant_id=session.participant_id,
+        )
 
     session.organised = organised
     session.status = SessionStatus.ORGANISED
@@ -163,11 +289,15 @@ async def extract_session_themes(project_id: str, session_id: str):
     if not session.organised:
         raise HTTPException(status_code=400, detail="No organised transcript found")
 
-    themes = await extract_themes(
-        organised=session.organised,
-        session_id=session.session_id,
-        participant_id=session.participant_id,
-    )
+    project = store.get_project(project_id)
+    if project:
+        check_budget(project)
+    with attribute(project_id, session_id):
+        themes = await extract_themes(
+            organised=session.organised,
+            session_id=session.session_id,
+            participant_id=session.participant_id,
+        )
 
     store.save_themes(session.session_id, themes)
 
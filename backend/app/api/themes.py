@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException
 
 from app.db import store
 from app.models.theme import SessionThemes, Theme, ThemeStatus
+from app.models.verification import VerificationReport
+from app.services.evidence_verifier import verify_project
 
 router = APIRouter()
 
@@ -15,6 +17,25 @@ async def list_all_themes(project_id: str):
     return store.list_all_themes(project_id)
 
 
+@router.post("/verify", response_model=VerificationReport)
+async def verify_evidence(project_id: str):
+    """Check every evidence quote in the project against its transcript.
+
+    Corrects turn indices and timestamps, flags quotes that cannot be
+    found, and returns a report of every mismatch.
+    """
+    project = store.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    report, changed = verify_project(
+        store.list_sessions(project_id), store.list_all_themes(project_id)
+    )
+    for st in changed:
+        store.save_themes(st.session_id, st)
+    return report
+
+
 @router.get("/{session_id}", response_model=SessionThemes | None)
 async def get_session_themes(project_id: str, session_id: str):
     """Get themes for a specific session."""
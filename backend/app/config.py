@@ -1,6 +1,19 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 
+class AgentRoute(BaseModel):
+    """Model settings for one agent; unset fields keep the defaults."""
+
+    model: str | None = None
+    max_tokens: int | None = None
+    temperature: float | None = None
+    # Stronger model to retry on when the output fails validation or
+    # its confidence is below min_confidence; None never escalates
+    escalate_to: str | None = None
+    min_confidence: float = 0.0
+
+
 class Settings(BaseSettings):
     app_name: str = "Insight Tool"
     debug: bool = False
@@ -12,6 +25,47 @@ class Settings(BaseSettings):
     # Anthropic
     anthropic_api_key: str = ""
     claude_model: str = "claude-sonnet-4-20250514"
+    claude_context_tokens: int = 200_000
+    # Per-agent overrides keyed by agent name: "guide_reviewer",
+    # "transcript_organiser", "theme_extractor", "insight_synthesiser".
+    # e.g. AGENT_ROUTES='{"transcript_organiser": {"model":
+    # "claude-haiku-4-5", "escalate_to": "claude-sonnet-4-5",
+    # "min_confidence": 0.6}}'
+    agent_routes: dict[str, AgentRoute] = {}
+    # Organisation rate limits per minute; 0 leaves a limit to be
+    # learned from the API's rate-limit response headers
+    llm_requests_per_minute: int = 0
+    llm_input_tokens_per_minute: int = 0
+    llm_output_tokens_per_minute: int = 0
+    # Retries for rate-limit, overload, server and connection errors
+    llm_max_retries: int = 6
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 60.0
+    # Default per-project LLM budget in USD; 0 means no limit
+    project_budget_usd: float = 0.0
+    # USD per million {input, output} tokens, overriding the built-in
+    # price list, keyed by model name prefix
+    llm_prices: dict[str, tuple[float, float]] = {}
+    # Seconds between status checks on a submitted Message Batch
+    batch_poll_seconds: float = 60.0
+    # A worker's claim on a batch lasts this long past each check (or
+    # each session saved); other workers take over once it lapses
+    batch_lease_seconds: float = 300.0
+
+    # PII detection. NLP engine: "spacy", "stanza" or "transformers";
+    # spaCy model size: "sm", "md", "lg" or "trf" (transformers uses the
+    # small spaCy model for tokenisation). pii_recognisers lists the
+    # Presidio recognisers to keep — empty keeps Presidio's defaults.
+    pii_nlp_engine: str = "spacy"
+    pii_model_size: str = "lg"
+    pii_transformers_model: str = "dslim/bert-base-NER"
+    pii_recognisers: list[str] = []
+    # Turns per NLP batch
+    pii_batch_size: int = 32
+
+    # PII analyzer result cache, shared across sessions and projects
+    pii_cache_max_entries: int = 50_000
+    pii_cache_ttl_seconds: int = 24 * 60 * 60
 
     # Store backend: "supabase" or "memory"
     store_backend: str = "supabase"
@@ -19,6 +73,16 @@ class Settings(BaseSettings):
     # File storage
     upload_dir: str = "./uploads"
     max_upload_size_mb: int = 50
+    # Worker processes for parsing bulk uploads; 0 uses one per CPU
+    upload_workers: int = 0
+
+    # Run at startup before /api/ready reports ready: any of
+    # "analyzer" (load the NER model), "store" (connect) and "llm"
+    # (build the Claude client)
+    startup_warmups: list[str] = ["analyzer", "store", "llm"]
+
+    # Log a trace span per request stage, LLM call and store call
+    trace_spans: bool = False
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
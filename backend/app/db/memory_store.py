@@ -9,23 +9,34 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from uuid import uuid4
 
-from app.models.guide import ResearchGuide
-from app.models.project import Project, ProjectStatus
-from app.models.session import Session, SessionStatus
+from app.models.batch import BatchJob, BatchStatus
+from app.models.guide import GuideReviewResult, ResearchGuide
+from app.models.insight import SynthesisSnapshot
+from app.models.project import DenyListEntry, Project, ProjectStatus
+from app.models.session import Session, SessionStatus, Turn
 from app.models.theme import SessionThemes
+from app.models.usage import LlmUsage
 
 # ── In-memory tables ─────────────────────────────────────────
 
 _projects: dict[str, dict] = {}
 _guides: dict[str, ResearchGuide] = {}
+_guide_reviews: dict[tuple[str, str], GuideReviewResult] = {}
 _sessions: dict[str, dict] = {}
 _themes: dict[str, SessionThemes] = {}
+_syntheses: dict[str, SynthesisSnapshot] = {}
+_llm_usage: dict[str, list[LlmUsage]] = {}
+_batch_jobs: dict[str, BatchJob] = {}
 
 
 def generate_id() -> str:
     return uuid4().hex[:12]
 
 
+def ping() -> None:
+    """Nothing to connect to; present for interface parity."""
+
+
 # ── Projects ─────────────────────────────────────────────────
 
 def create_project(name: str) -> Project:
@@ -62,6 +73,12 @@ def delete_project(project_id: str) -> bool:
         return False
     del _projects[project_id]
     _guides.pop(project_id, None)
+    for key in [k for k in _guide_reviews if k[0] == project_id]:
+        del _guide_reviews[key]
+    _syntheses.pop(project_id, None)
+    _llm_usage.pop(project_id, None)
+    for batch_id in [b for b, job in _batch_jobs.items() if job.project_id == project_id]:
+        del _batch_jobs[batch_id]
     # Remove sessions and their themes
     session_ids = [
         sid for sid, s in _sessions.items() if s["project_id"] == project_id
@@ -77,6 +94,20 @@ def _update_project_fields(project_id: str, **fields) -> None:
         _projects[project_id].update(fields)
 
 
+def update_deny_list(project_id: str, entries: list[DenyListEntry]) -> Project | None:
+    if project_id not in _projects:
+        return None
+    _update_project_fields(project_id, deny_list=[e.model_dump() for e in entries])
+    return get_project(project_id)
+
+
+def update_project_budget(project_id: str, budget_usd: float | None) -> Project | None:
+    if project_id not in _projects:
+        return None
+    _update_project_fields(project_id, budget_usd=budget_usd)
+    return get_project(project_id)
+
+
 # ── Guides ───────────────────────────────────────────────────
 
 def save_guide(project_id: str, guide: ResearchGuide) -> ResearchGuide:
@@ -92,6 +123,15 @@ def get_guide(project_id: str) -> ResearchGuide | None:
     return _guides.get(project_id)
 
 
+def save_guide_review(project_id: str, content_hash: str, result: GuideReviewResult) -> None:
+    _guide_reviews[(project_id, content_hash)] = result.model_copy(deep=True)
+
+
+def get_guide_review(project_id: str, content_hash: str) -> GuideReviewResult | None:
+    result = _guide_reviews.get((project_id, content_hash))
+    return result.model_copy(deep=True) if result else None
+
+
 # ── Sessions ─────────────────────────────────────────────────
 
 def create_session(project_id: str) -> Session:
@@ -119,6 +159,36 @@ def create_session(project_id: str) -> Session:
     return session
 
 
+def create_sessions(project_id: str, uploads: list[tuple[list[Turn], str]]) -> list[Session]:
+    """Create one uploaded session per (turns, content_hash), allocating
+    participant ids in the given order."""
+    existing = sum(1 for s in _sessions.values() if s["project_id"] == project_id)
+    now = datetime.now(timezone.utc)
+    sessions = []
+    for offset, (turns, digest) in enumerate(uploads, start=1):
+        session = Session(
+            session_id=generate_id(),
+            project_id=project_id,
+            participant_id=f"P{existing + offset:02d}",
+            transcript=turns,
+            upload_timestamp=now,
+            status=SessionStatus.UPLOADED,
+            content_hash=digest,
+        )
+        _sessions[session.session_id] = session.model_dump()
+        sessions.append(session)
+
+    if sessions:
+        total = existing + len(sessions)
+        _update_project_fields(
+            project_id,
+            session_count=total,
+            participant_count=total,
+            status=ProjectStatus.COLLECTING.value,
+        )
+    return sessions
+
+
 def get_session(session_id: str) -> Session | None:
     row = _sessions.get(session_id)
     if not row:
@@ -141,6 +211,13 @@ def update_session(session: Session) -> Session:
     return session
 
 
+def find_session_by_hash(project_id: str, content_hash: str) -> Session | None:
+    for row in _sessions.values():
+        if row["project_id"] == project_id and row.get("content_hash") == content_hash:
+            return Session(**row)
+    return None
+
+
 # ── Themes ───────────────────────────────────────────────────
 
 def save_themes(session_id: str, themes: SessionThemes) -> SessionThemes:
@@ -159,3 +236,58 @@ def list_all_themes(project_id: str) -> list[SessionThemes]:
         sid for sid, s in _sessions.items() if s["project_id"] == project_id
     }
     return [t for sid, t in _themes.items() if sid in session_ids]
+
+
+# ── Insights ─────────────────────────────────────────────────
+
+def save_synthesis(snapshot: SynthesisSnapshot) -> SynthesisSnapshot:
+    _syntheses[snapshot.project_id] = snapshot
+    return snapshot
+
+
+def get_synthesis(project_id: str) -> SynthesisSnapshot | None:
+    return _syntheses.get(project_id)
+
+
+# ── LLM usage ────────────────────────────────────────────────
+
+def record_llm_usage(usage: LlmUsage) -> None:
+    _llm_usage.setdefault(usage.project_id, []).append(usage)
+
+
+def list_llm_usage(project_id: str) -> list[LlmUsage]:
+    return list(_llm_usage.get(project_id, []))
+
+
+# ── Batch jobs ───────────────────────────────────────────────
+
+def save_batch_job(job: BatchJob) -> BatchJob:
+    _batch_jobs[job.batch_id] = job.model_copy(deep=True)
+    return job
+
+
+def get_batch_job(batch_id: str) -> BatchJob | None:
+    job = _batch_jobs.get(batch_id)
+    return job.model_copy(deep=True) if job else None
+
+
+def list_batch_jobs(project_id: str) -> list[BatchJob]:
+    jobs = [j for j in _batch_jobs.values() if j.project_id == project_id]
+    return [j.model_copy(deep=True) for j in sorted(jobs, key=lambda j: j.created_at)]
+
+
+def claim_batch_job(batch_id: str, owner: str, until: datetime) -> bool:
+    """Lease a submitted job to ``owner`` unless another worker holds a
+    live lease on it."""
+    job = _batch_jobs.get(batch_id)
+    if job is None or job.status != BatchStatus.SUBMITTED:
+        return False
+    held = job.lease_until is not None and job.lease_until > datetime.now(timezone.utc)
+    if job.claimed_by not in (None, owner) and held:
+        return False
+    job.claimed_by, job.lease_until = owner, until
+    return True
+
+
+def list_pending_batch_jobs() -> list[BatchJob]:
+    return [j.model_copy(deep=True) for j in _batch_jobs.values() if j.status == BatchStatus.SUBMITTED]
@@ -4,11 +4,59 @@ All API/agent code imports from here:  ``from app.db import store``
 
 Set STORE_BACKEND=memory in .env (or environment) to use the in-memory
 store for local development without a Supabase connection.
+
+Writes that change searchable content (sessions, themes) are wrapped
+here so the project search index stays current whichever backend is
+active. Theme evidence is also verified against the session transcript
+before it is saved.
 """
 
+import logging
+
 from app.config import settings
+from app.models.session import Session
+from app.models.theme import SessionThemes
+from app.services import deny_list as _deny_list
+from app.services import evidence_verifier as _verifier
+from app.services import metrics as _metrics
+from app.services import search as _search
 
 if settings.store_backend == "memory":
+    from app.db import memory_store as _backend
     from app.db.memory_store import *  # noqa: F401, F403
 else:
+    from app.db import supabase_store as _backend
     from app.db.supabase_store import *  # noqa: F401, F403
+
+logger = logging.getLogger(__name__)
+
+
+def delete_project(project_id: str) -> bool:
+    deleted = _backend.delete_project(project_id)
+    _search.drop_index(project_id)
+    _deny_list.drop_matcher(project_id)
+    return deleted
+
+
+def update_session(session: Session) -> Session:
+    session = _backend.update_session(session)
+    _search.index_session(session)
+    return session
+
+
+def save_themes(session_id: str, themes: SessionThemes) -> SessionThemes:
+    session = _backend.get_session(session_id)
+    if session is not None:
+        report = _verifier.verify_session_themes(session, themes)
+        if report.mismatches:
+            logger.warning(
+                "Session %s evidence: %d corrected, %d fuzzy, %d missing of %d",
+                session_id, report.corrected, report.fuzzy, report.missing, report.checked,
+            )
+    themes = _backend.save_themes(session_id, themes)
+    _search.index_themes(themes)
+    return themes
+
+
+# Time every store call, including the wrappers above
+_metrics.instrument_store(globals(), settings.store_backend)
@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
-from supabase import Client, create_client
+from typing import TYPE_CHECKING
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 _client: Client | None = None
 
 
@@ -16,5 +19,8 @@ def get_client() -> Client:
             raise RuntimeError(
                 "SUPABASE_URL and SUPABASE_KEY must be set in environment / .env"
             )
+        # Deferred: the client stack is slow to import
+        from supabase import create_client
+
         _client = create_client(settings.supabase_url, settings.supabase_key)
     return _client
@@ -11,10 +11,13 @@ from datetime import datetime, timezone
 from uuid import uuid4
 
 from app.db.supabase import get_client
-from app.models.guide import ResearchGuide
-from app.models.project import Project, ProjectStatus
-from app.models.session import Session, SessionStatus
+from app.models.batch import BatchJob, BatchStatus
+from app.models.guide import GuideReviewResult, ResearchGuide
+from app.models.insight import InsightSynthesisResult, SynthesisSnapshot
+from app.models.project import DenyListEntry, Project, ProjectStatus
+from app.models.session import Session, SessionStatus, Turn
 from app.models.theme import SessionThemes
+from app.models.usage import LlmUsage
 
 
 def generate_id() -> str:
@@ -27,6 +30,11 @@ def _sb():
     return get_client()
 
 
+def ping() -> None:
+    """Open the connection with a one-row read, for readiness checks."""
+    _sb().table("projects").select("project_id").limit(1).execute()
+
+
 # ── Projects ─────────────────────────────────────────────────
 
 def create_project(name: str) -> Project:
@@ -82,6 +90,32 @@ def _update_project_fields(project_id: str, **fields) -> None:
     _sb().table("projects").update(fields).eq("project_id", project_id).execute()
 
 
+def update_deny_list(project_id: str, entries: list[DenyListEntry]) -> Project | None:
+    resp = (
+        _sb()
+        .table("projects")
+        .update({"deny_list": [e.model_dump() for e in entries]})
+        .eq("project_id", project_id)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    return Project(**resp.data[0])
+
+
+def update_project_budget(project_id: str, budget_usd: float | None) -> Project | None:
+    resp = (
+        _sb()
+        .table("projects")
+        .update({"budget_usd": budget_usd})
+        .eq("project_id", project_id)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    return Project(**resp.data[0])
+
+
 # ── Guides ───────────────────────────────────────────────────
 
 def save_guide(project_id: str, guide: ResearchGuide) -> ResearchGuide:
@@ -127,6 +161,29 @@ def get_guide(project_id: str) -> ResearchGuide | None:
     )
 
 
+def save_guide_review(project_id: str, content_hash: str, result: GuideReviewResult) -> None:
+    row = {
+        "project_id": project_id,
+        "content_hash": content_hash,
+        "result": result.model_dump(mode="json"),
+    }
+    _sb().table("guide_reviews").upsert(row).execute()
+
+
+def get_guide_review(project_id: str, content_hash: str) -> GuideReviewResult | None:
+    resp = (
+        _sb()
+        .table("guide_reviews")
+        .select("result")
+        .eq("project_id", project_id)
+        .eq("content_hash", content_hash)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    return GuideReviewResult(**resp.data[0]["result"])
+
+
 # ── Sessions ─────────────────────────────────────────────────
 
 def create_session(project_id: str) -> Session:
@@ -177,6 +234,59 @@ def create_session(project_id: str) -> Session:
     )
 
 
+def create_sessions(project_id: str, uploads: list[tuple[list[Turn], str]]) -> list[Session]:
+    """Create one uploaded session per (turns, content_hash) in a single
+    insert, allocating participant ids in the given order."""
+    if not uploads:
+        return []
+    count_resp = (
+        _sb()
+        .table("sessions")
+        .select("session_id", count="exact")
+        .eq("project_id", project_id)
+        .execute()
+    )
+    existing = count_resp.count or 0
+
+    now = datetime.now(timezone.utc)
+    sessions = [
+        Session(
+            session_id=generate_id(),
+            project_id=project_id,
+            participant_id=f"P{existing + offset:02d}",
+            transcript=turns,
+            upload_timestamp=now,
+            status=SessionStatus.UPLOADED,
+            content_hash=digest,
+        )
+        for offset, (turns, digest) in enumerate(uploads, start=1)
+    ]
+    rows = [
+        {
+            "session_id": s.session_id,
+            "project_id": project_id,
+            "participant_id": s.participant_id,
+            "transcript": [t.model_dump() for t in s.transcript],
+            "anonymisation_log": s.anonymisation_log.model_dump(),
+            "organised": None,
+            "upload_timestamp": now.isoformat(),
+            "status": SessionStatus.UPLOADED.value,
+            "content_hash": s.content_hash,
+        }
+        for s in sessions
+    ]
+    _sb().table("sessions").insert(rows).execute()
+
+    total = existing + len(sessions)
+    _update_project_fields(
+        project_id,
+        session_count=total,
+        participant_count=total,
+        status=ProjectStatus.COLLECTING.value,
+    )
+    return sessions
+
+
 def get_session(session_id: str) -> Session | None:
     resp = (
         _sb()
@@ -208,6 +318,7 @@ def update_session(session: Session) -> Session:
         "anonymisation_log": session.anonymisation_log.model_dump(),
         "organised": session.organised.model_dump() if session.organised else None,
         "status": session.status.value,
+        "content_hash": session.content_hash,
     }
     _sb().table("sessions").update(row).eq("session_id", session.session_id).execute()
     return session
@@ -223,9 +334,26 @@ def _row_to_session(r: dict) -> Session:
         organised=r["organised"],
         upload_timestamp=r["upload_timestamp"],
         status=r["status"],
+        content_hash=r.get("content_hash"),
     )
 
 
+def find_session_by_hash(project_id: str, content_hash: str) -> Session | None:
+    resp = (
+        _sb()
+        .table("sessions")
+        .select("*")
+        .eq("project_id", project_id)
+        .eq("content_hash", content_hash)
+        .order("upload_timestamp")
+        .limit(1)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    return _row_to_session(resp.data[0])
+
+
 # ── Themes ───────────────────────────────────────────────────
 
 def save_themes(session_id: str, themes: SessionThemes) -> SessionThemes:
@@ -290,3 +418,96 @@ def list_all_themes(project_id: str) -> list[SessionThemes]:
         )
         for r in themes_resp.data
     ]
+
+
+# ── Insights ─────────────────────────────────────────────────
+
+def save_synthesis(snapshot: SynthesisSnapshot) -> SynthesisSnapshot:
+    row = {
+        "project_id": snapshot.project_id,
+        "result": snapshot.result.model_dump(mode="json"),
+        "consumed_versions": snapshot.consumed_versions,
+        "instance_counts": snapshot.instance_counts,
+    }
+    _sb().table("insight_syntheses").upsert(row).execute()
+    return snapshot
+
+
+def get_synthesis(project_id: str) -> SynthesisSnapshot | None:
+    resp = (
+        _sb()
+        .table("insight_syntheses")
+        .select("*")
+        .eq("project_id", project_id)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    r = resp.data[0]
+    return SynthesisSnapshot(
+        project_id=r["project_id"],
+        result=InsightSynthesisResult(**r["result"]),
+        consumed_versions=r["consumed_versions"],
+        instance_counts=r["instance_counts"],
+    )
+
+
+# ── LLM usage ────────────────────────────────────────────────
+
+def record_llm_usage(usage: LlmUsage) -> None:
+    _sb().table("llm_usage").insert(usage.model_dump(mode="json")).execute()
+
+
+def list_llm_usage(project_id: str) -> list[LlmUsage]:
+    resp = (
+        _sb()
+        .table("llm_usage")
+        .select("*")
+        .eq("project_id", project_id)
+        .order("created_at")
+        .execute()
+    )
+    return [LlmUsage(**r) for r in resp.data]
+
+
+# ── Batch jobs ───────────────────────────────────────────────
+
+def save_batch_job(job: BatchJob) -> BatchJob:
+    _sb().table("batch_jobs").upsert(job.model_dump(mode="json")).execute()
+    return job
+
+
+def get_batch_job(batch_id: str) -> BatchJob | None:
+    resp = _sb().table("batch_jobs").select("*").eq("batch_id", batch_id).execute()
+    return BatchJob(**resp.data[0]) if resp.data else None
+
+
+def list_batch_jobs(project_id: str) -> list[BatchJob]:
+    resp = (
+        _sb()
+        .table("batch_jobs")
+        .select("*")
+        .eq("project_id", project_id)
+        .order("created_at")
+        .execute()
+    )
+    return [BatchJob(**r) for r in resp.data]
+
+
+def claim_batch_job(batch_id: str, owner: str, until: datetime) -> bool:
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    resp = (
+        _sb()
+        .table("batch_jobs")
+        .update({"claimed_by": owner, "lease_until": until.isoformat()})
+        .eq("batch_id", batch_id)
+        .eq("status", BatchStatus.SUBMITTED.value)
+        .or_(f"claimed_by.is.null,claimed_by.eq.{owner},lease_until.lt.{now}")
+        .execute()
+    )
+    return bool(resp.data)
+
+
+def list_pending_batch_jobs() -> list[BatchJob]:
+    resp = _sb().table("batch_jobs").select("*").eq("status", BatchStatus.SUBMITTED.value).execute()
+    return [BatchJob(**r) for r in resp.data]
@@ -1,10 +1,33 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api import guides, projects, sessions, themes
+from app.agents.scheduler import get_scheduler
+from app.agents.structured import StructuredOutputError
+from app.api import bulk, guides, insights, projects, search, sessions, themes
 from app.config import settings
+from app.services import bulk_processing, readiness
+from app.services.metrics import CallbackGauge, MetricsMiddleware, registry
+from app.services.pii_cache import pii_cache
+from app.services.usage import BudgetExceededError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the server accepts health checks
+    # while the NER model loads; /api/ready tracks progress
+    warmups = asyncio.create_task(readiness.run_warmups())
+    # Keep polling bulk-run batches submitted before a restart
+    bulk_processing.resume()
+    yield
+    warmups.cancel()
+    await bulk_processing.shutdown()
 
-app = FastAPI(title=settings.app_name, version="0.1.0")
+
+app = FastAPI(title=settings.app_name, version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,13 +36,57 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(BudgetExceededError)
+async def budget_exceeded(request: Request, exc: BudgetExceededError):
+    return JSONResponse(status_code=402, content={"detail": str(exc)})
+
+
+@app.exception_handler(StructuredOutputError)
+async def unreadable_model_output(request: Request, exc: StructuredOutputError):
+    # Claude answered, but nothing usable could be recovered from it
+    return JSONResponse(
+        status_code=502,
+        content={"detail": f"Claude's response could not be read as JSON ({exc}). Please try again."},
+    )
+
 
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
 app.include_router(guides.router, prefix="/api/projects/{project_id}/guide", tags=["guides"])
 app.include_router(sessions.router, prefix="/api/projects/{project_id}/sessions", tags=["sessions"])
 app.include_router(themes.router, prefix="/api/projects/{project_id}/themes", tags=["themes"])
+app.include_router(insights.router, prefix="/api/projects/{project_id}/insights", tags=["insights"])
+app.include_router(search.router, prefix="/api/projects/{project_id}/search", tags=["search"])
+app.include_router(bulk.router, prefix="/api/projects/{project_id}/bulk", tags=["bulk"])
 
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "pii_cache": pii_cache.stats()}
+
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 503 until every startup warm-up has succeeded
+    (failed ones are retried)."""
+    report = readiness.status()
+    return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+
+
+registry.register(
+    CallbackGauge("insight_pii_cache_entries", "Entries in the PII result cache.", lambda: pii_cache.stats()["entries"])
+)
+registry.register(
+    CallbackGauge("insight_pii_cache_hit_rate", "PII result cache hit rate.", lambda: pii_cache.stats()["hit_rate"])
+)
+registry.register(
+    CallbackGauge("insight_llm_calls_queued", "Claude calls waiting for rate-limit admission.", lambda: get_scheduler().waiting)
+)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class BatchStage(str, Enum):
+    ORGANISE = "organise"
+    EXTRACT_THEMES = "extract_themes"
+
+
+class BatchStatus(str, Enum):
+    SUBMITTED = "submitted"  # waiting on Claude
+    COMPLETED = "completed"  # results saved
+    FAILED = "failed"
+
+
+class BatchJob(BaseModel):
+    """One Message Batch submitted for a project's bulk run."""
+
+    batch_id: str  # Anthropic's message batch id
+    project_id: str
+    stage: BatchStage
+    status: BatchStatus = BatchStatus.SUBMITTED
+    session_ids: list[str] = Field(default_factory=list)
+    request_count: int = 0
+    # sha256 of each request's user content by custom id, so results are
+    # only applied to the request they were generated for
+    request_digests: dict[str, str] = Field(default_factory=dict)
+    # The worker polling the batch, until its lease runs out
+    claimed_by: str | None = None
+    lease_until: datetime | None = None
+    # Filled in when the batch ends
+    sessions_saved: int = 0
+    failed_session_ids: list[str] = Field(default_factory=list)
+    # Results re-run as direct calls (errored, expired, cut off or unusable)
+    fallback_requests: int = 0
+    error: str | None = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    ended_at: datetime | None = None
@@ -5,6 +5,8 @@ from enum import Enum
 
 from pydantic import BaseModel, Field
 
+from app.models.theme import Theme
+
 
 class InsightStatus(str, Enum):
     PROPOSED = "proposed"
@@ -47,3 +49,33 @@ class InsightSynthesisResult(BaseModel):
     total_sessions: int = 0
     total_participants: int = 0
     insights: list[Insight] = Field(default_factory=list)
+
+
+class SynthesisSnapshot(BaseModel):
+    """Last synthesis result for a project plus what it was built from."""
+
+    project_id: str
+    result: InsightSynthesisResult
+    # session_id -> version hash of the accepted themes consumed
+    consumed_versions: dict[str, str] = Field(default_factory=dict)
+    # insight_id -> session_id -> theme instances contributed
+    instance_counts: dict[str, dict[str, int]] = Field(default_factory=dict)
+
+
+class GroupedTheme(BaseModel):
+    """A session theme placed into a candidate group."""
+
+    session_id: str
+    participant_id: str
+    theme: Theme
+
+
+class CandidateThemeGroup(BaseModel):
+    """Themes pre-grouped locally by lexical similarity before synthesis."""
+
+    group_id: str
+    members: list[GroupedTheme] = Field(default_factory=list)
+    top_terms: list[str] = Field(default_factory=list)
+    participants: list[str] = Field(default_factory=list)
+    participant_count: int = 0
+    total_instances: int = 0
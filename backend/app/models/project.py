@@ -15,6 +15,14 @@ class ProjectStatus(str, Enum):
     COMPLETE = "complete"
 
 
+class DenyListEntry(BaseModel):
+    """A known name or term that is always redacted in this project."""
+
+    term: str
+    replacement_token: str = "[REDACTED]"  # e.g. [NAME], [COMPANY]
+    pii_type: str = "DENY_LIST"
+
+
 class Project(BaseModel):
     project_id: str
     name: str
@@ -22,6 +30,9 @@ class Project(BaseModel):
     status: ProjectStatus = ProjectStatus.SETUP
     session_count: int = 0
     participant_count: int = 0
+    deny_list: list[DenyListEntry] = Field(default_factory=list)
+    # LLM spend limit in USD; None uses settings.project_budget_usd
+    budget_usd: float | None = None
 
 
 class ProjectCreate(BaseModel):
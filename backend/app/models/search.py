@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class SearchSource(str, Enum):
+    TRANSCRIPT = "transcript"
+    EVIDENCE = "evidence"
+
+
+class SearchHit(BaseModel):
+    source: SearchSource
+    session_id: str
+    participant_id: str
+    turn_index: int
+    timestamp: str = ""
+    section: str = ""
+    text: str
+    score: float
+    theme_id: str | None = None
+    theme_name: str | None = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class SearchFacets(BaseModel):
+    participant: list[FacetCount] = Field(default_factory=list)
+    section: list[FacetCount] = Field(default_factory=list)
+    timestamp: list[FacetCount] = Field(default_factory=list)  # 10-minute buckets
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int = 0
+    hits: list[SearchHit] = Field(default_factory=list)
+    facets: SearchFacets = Field(default_factory=SearchFacets)
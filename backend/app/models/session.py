@@ -79,3 +79,27 @@ class Session(BaseModel):
     organised: OrganisedTranscript | None = None
     upload_timestamp: datetime = Field(default_factory=datetime.utcnow)
     status: SessionStatus = SessionStatus.UPLOADED
+    content_hash: str | None = None  # sha256 of the normalised upload
+
+
+class BulkUploadStatus(str, Enum):
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
+
+
+class BulkUploadItem(BaseModel):
+    filename: str
+    status: BulkUploadStatus
+    session_id: str | None = None
+    participant_id: str | None = None
+    turn_count: int = 0
+    error: str | None = None
+
+
+class BulkUploadReport(BaseModel):
+    items: list[BulkUploadItem] = Field(default_factory=list)
+    created: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    pii_scan_started: bool = False
@@ -19,6 +19,7 @@ class ThemeEvidence(BaseModel):
     turn_index: int
     guide_section: str = ""
     guide_question_id: str | None = None
+    unresolved: bool = False  # quote could not be located in the transcript
 
 
 class Theme(BaseModel):
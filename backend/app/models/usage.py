@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, Field
+
+
+class LlmUsage(BaseModel):
+    """One Claude call, attributed to the project and session it ran for."""
+
+    project_id: str
+    session_id: str | None = None
+    stage: str  # the agent that made the call
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    latency_ms: float = 0.0
+    cost_usd: float = 0.0
+    # Sent through the Message Batches API
+    batch: bool = False
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class UsageTotals(BaseModel):
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    latency_ms: float = 0.0
+    cost_usd: float = 0.0
+
+
+class ProjectUsage(BaseModel):
+    project_id: str
+    total: UsageTotals = Field(default_factory=UsageTotals)
+    by_stage: dict[str, UsageTotals] = Field(default_factory=dict)
+    by_model: dict[str, UsageTotals] = Field(default_factory=dict)
+    by_session: dict[str, UsageTotals] = Field(default_factory=dict)
+    # None when the project has no budget
+    budget_usd: float | None = None
+    budget_remaining_usd: float | None = None
+    budget_exceeded: bool = False
+
+
+class BudgetUpdate(BaseModel):
+    # None falls back to the default budget; 0 means no limit
+    budget_usd: float | None = Field(default=None, ge=0)
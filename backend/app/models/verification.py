@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class EvidenceStatus(str, Enum):
+    VERIFIED = "verified"  # found at the claimed turn
+    CORRECTED = "corrected"  # found verbatim at another turn
+    FUZZY = "fuzzy"  # only a near-verbatim match was found
+    MISSING = "missing"  # not found in the transcript
+
+
+class EvidenceMismatch(BaseModel):
+    session_id: str
+    participant_id: str
+    theme_id: str
+    evidence_index: int
+    quote: str
+    status: EvidenceStatus
+    claimed_turn_index: int
+    resolved_turn_index: int | None = None
+
+
+class VerificationReport(BaseModel):
+    checked: int = 0
+    verified: int = 0
+    corrected: int = 0
+    fuzzy: int = 0
+    missing: int = 0
+    mismatches: list[EvidenceMismatch] = Field(default_factory=list)
@@ -0,0 +1,85 @@
+"""Aho-Corasick multi-pattern string matching.
+
+Finds every occurrence of any of a set of patterns in a single pass
+over the text, in time linear in the text length plus the number of
+matches. Used to locate many evidence quotes in a transcript at once
+and to match project deny-lists against transcript turns.
+
+Matching is on exact characters; callers normalise (e.g. lowercase)
+both patterns and text first.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+
+class Automaton:
+    """Compiled matcher for a fixed list of patterns.
+
+    Pattern ids are positions in the list passed to the constructor.
+    Empty patterns are ignored.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        # Trie: per state, outgoing edges, failure link and the ids of
+        # patterns ending here (including via failure links)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for pid, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pid)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def iter_matches(self, text: str, whole_words: bool = False) -> Iterator[tuple[int, int, int]]:
+        """Yield (start, end, pattern_id) for every occurrence in ``text``.
+
+        Overlapping occurrences are all reported, ordered by end offset.
+        With ``whole_words``, matches touching an alphanumeric character
+        on either side are skipped.
+        """
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for pid in out[state]:
+                start = end - len(patterns[pid])
+                if whole_words and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (end < len(text) and text[end].isalnum())
+                ):
+                    continue
+                yield start, end, pid
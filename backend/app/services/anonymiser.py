@@ -2,11 +2,33 @@
 
 Runs locally before any LLM call. Detects PII in transcript turns
 and replaces with standardised tokens.
+
+Detection is tiered: terms on the project's deny-list, emails, phone
+numbers and known names are found by fast recognisers
+(``pii_recognisers``), and only turns that could contain a person,
+place or organisation go through the NER model.
+Analyzer results are memoised per turn text (see ``pii_cache``), so
+stock phrases repeated across sessions are only analysed once.
 """
 
 from __future__ import annotations
 
+import time
+
+from app.config import settings
 from app.models.session import AnonymisationLog, PiiDetection, Turn
+from app.services import metrics
+from app.services.deny_list import DENY_LIST_CONFIDENCE, DenyListMatcher
+from app.services.pii_cache import CachedResult, cache_key, pii_cache, trim
+from app.services.pii_engine import build_analyzer, engine_id
+from app.services.pii_recognisers import (
+    FastResult,
+    compile_names,
+    fast_results,
+    merge_ner,
+    needs_ner,
+    overlaps,
+)
 
 # Presidio imports are deferred to handle missing spacy models gracefully
 _analyzer = None
@@ -28,13 +50,20 @@ AUTO_REDACT_TYPES = {"EMAIL_ADDRESS", "PHONE_NUMBER"}
 # Confidence threshold for auto-redaction of other types
 AUTO_REDACT_THRESHOLD = 0.85
 
+# Entities left to the NER model; emails and phones are found by the
+# fast recognisers
+NER_ENTITIES = [
+    "PERSON",
+    "LOCATION",
+    "ORGANIZATION",
+]
+
 
 def _get_analyzer():
+    """Batch analyzer for the engine tier chosen in settings."""
     global _analyzer
     if _analyzer is None:
-        from presidio_analyzer import AnalyzerEngine
-
-        _analyzer = AnalyzerEngine()
+        _analyzer = build_analyzer()
     return _analyzer
 
 
@@ -47,10 +76,46 @@ def _get_anonymizer():
     return _anonymizer
 
 
+def _analyze_many(texts: list[str], entities: list[str]) -> list[list[CachedResult]]:
+    """Analyzer results for each text, served from the cache when
+    possible. Cache misses go to the NLP model in batches."""
+    engine = engine_id()
+    trimmed = [trim(t) for t in texts]
+    keys = [cache_key(t, entities, engine=engine) if t else "" for t, _ in trimmed]
+
+    found: dict[str, tuple[CachedResult, ...]] = {"": ()}
+    misses: dict[str, str] = {}
+    for key, (text, _) in zip(keys, trimmed):
+        if key in found or key in misses:
+            continue
+        cached = pii_cache.get(key)
+        if cached is None:
+            misses[key] = text
+        else:
+            found[key] = cached
+
+    if misses:
+        batches = _get_analyzer().analyze_iterator(
+            list(misses.values()),
+            language="en",
+            batch_size=settings.pii_batch_size,
+            entities=entities,
+        )
+        for key, results in zip(misses, batches):
+            found[key] = tuple(CachedResult(r.entity_type, r.start, r.end, r.score) for r in results)
+            pii_cache.put(key, found[key])
+
+    return [
+        [CachedResult(r.entity_type, r.start + lead, r.end + lead, r.score) for r in found[key]]
+        for key, (_, lead) in zip(keys, trimmed)
+    ]
+
+
 def scan_turns_for_pii(
     turns: list[Turn],
     interviewer_name: str | None = None,
     participant_name: str | None = None,
+    deny_list: DenyListMatcher | None = None,
 ) -> list[PiiDetection]:
     """Scan transcript turns for PII. Returns detections for review.
 
@@ -58,30 +123,40 @@ def scan_turns_for_pii(
         turns: List of parsed transcript turns.
         interviewer_name: If known, used to detect interviewer references.
         participant_name: If known, used to detect participant references.
+        deny_list: The project's compiled deny-list, if it has one.
     """
-    analyzer = _get_analyzer()
+    start = time.perf_counter()
     detections: list[PiiDetection] = []
+    names = compile_names({"[PARTICIPANT]": participant_name, "[INTERVIEWER]": interviewer_name})
 
+    fast_by_turn: list[list[FastResult]] = []
     for turn in turns:
-        results = analyzer.analyze(
-            text=turn.text,
-            language="en",
-            entities=[
-                "PERSON",
-                "EMAIL_ADDRESS",
-                "PHONE_NUMBER",
-                "LOCATION",
-                "ORGANIZATION",
-            ],
+        fast = [
+            FastResult(m.entry.pii_type, m.start, m.end, DENY_LIST_CONFIDENCE, m.entry.replacement_token)
+            for m in (deny_list.find(turn.text) if deny_list else [])
+        ]
+        fast.extend(r for r in fast_results(turn.text, names) if not overlaps(r.start, r.end, fast))
+        fast_by_turn.append(fast)
+
+    ner_positions = [i for i, turn in enumerate(turns) if needs_ner(turn.text)]
+    with metrics.span("pii.ner", turns=len(ner_positions)):
+        ner_results = dict(
+            zip(ner_positions, _analyze_many([turns[i].text for i in ner_positions], NER_ENTITIES))
         )
 
+    for i, turn in enumerate(turns):
+        results: list[FastResult | CachedResult] = merge_ner(fast_by_turn[i], ner_results.get(i, []))
+        results.sort(key=lambda r: r.start)
+
         for result in results:
             original = turn.text[result.start : result.end]
             entity_type = result.entity_type
             confidence = result.score
 
             # Determine replacement token
-            if participant_name and original.lower() == participant_name.lower():
+            if isinstance(result, FastResult) and result.token:
+                token = result.token
+            elif participant_name and original.lower() == participant_name.lower():
                 token = "[PARTICIPANT]"
             elif interviewer_name and original.lower() == interviewer_name.lower():
                 token = "[INTERVIEWER]"
@@ -110,6 +185,9 @@ def scan_turns_for_pii(
                 )
             )
 
+    if turns:
+        metrics.pii_scan_seconds_per_turn.observe((time.perf_counter() - start) / len(turns))
+        metrics.pii_scanned_turns.inc(len(turns))
     return detections
 
 
@@ -0,0 +1,297 @@
+"""Offline bulk processing of a project through Message Batches.
+
+A bulk run organises every anonymised session against the locked guide
+and extracts themes from every organised session, like the per-session
+endpoints, but as Message Batches: answered within hours instead of
+seconds, at half the price and outside the per-minute rate limits.
+
+Theme extraction reads the organised transcript, so a run is two
+batches in sequence: an organise batch, then a themes batch for the
+sessions it organised. Each batch is persisted as a ``BatchJob`` so a
+restarted server resumes polling (see ``resume``).
+
+Requests are not stored with the job. When a batch ends, each session's
+plan is rebuilt from the store and matched to its results by custom id,
+``{session_id}-{request index}``. Planning depends on settings (context
+size, routed max_tokens), so the job keeps a digest of every request
+and a result is only used if the rebuilt request has the same digest.
+Results that cannot be used fall back to direct calls (see
+``batches.resolve``).
+
+With several workers, each pending job is polled by whichever worker
+holds its lease (``store.claim_batch_job``); a job whose worker stops
+is taken over by the next worker to start once the lease lapses.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.agents import batches
+from app.agents.scheduler import Priority, priority
+from app.agents.structured import JsonRequest
+from app.agents.theme_extractor import ThemePlan, finish_themes, plan_themes
+from app.agents.transcript_organiser import OrganisePlan, finish_organise, plan_organise
+from app.config import settings
+from app.db import store
+from app.models.batch import BatchJob, BatchStage, BatchStatus
+from app.models.project import Project
+from app.models.session import SessionStatus
+from app.services.usage import attribute, check_budget
+
+logger = logging.getLogger(__name__)
+
+# Polling tasks, kept referenced until they finish
+_tasks: set[asyncio.Task] = set()
+
+# Identifies this process in batch job leases
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class BulkRunInProgressError(Exception):
+    def __init__(self, job: BatchJob):
+        super().__init__(f"A bulk run is already waiting on batch {job.batch_id}")
+        self.job = job
+
+
+def _custom_id(session_id: str, index: int) -> str:
+    return f"{session_id}-{index}"
+
+
+def _digest(request: JsonRequest) -> str:
+    return hashlib.sha256(request.user_content.encode("utf-8")).hexdigest()
+
+
+def _claim(job: BatchJob) -> bool:
+    """Take or renew this worker's lease on ``job``."""
+    until = datetime.now(timezone.utc) + timedelta(seconds=settings.batch_poll_seconds + settings.batch_lease_seconds)
+    if not store.claim_batch_job(job.batch_id, WORKER_ID, until):
+        return False
+    job.claimed_by, job.lease_until = WORKER_ID, until
+    return True
+
+
+def _plans(project_id: str, stage: BatchStage, session_ids: set[str] | None = None) -> list[OrganisePlan | ThemePlan]:
+    """Plans for the project's sessions ready for ``stage``, optionally
+    limited to ``session_ids``."""
+    sessions = [
+        s for s in store.list_sessions(project_id) if session_ids is None or s.session_id in session_ids
+    ]
+    if stage == BatchStage.ORGANISE:
+        guide = store.get_guide(project_id)
+        if not guide or not guide.locked:
+            return []
+        return [
+            plan_organise(s.transcript, guide, s.session_id, s.participant_id)
+            for s in sessions
+            if s.status == SessionStatus.ANONYMISED
+        ]
+    return [
+        plan_themes(s.organised, s.session_id, s.participant_id)
+        for s in sessions
+        if s.status == SessionStatus.ORGANISED and s.organised
+    ]
+
+
+def _save(stage: BatchStage, plan: OrganisePlan | ThemePlan, results: list) -> None:
+    if stage == BatchStage.ORGANISE:
+        session = store.get_session(plan.session_id)
+        session.organised = finish_organise(plan, results)
+        session.status = SessionStatus.ORGANISED
+        store.update_session(session)
+    else:
+        store.save_themes(plan.session_id, finish_themes(plan, results))
+
+
+async def _submit(project_id: str, stage: BatchStage) -> BatchJob | None:
+    """Submit a batch for every session ready for ``stage``. Sessions
+    that need no Claude call are finished here; returns None if no
+    session needed one."""
+    plans = _plans(project_id, stage)
+    requests: dict[str, JsonRequest] = {}
+    for plan in plans:
+        if not plan.requests:
+            _save(stage, plan, [])
+        for i, request in enumerate(plan.requests):
+            requests[_custom_id(plan.session_id, i)] = request
+    if not requests:
+        return None
+
+    batch_id = await batches.submit(requests)
+    job = BatchJob(
+        batch_id=batch_id,
+        project_id=project_id,
+        stage=stage,
+        session_ids=[p.session_id for p in plans if p.requests],
+        request_count=len(requests),
+        request_digests={custom_id: _digest(r) for custom_id, r in requests.items()},
+        claimed_by=WORKER_ID,
+        lease_until=datetime.now(timezone.utc) + timedelta(seconds=settings.batch_lease_seconds),
+    )
+    store.save_batch_job(job)
+    return job
+
+
+async def start(project: Project) -> BatchJob:
+    """Submit the first batch of a bulk run: organising if any session
+    is anonymised and the guide is locked, otherwise theme extraction.
+
+    Raises ``BulkRunInProgressError`` if the project already has a batch
+    processing and ``ValueError`` if no session is ready for either.
+    """
+    pending = [j for j in store.list_batch_jobs(project.project_id) if j.status == BatchStatus.SUBMITTED]
+    if pending:
+        raise BulkRunInProgressError(pending[0])
+    check_budget(project)
+    for stage in BatchStage:
+        job = await _submit(project.project_id, stage)
+        if job is not None:
+            return job
+    raise ValueError("No sessions to process: anonymise sessions and lock the guide, or organise sessions first")
+
+
+STAGE_AGENTS = {
+    BatchStage.ORGANISE: "transcript_organiser",
+    BatchStage.EXTRACT_THEMES: "theme_extractor",
+}
+
+
+async def _resolve(job: BatchJob, results: dict, custom_id: str, request: JsonRequest):
+    """Resolve ``request`` from the result sent under ``custom_id``,
+    unless the request now planned there is not the one that was sent."""
+    stale = job.request_digests.get(custom_id) != _digest(request)
+    if stale:
+        logger.warning("Batch %s: request %s changed since submission", job.batch_id, custom_id)
+    return await batches.resolve(request, results.pop(custom_id, None), stale=stale)
+
+
+async def _finish(job: BatchJob) -> bool:
+    """Resolve and save an ended batch's results, session by session.
+    Returns False if another worker took the job over meanwhile."""
+    results = {custom_id: result async for custom_id, result in batches.results(job.batch_id)}
+    plans = _plans(job.project_id, job.stage, set(job.session_ids))
+    moved_on = set(job.session_ids) - {p.session_id for p in plans}
+    if moved_on:
+        logger.info("Batch %s: sessions no longer awaiting %s: %s", job.batch_id, job.stage.value, sorted(moved_on))
+
+    # Fallback calls queue behind interactive ones
+    with priority(Priority.BULK):
+        for plan in plans:
+            if not _claim(job):
+                logger.warning("Batch %s: lease lost to another worker; stopping", job.batch_id)
+                return False
+            try:
+                with attribute(job.project_id, plan.session_id):
+                    resolved = await asyncio.gather(
+                        *(
+                            _resolve(job, results, _custom_id(plan.session_id, i), request)
+                            for i, request in enumerate(plan.requests)
+                        )
+                    )
+                job.fallback_requests += sum(fell_back for _, fell_back in resolved)
+                _save(job.stage, plan, [data for data, _ in resolved])
+            except Exception:
+                logger.exception("Batch %s: could not finish session %s", job.batch_id, plan.session_id)
+                job.failed_session_ids.append(plan.session_id)
+            else:
+                job.sessions_saved += 1
+
+    # Results left over because fewer chunks were planned were still
+    # billed. Those of sessions that moved on are skipped: they may have
+    # been booked already by a finish that was interrupted.
+    planned = {p.session_id for p in plans}
+    for custom_id, result in results.items():
+        session_id = custom_id.rsplit("-", 1)[0]
+        if session_id in planned:
+            with attribute(job.project_id, session_id):
+                batches.record_usage(STAGE_AGENTS[job.stage], result)
+
+    job.status = BatchStatus.COMPLETED
+    job.ended_at = datetime.now(timezone.utc)
+    store.save_batch_job(job)
+    logger.info(
+        "Batch %s %s: %d sessions saved, %d failed, %d requests re-run directly",
+        job.batch_id, job.stage.value, job.sessions_saved, len(job.failed_session_ids), job.fallback_requests,
+    )
+    return True
+
+
+async def advance(job: BatchJob) -> BatchJob | None:
+    """Check ``job``'s batch once and save its results if it has ended.
+
+    Returns the job to wait on next: ``job`` itself while it is still
+    processing, the themes batch submitted after an organise batch, or
+    None when the run is over (or another worker has taken it).
+    """
+    if not _claim(job):
+        logger.info("Batch %s is being polled by %s", job.batch_id, job.claimed_by or "another worker")
+        return None
+    try:
+        batch = await batches.retrieve(job.batch_id)
+    except Exception:
+        logger.warning("Could not check batch %s; will try again", job.batch_id, exc_info=True)
+        return job
+    if batch.processing_status != "ended":
+        return job
+
+    if not await _finish(job) or job.stage != BatchStage.ORGANISE:
+        return None
+    try:
+        return await _submit(job.project_id, BatchStage.EXTRACT_THEMES)
+    except Exception as e:
+        # The organise results are saved; only the follow-up failed
+        logger.exception("Could not submit the theme batch after batch %s", job.batch_id)
+        job.error = f"Theme batch not submitted: {type(e).__name__}: {e}"
+        store.save_batch_job(job)
+        return None
+
+
+async def run(job: BatchJob) -> None:
+    """Poll a bulk run from ``job`` until every batch has been saved."""
+    current: BatchJob | None = job
+    while current is not None:
+        try:
+            following = await advance(current)
+        except Exception as e:
+            logger.exception("Bulk run for project %s failed at batch %s", current.project_id, current.batch_id)
+            current.status = BatchStatus.FAILED
+            current.error = f"{type(e).__name__}: {e}"
+            current.ended_at = datetime.now(timezone.utc)
+            store.save_batch_job(current)
+            return
+        if following is current:
+            await asyncio.sleep(settings.batch_poll_seconds)
+        current = following
+
+
+def run_in_background(job: BatchJob) -> asyncio.Task:
+    """Poll ``job`` in a task that outlives the request that started it."""
+    task = asyncio.create_task(run(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def resume() -> None:
+    """Resume polling batches submitted before the server last stopped."""
+    try:
+        jobs = store.list_pending_batch_jobs()
+    except Exception:
+        logger.exception("Could not load pending batch jobs")
+        return
+    for job in jobs:
+        logger.info("Resuming bulk run for project %s at batch %s", job.project_id, job.batch_id)
+        run_in_background(job)
+
+
+async def shutdown() -> None:
+    """Stop polling; submitted jobs stay pending and resume on restart."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
@@ -0,0 +1,129 @@
+"""Parsing of many transcript uploads at once.
+
+Uploaded files (and the members of any zip archive among them) are
+expanded into a flat, ordered list and parsed in parallel on a process
+pool, so throughput scales with the number of cores rather than being
+bound by one interpreter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from app.config import settings
+from app.models.session import Turn
+from app.services.content_hash import content_hash
+from app.services.transcript_formats import parse_transcript
+
+TRANSCRIPT_SUFFIXES = {".md", ".markdown", ".txt", ".vtt", ".srt", ".json", ".jsonl"}
+
+# Guard against zip bombs
+MAX_ZIP_MEMBERS = 500
+
+
+@dataclass
+class PendingUpload:
+    """One transcript to parse, in upload order."""
+
+    filename: str
+    data: bytes = b""
+    error: str | None = None
+
+
+@dataclass
+class ParsedUpload:
+    filename: str
+    turns: list[Turn] = field(default_factory=list)
+    content_hash: str = ""
+    error: str | None = None
+
+
+def _is_transcript(name: str) -> bool:
+    path = PurePosixPath(name)
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower() in TRANSCRIPT_SUFFIXES
+
+
+def expand_uploads(files: list[tuple[str, bytes]]) -> list[PendingUpload]:
+    """Flatten uploads, replacing each zip archive by its transcripts.
+
+    Archive members keep their order within the archive; anything that
+    is not a transcript file is skipped.
+    """
+    max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    expanded: list[PendingUpload] = []
+    for filename, data in files:
+        if not filename.lower().endswith(".zip"):
+            expanded.append(PendingUpload(filename, data))
+            continue
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile:
+            expanded.append(PendingUpload(filename, error="Not a valid zip archive"))
+            continue
+        members = [m for m in archive.infolist() if not m.is_dir() and _is_transcript(m.filename)]
+        if len(members) > MAX_ZIP_MEMBERS:
+            expanded.append(PendingUpload(filename, error=f"Archive has more than {MAX_ZIP_MEMBERS} transcripts"))
+            continue
+        for member in members:
+            name = f"{filename}/{member.filename}"
+            # The header's size can lie, so cap what is actually inflated
+            data = b""
+            if member.file_size <= max_bytes:
+                try:
+                    with archive.open(member) as f:
+                        data = f.read(max_bytes + 1)
+                except (zipfile.BadZipFile, OSError, zlib.error) as e:
+                    expanded.append(PendingUpload(name, error=f"Could not read from archive: {e}"))
+                    continue
+            if member.file_size > max_bytes or len(data) > max_bytes:
+                expanded.append(PendingUpload(name, error="File too large"))
+            else:
+                expanded.append(PendingUpload(name, data))
+    return expanded
+
+
+def parse_upload(filename: str, data: bytes) -> ParsedUpload:
+    """Decode, hash and parse one transcript. Runs in a worker process."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return ParsedUpload(filename, error="File is not UTF-8 text")
+    try:
+        turns = parse_transcript(text, PurePosixPath(filename).name)
+    except ValueError as e:
+        return ParsedUpload(filename, error=f"Could not parse transcript: {e}")
+    if not turns:
+        return ParsedUpload(filename, error="Could not parse any turns from transcript")
+    return ParsedUpload(filename, turns=turns, content_hash=content_hash(text))
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.upload_workers or os.cpu_count())
+    return _pool
+
+
+async def parse_uploads(uploads: list[PendingUpload]) -> list[ParsedUpload]:
+    """Parse uploads in parallel, returning results in input order."""
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+
+    async def parse(upload: PendingUpload) -> ParsedUpload:
+        if upload.error:
+            return ParsedUpload(upload.filename, error=upload.error)
+        return await loop.run_in_executor(pool, parse_upload, upload.filename, upload.data)
+
+    return list(await asyncio.gather(*(parse(u) for u in uploads)))
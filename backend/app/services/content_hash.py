@@ -0,0 +1,38 @@
+"""Content hashing for upload deduplication.
+
+Uploads are hashed on normalised text so that a re-export of the same
+file (different line endings, trailing whitespace, a byte-order mark)
+is still recognised as a duplicate.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalise_upload(text: str) -> str:
+    text = unicodedata.normalize("NFC", text.lstrip("\ufeff"))
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return BLANK_LINES.sub("\n\n", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """sha256 of the normalised text."""
+    return hashlib.sha256(normalise_upload(text).encode("utf-8")).hexdigest()
+
+
+def guide_review_key(
+    guide_text: str,
+    project_name: str,
+    objective: str,
+    research_goals: list[str],
+) -> str:
+    """Hash of everything the guide reviewer sees, so a cached review is
+    only reused for an identical request."""
+    parts = [content_hash(guide_text), project_name.strip(), objective.strip(), *research_goals]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
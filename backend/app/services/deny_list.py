@@ -0,0 +1,103 @@
+"""Project deny-list redaction.
+
+A project's deny-list names the people, companies and products the team
+already knows will come up. The list is compiled into one Aho-Corasick
+automaton, so every turn is matched against every term in a single
+linear pass. Matching is whole-word and case-insensitive; overlapping
+matches resolve to the longest, leftmost term.
+
+Compiled matchers are cached per project and rebuilt only when the
+project's list changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass
+
+from app.models.project import DenyListEntry, Project
+from app.services.aho_corasick import Automaton
+
+WHITESPACE = re.compile(r"\s+")
+
+# Deny-list terms are explicit, so they are always auto-redacted
+DENY_LIST_CONFIDENCE = 1.0
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the string's length, so offsets in
+    the folded text are offsets in the original."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+@dataclass(frozen=True)
+class DenyListMatch:
+    start: int
+    end: int
+    entry: DenyListEntry
+
+
+class DenyListMatcher:
+    """Compiled deny-list for one project."""
+
+    def __init__(self, entries: list[DenyListEntry]):
+        terms: dict[str, DenyListEntry] = {}
+        for entry in entries:
+            term = _fold(WHITESPACE.sub(" ", entry.term.strip()))
+            if term:
+                terms.setdefault(term, entry)
+        self._entries = list(terms.values())
+        self._automaton = Automaton(terms)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find(self, text: str) -> list[DenyListMatch]:
+        """Non-overlapping whole-word matches, longest leftmost first."""
+        if not self._entries:
+            return []
+        matches = sorted(
+            self._automaton.iter_matches(_fold(text), whole_words=True),
+            key=lambda m: (m[0], -(m[1] - m[0])),
+        )
+        kept: list[DenyListMatch] = []
+        for start, end, pid in matches:
+            if kept and start < kept[-1].end:
+                continue
+            kept.append(DenyListMatch(start, end, self._entries[pid]))
+        return kept
+
+
+def _fingerprint(entries: list[DenyListEntry]) -> str:
+    payload = json.dumps([e.model_dump() for e in entries], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ── Per-project cache ────────────────────────────────────────
+
+_matchers: dict[str, tuple[str, DenyListMatcher]] = {}
+_lock = threading.Lock()
+
+
+def matcher_for(project: Project) -> DenyListMatcher | None:
+    """The project's compiled deny-list, or None if it is empty."""
+    if not project.deny_list:
+        return None
+    fingerprint = _fingerprint(project.deny_list)
+    with _lock:
+        cached = _matchers.get(project.project_id)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, DenyListMatcher(project.deny_list))
+            _matchers[project.project_id] = cached
+        return cached[1]
+
+
+def drop_matcher(project_id: str) -> None:
+    with _lock:
+        _matchers.pop(project_id, None)
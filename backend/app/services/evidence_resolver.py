@@ -0,0 +1,192 @@
+"""Local resolution of theme evidence references into verbatim quotes.
+
+The theme extractor returns evidence as a turn index plus either a
+character span or short start/end anchors copied from the turn. The
+quote text, timestamp and guide section are then taken from the
+organised transcript, so quotes are always verbatim.
+
+Anchors are matched exactly first, then on normalised text (case,
+punctuation and whitespace ignored), then fuzzily. The claimed turn is
+searched before its neighbours and finally the whole transcript, so a
+slightly wrong turn index is corrected. Evidence that cannot be found
+anywhere is kept but flagged as unresolved.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from app.models.session import OrganisedTranscript
+from app.models.theme import ThemeEvidence
+from app.services.search import OFF_SCRIPT
+
+SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+WORD = re.compile(r"[^\W_]+")
+APOSTROPHES = "'’"
+
+# A fuzzy candidate must share a contiguous block of at least this
+# fraction of the anchor, and the aligned window must score at least
+# FUZZY_MIN_RATIO overall
+FUZZY_MIN_BLOCK = 0.4
+FUZZY_MIN_RATIO = 0.85
+
+# Turns either side of the claimed index searched before the full scan
+NEIGHBOUR_WINDOW = 2
+
+
+@dataclass
+class SourceTurn:
+    turn_index: int
+    text: str
+    timestamp: str
+    section: str
+
+
+def source_turns(organised: OrganisedTranscript) -> dict[int, SourceTurn]:
+    """Index the turns of an organised transcript by turn index."""
+    turns: dict[int, SourceTurn] = {}
+    for mapping in organised.section_mappings:
+        for mt in mapping.mapped_turns:
+            turns[mt.turn_index] = SourceTurn(mt.turn_index, mt.text, mt.timestamp, mapping.section_name)
+    for t in organised.off_script_turns:
+        turns[t.turn_index] = SourceTurn(t.turn_index, t.text, t.timestamp, OFF_SCRIPT)
+    return turns
+
+
+def normalise(text: str) -> tuple[str, list[int]]:
+    """Lowercase alphanumerics with single spaces between words.
+
+    Returns the normalised string and, for each of its characters, the
+    offset of the originating character in ``text``.
+    """
+    chars: list[str] = []
+    offsets: list[int] = []
+    pending_space = False
+    for i, ch in enumerate(text):
+        if ch.isalnum():
+            if pending_space and chars:
+                chars.append(" ")
+                offsets.append(i)
+            chars.append(ch.lower())
+            offsets.append(i)
+            pending_space = False
+        elif ch not in APOSTROPHES:
+            pending_space = True
+    return "".join(chars), offsets
+
+
+def normalise_text(text: str) -> str:
+    """Same as ``normalise`` without the offsets, and much faster."""
+    for a in APOSTROPHES:
+        text = text.replace(a, "")
+    return " ".join(WORD.findall(text.lower()))
+
+
+def find_anchor(anchor: str, text: str, start: int = 0) -> tuple[int, int] | None:
+    """Locate ``anchor`` in ``text`` at or after ``start``.
+
+    Returns original-text (start, end) offsets, or None.
+    """
+    if not anchor:
+        return None
+    pos = text.find(anchor, start)
+    if pos >= 0:
+        return pos, pos + len(anchor)
+
+    norm_text, offsets = normalise(text)
+    norm_anchor, _ = normalise(anchor)
+    if not norm_anchor or not norm_text:
+        return None
+    norm_start = next((j for j, o in enumerate(offsets) if o >= start), len(offsets))
+
+    pos = norm_text.find(norm_anchor, norm_start)
+    if pos >= 0:
+        return offsets[pos], offsets[pos + len(norm_anchor) - 1] + 1
+
+    matcher = SequenceMatcher(None, norm_text, norm_anchor, autojunk=False)
+    match = matcher.find_longest_match(norm_start, len(norm_text), 0, len(norm_anchor))
+    if match.size < FUZZY_MIN_BLOCK * len(norm_anchor):
+        return None
+    # Align a window of the anchor's length on the longest common block
+    begin = max(match.a - match.b, norm_start)
+    end = min(begin + len(norm_anchor), len(norm_text))
+    if SequenceMatcher(None, norm_text[begin:end], norm_anchor).ratio() < FUZZY_MIN_RATIO:
+        return None
+    return offsets[begin], offsets[end - 1] + 1
+
+
+def _span_in(text: str, start_anchor: str, end_anchor: str) -> tuple[int, int] | None:
+    first = find_anchor(start_anchor, text)
+    if first is None:
+        return None
+    if end_anchor:
+        last = find_anchor(end_anchor, text, first[0])
+        if last is None:
+            return None
+        return first[0], last[1]
+    # No end anchor: run to the end of the sentence
+    m = SENTENCE_END.search(text, first[1])
+    return first[0], (m.end() if m else len(text))
+
+
+def _candidates(claimed: int, turns: dict[int, SourceTurn]) -> list[SourceTurn]:
+    near = [
+        claimed + d
+        for d in sorted(range(-NEIGHBOUR_WINDOW, NEIGHBOUR_WINDOW + 1), key=abs)
+        if claimed + d in turns
+    ]
+    rest = [i for i in turns if i not in near]
+    return [turns[i] for i in near + rest]
+
+
+def resolve_evidence(
+    ref: dict,
+    turns: dict[int, SourceTurn],
+    participant_id: str,
+) -> ThemeEvidence:
+    """Turn one evidence reference from the model into ThemeEvidence."""
+    claimed = ref.get("turn_index")
+    claimed = claimed if isinstance(claimed, int) else -1
+    start_anchor = (ref.get("start") or ref.get("quote") or "").strip()
+    end_anchor = (ref.get("end") or "").strip() if ref.get("start") else ""
+    question_id = ref.get("guide_question_id")
+
+    span = ref.get("span")
+    source = turns.get(claimed)
+    if (
+        source is not None
+        and isinstance(span, list)
+        and len(span) == 2
+        and all(isinstance(x, int) for x in span)
+        and 0 <= span[0] < span[1] <= len(source.text)
+    ):
+        return _evidence(source, span[0], span[1], participant_id, question_id)
+
+    for candidate in _candidates(claimed, turns):
+        found = _span_in(candidate.text, start_anchor, end_anchor)
+        if found:
+            return _evidence(candidate, *found, participant_id, question_id)
+
+    fallback = " … ".join(a for a in (start_anchor, end_anchor) if a)
+    return ThemeEvidence(
+        quote=fallback,
+        participant_id=participant_id,
+        turn_index=max(claimed, 0),
+        guide_question_id=question_id,
+        unresolved=True,
+    )
+
+
+def _evidence(
+    source: SourceTurn, start: int, end: int, participant_id: str, question_id: str | None
+) -> ThemeEvidence:
+    return ThemeEvidence(
+        quote=source.text[start:end].strip(),
+        participant_id=participant_id,
+        timestamp=source.timestamp,
+        turn_index=source.turn_index,
+        guide_section=source.section,
+        guide_question_id=question_id,
+    )
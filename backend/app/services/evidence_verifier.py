@@ -0,0 +1,198 @@
+"""Verification of theme evidence quotes against source transcripts.
+
+Every ``ThemeEvidence.quote`` should appear in the session's anonymised
+transcript at its ``turn_index``. Quotes are checked on normalised text
+(case, punctuation and whitespace ignored); a quote containing an
+ellipsis must have every fragment in the same turn.
+
+Quotes found at their claimed turn are confirmed with a plain substring
+check. The rest of a session's quotes are compiled into one
+Aho-Corasick automaton and located with a single scan of the whole
+transcript, so cost stays linear however many quotes need moving.
+Quotes that still are not found get a fuzzy search over turns sharing
+enough of their words. Turn indices, timestamps and sections are
+corrected in place; quotes that cannot be found anywhere are flagged
+as unresolved.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+from collections import defaultdict
+
+from app.models.session import Session
+from app.models.theme import SessionThemes, ThemeEvidence
+from app.models.verification import EvidenceMismatch, EvidenceStatus, VerificationReport
+from app.services.aho_corasick import Automaton
+from app.services.evidence_resolver import find_anchor, normalise_text, source_turns
+from app.services.search import tokenise
+
+ELLIPSIS = re.compile(r"…|\.\.\.|\[\.\.\.\]")
+
+# Share of a quote's words a turn must contain to be searched fuzzily
+FUZZY_WORD_OVERLAP = 0.5
+
+
+def _fragments(quote: str) -> list[str]:
+    frags = (normalise_text(part) for part in ELLIPSIS.split(quote))
+    return [f for f in frags if f]
+
+
+class _SessionText:
+    """Normalised turn texts of one session plus a concatenated corpus."""
+
+    def __init__(self, session: Session):
+        self.turns = session.transcript
+        self.position = {t.turn_index: i for i, t in enumerate(self.turns)}
+        self.norm = [normalise_text(t.text) for t in self.turns]
+        self._words: list[set[str]] | None = None
+        self.sections: dict[int, str] = {}
+        if session.organised:
+            self.sections = {i: s.section for i, s in source_turns(session.organised).items()}
+        self._corpus: str | None = None
+        self._starts: list[int] = []
+
+    @property
+    def corpus(self) -> str:
+        # Normalised text never contains a newline, so it is a safe separator
+        if self._corpus is None:
+            self._starts, offset = [], 0
+            for text in self.norm:
+                self._starts.append(offset)
+                offset += len(text) + 1
+            self._corpus = "\n".join(self.norm)
+        return self._corpus
+
+    @property
+    def words(self) -> list[set[str]]:
+        if self._words is None:
+            self._words = [set(tokenise(t.text)) for t in self.turns]
+        return self._words
+
+    def position_at(self, offset: int) -> int:
+        return bisect.bisect_right(self._starts, offset) - 1
+
+
+def _nearest(positions: set[int], claimed: int | None) -> int:
+    if claimed is None:
+        return min(positions)
+    return min(positions, key=lambda p: (abs(p - claimed), p))
+
+
+def _fuzzy_position(text: _SessionText, quote: str, frags: list[str], claimed: int | None) -> int | None:
+    words = set(tokenise(quote))
+    if not words:
+        return None
+    needed = FUZZY_WORD_OVERLAP * len(words)
+    candidates = [p for p, w in enumerate(text.words) if len(words & w) >= needed]
+    if claimed is not None:
+        candidates.sort(key=lambda p: abs(p - claimed))
+    longest = max(frags, key=len)
+    for p in candidates:
+        if find_anchor(longest, text.turns[p].text):
+            return p
+    return None
+
+
+def _relocate(evidence: ThemeEvidence, text: _SessionText, position: int) -> None:
+    turn = text.turns[position]
+    evidence.turn_index = turn.turn_index
+    evidence.timestamp = turn.timestamp
+    evidence.guide_section = text.sections.get(turn.turn_index, evidence.guide_section)
+
+
+def verify_session_themes(session: Session, themes: SessionThemes) -> VerificationReport:
+    """Verify and correct, in place, every evidence quote of one session."""
+    report = VerificationReport()
+    if not session.transcript:
+        return report
+    text = _SessionText(session)
+
+    pending: list[tuple[str, int, ThemeEvidence, list[str]]] = []
+    for theme in themes.themes:
+        for i, evidence in enumerate(theme.evidence):
+            frags = _fragments(evidence.quote)
+            if not frags:
+                continue
+            report.checked += 1
+            claimed = text.position.get(evidence.turn_index)
+            if claimed is not None and all(f in text.norm[claimed] for f in frags):
+                report.verified += 1
+                evidence.unresolved = False
+                _relocate(evidence, text, claimed)
+            else:
+                pending.append((theme.theme_id, i, evidence, frags))
+
+    if not pending:
+        return report
+
+    # One scan of the whole session for every fragment still unplaced
+    patterns = sorted({f for *_, frags in pending for f in frags})
+    pattern_ids = {f: pid for pid, f in enumerate(patterns)}
+    found: dict[int, set[int]] = defaultdict(set)
+    for start, _, pid in Automaton(patterns).iter_matches(text.corpus):
+        found[pid].add(text.position_at(start))
+
+    for theme_id, i, evidence, frags in pending:
+        claimed = text.position.get(evidence.turn_index)
+        positions = set.intersection(*(found.get(pattern_ids[f], set()) for f in frags))
+        if positions:
+            status = EvidenceStatus.CORRECTED
+            position: int | None = _nearest(positions, claimed)
+            report.corrected += 1
+        else:
+            position = _fuzzy_position(text, evidence.quote, frags, claimed)
+            if position is None:
+                status = EvidenceStatus.MISSING
+                report.missing += 1
+            else:
+                status = EvidenceStatus.FUZZY
+                report.fuzzy += 1
+
+        claimed_index = evidence.turn_index
+        evidence.unresolved = position is None
+        if position is not None:
+            _relocate(evidence, text, position)
+        report.mismatches.append(
+            EvidenceMismatch(
+                session_id=session.session_id,
+                participant_id=session.participant_id,
+                theme_id=theme_id,
+                evidence_index=i,
+                quote=evidence.quote,
+                status=status,
+                claimed_turn_index=claimed_index,
+                resolved_turn_index=evidence.turn_index if position is not None else None,
+            )
+        )
+    return report
+
+
+def verify_project(
+    sessions: list[Session],
+    themes: list[SessionThemes],
+) -> tuple[VerificationReport, list[SessionThemes]]:
+    """Verify every session's themes in one pass.
+
+    Returns the combined report and the SessionThemes that were changed
+    and need saving.
+    """
+    by_id = {s.session_id: s for s in sessions}
+    report = VerificationReport()
+    changed: list[SessionThemes] = []
+    for st in themes:
+        session = by_id.get(st.session_id)
+        if session is None:
+            continue
+        before = st.model_dump()
+        r = verify_session_themes(session, st)
+        report.checked += r.checked
+        report.verified += r.verified
+        report.corrected += r.corrected
+        report.fuzzy += r.fuzzy
+        report.missing += r.missing
+        report.mismatches.extend(r.mismatches)
+        if st.model_dump() != before:
+            changed.append(st)
+    return report, changed
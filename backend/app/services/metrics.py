@@ -0,0 +1,362 @@
+"""In-process metrics in the Prometheus text format, plus opt-in trace spans.
+
+Counters, gauges and histograms are kept in plain dicts keyed by label
+values, so recording a sample is a lock and a few additions. The
+registry is rendered on demand at ``/api/metrics``.
+
+With ``settings.trace_spans`` on, ``span()`` logs one line per timed
+stage to the ``app.trace`` logger, tagged with the request's trace id.
+Requests under ``/sessions/{session_id}/`` use the session id as trace
+id, so one session's upload, scan, organise and theme stages (and the
+LLM and store calls inside them) can be pulled together from the logs.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import logging
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from app.config import settings
+
+trace_logger = logging.getLogger("app.trace")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 250, 500, 1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 64_000, 128_000, 200_000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(_Metric):
+    """A gauge whose values are read from a callback at render time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self._read = read
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_number(self._read())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def count(self, **labels: str) -> int:
+        row = self._values.get(self._key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {_number(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {_number(row[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {_number(cumulative)}"
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(
+    Histogram("insight_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+)
+http_in_flight = registry.register(Gauge("insight_http_requests_in_flight", "HTTP requests being served."))
+llm_request_seconds = registry.register(
+    Histogram("insight_llm_request_duration_seconds", "Claude call latency by agent.", ("agent", "model"))
+)
+llm_input_tokens = registry.register(
+    Histogram("insight_llm_input_tokens", "Input tokens per Claude call.", ("agent",), TOKEN_BUCKETS)
+)
+llm_output_tokens = registry.register(
+    Histogram("insight_llm_output_tokens", "Output tokens per Claude call.", ("agent",), TOKEN_BUCKETS)
+)
+llm_in_flight = registry.register(Gauge("insight_llm_calls_in_flight", "Claude calls awaiting a response.", ("agent",)))
+llm_errors = registry.register(
+    Counter("insight_llm_errors_total", "Claude calls that raised, by error type.", ("agent", "error"))
+)
+llm_retries = registry.register(
+    Counter("insight_llm_retries_total", "Claude calls retried, by error status.", ("agent", "reason"))
+)
+llm_queue_seconds = registry.register(
+    Histogram("insight_llm_queue_seconds", "Time Claude calls waited for rate-limit admission.", ("priority",))
+)
+llm_routed_calls = registry.register(
+    Counter("insight_llm_routed_calls_total", "Structured agent calls by first-choice model.", ("agent", "model"))
+)
+llm_escalations = registry.register(
+    Counter(
+        "insight_llm_escalations_total",
+        "Structured agent calls retried on a stronger model, by reason.",
+        ("agent", "model", "escalated_to", "reason"),
+    )
+)
+llm_batch_results = registry.register(
+    Counter("insight_llm_batch_results_total", "Message Batch results by outcome.", ("agent", "result"))
+)
+llm_batch_fallbacks = registry.register(
+    Counter(
+        "insight_llm_batch_fallbacks_total",
+        "Message Batch requests re-run as direct calls, by reason.",
+        ("agent", "reason"),
+    )
+)
+llm_output_repairs = registry.register(
+    Counter(
+        "insight_llm_output_repairs_total",
+        "Claude responses continued after max_tokens, repaired or salvaged.",
+        ("agent", "kind"),
+    )
+)
+pii_scan_seconds_per_turn = registry.register(
+    Histogram(
+        "insight_pii_scan_seconds_per_turn",
+        "PII scan time divided by turns scanned, one sample per scan.",
+        buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+    )
+)
+pii_scanned_turns = registry.register(Counter("insight_pii_scanned_turns_total", "Turns scanned for PII."))
+store_call_seconds = registry.register(
+    Histogram("insight_store_call_duration_seconds", "Store call latency by function.", ("backend", "function"))
+)
+
+
+# ── Store instrumentation ────────────────────────────────────
+
+
+def instrument_store(namespace: dict, backend: str) -> None:
+    """Time every public function in a store module's namespace."""
+    for name, fn in list(namespace.items()):
+        if name.startswith("_") or not callable(fn) or not getattr(fn, "__module__", "").startswith("app.db"):
+            continue
+        namespace[name] = _timed_store_call(fn, name, backend)
+
+
+def _timed_store_call(fn: Callable, name: str, backend: str) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with span(f"store.{name}"):
+                return fn(*args, **kwargs)
+        finally:
+            store_call_seconds.observe(time.perf_counter() - start, backend=backend, function=name)
+
+    return wrapper
+
+
+# ── Trace spans ──────────────────────────────────────────────
+
+_trace_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("trace_id", default=None)
+_span_path: contextvars.ContextVar[str] = contextvars.ContextVar("span_path", default="")
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """Log the duration of a stage under the current trace, if tracing."""
+    trace_id = _trace_id.get()
+    if not settings.trace_spans or trace_id is None:
+        yield
+        return
+    parent = _span_path.get()
+    path = f"{parent}/{name}" if parent else name
+    token = _span_path.set(path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span_path.reset(token)
+        extra = "".join(f" {k}={v}" for k, v in attributes.items())
+        trace_logger.info(
+            "trace=%s span=%s duration_ms=%.2f%s", trace_id, path, (time.perf_counter() - start) * 1000, extra
+        )
+
+
+# ── HTTP middleware ──────────────────────────────────────────
+
+SESSION_PATH = re.compile(r"/sessions/([^/]+)/")
+
+
+def _route_template(scope) -> str:
+    """The matched route's template. Included routers do not expose
+    their prefix on the route, so the route's own template is used for
+    the end of the path and the prefix's parameters are put back left
+    to right, each in place of one path segment."""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    parts = scope["path"].split("/")
+    own = getattr(route, "path_format", "").strip("/")
+    tail = own.split("/") if own else []
+    head = parts[: len(parts) - len(tail)]
+    pending = [
+        (name, str(value)) for name, value in scope.get("path_params", {}).items() if f"{{{name}}}" not in tail
+    ]
+    for i, part in enumerate(head):
+        if pending and part == pending[0][1]:
+            head[i] = f"{{{pending.pop(0)[0]}}}"
+    return "/".join(head + tail)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template.
+
+    Routes are labelled by their template (``/api/projects/{project_id}``)
+    rather than the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        trace_token = None
+        if settings.trace_spans:
+            session = SESSION_PATH.search(scope["path"])
+            trace_id = session.group(1) if session else uuid.uuid4().hex[:16]
+            trace_token = _trace_id.set(trace_id)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            with span(f"{scope['method']} {scope['path']}"):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=str(status),
+            )
+            if trace_token is not None:
+                _trace_id.reset(trace_token)
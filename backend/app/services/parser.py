@@ -49,6 +49,19 @@ def _normalise_timestamp(ts: str) -> str:
     return f"{parts[0].zfill(2)}:{parts[1].zfill(2)}:{parts[2].zfill(2)}"
 
 
+def timestamp_to_seconds(ts: str) -> int | None:
+    """Convert "HH:MM:SS" or "MM:SS" to seconds. None if unparseable."""
+    try:
+        parts = [int(p) for p in ts.strip().split(":")]
+    except ValueError:
+        return None
+    if len(parts) == 2:
+        return parts[0] * 60 + parts[1]
+    if len(parts) == 3:
+        return parts[0] * 3600 + parts[1] * 60 + parts[2]
+    return None
+
+
 def _is_interviewer(speaker: str) -> bool:
     """Heuristic to detect interviewer speaker labels."""
     lower = speaker.lower().strip()
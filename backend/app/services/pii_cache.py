@@ -0,0 +1,99 @@
+"""Memoisation of PII analyzer results across turns, sessions and projects.
+
+Interviewers repeat the same questions and stock phrases in every
+session, and each repeat used to go through the full NER pipeline. The
+cache maps a hash of the normalised turn text plus the analyzer's
+entity configuration to the raw analyzer results, so a repeated turn is
+analysed once per process.
+
+Turn text is normalised by trimming surrounding whitespace only —
+anything more would change what NER sees. Results are stored relative
+to the trimmed text and shifted by the trimmed prefix on reuse.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """One analyzer hit, with offsets relative to the trimmed text."""
+
+    entity_type: str
+    start: int
+    end: int
+    score: float
+
+
+def cache_key(text: str, entities: list[str], language: str = "en", engine: str = "") -> str:
+    config = f"{engine}|{language}|{','.join(sorted(entities))}"
+    return hashlib.sha256(f"{config}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+def trim(text: str) -> tuple[str, int]:
+    """Return the trimmed text and the offset of its first character."""
+    stripped = text.lstrip()
+    lead = len(text) - len(stripped)
+    return stripped.rstrip(), lead
+
+
+class PiiResultCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, tuple[CachedResult, ...]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> tuple[CachedResult, ...] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, results: tuple[CachedResult, ...]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+pii_cache = PiiResultCache(settings.pii_cache_max_entries, settings.pii_cache_ttl_seconds)
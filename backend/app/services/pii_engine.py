@@ -0,0 +1,70 @@
+"""Construction of the Presidio analyzer from settings.
+
+Lets each deployment trade NER accuracy for throughput: the NLP engine
+(spaCy, Stanza or Hugging Face transformers), the spaCy model size and
+the set of enabled recognisers are all configurable. See
+``tests/test_pii_benchmark.py`` for turns/sec and precision/recall per
+tier.
+"""
+
+from __future__ import annotations
+
+from app.config import settings
+
+SPACY_MODELS = {
+    "sm": "en_core_web_sm",
+    "md": "en_core_web_md",
+    "lg": "en_core_web_lg",
+    "trf": "en_core_web_trf",
+}
+NLP_ENGINES = ("spacy", "stanza", "transformers")
+
+
+def engine_id(engine: str | None = None, size: str | None = None) -> str:
+    """Short identifier of an engine tier, e.g. ``spacy:lg``."""
+    engine = engine or settings.pii_nlp_engine
+    if engine == "spacy":
+        return f"spacy:{size or settings.pii_model_size}"
+    if engine == "transformers":
+        return f"transformers:{settings.pii_transformers_model}"
+    return engine
+
+
+def nlp_configuration(engine: str | None = None, size: str | None = None) -> dict:
+    """Presidio NlpEngineProvider configuration for an engine tier."""
+    engine = engine or settings.pii_nlp_engine
+    size = size or settings.pii_model_size
+    if engine not in NLP_ENGINES:
+        raise ValueError(f"Unknown NLP engine {engine!r}; expected one of {NLP_ENGINES}")
+    if engine == "spacy":
+        if size not in SPACY_MODELS:
+            raise ValueError(f"Unknown spaCy model size {size!r}; expected one of {tuple(SPACY_MODELS)}")
+        model_name = SPACY_MODELS[size]
+    elif engine == "stanza":
+        model_name = "en"
+    else:
+        model_name = {"spacy": SPACY_MODELS["sm"], "transformers": settings.pii_transformers_model}
+    return {
+        "nlp_engine_name": engine,
+        "models": [{"lang_code": "en", "model_name": model_name}],
+    }
+
+
+def build_analyzer(
+    engine: str | None = None,
+    size: str | None = None,
+    recognisers: list[str] | None = None,
+):
+    """Build a batch analyzer for the configured (or given) tier."""
+    from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+
+    nlp_engine = NlpEngineProvider(nlp_configuration=nlp_configuration(engine, size)).create_engine()
+    analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
+
+    keep = settings.pii_recognisers if recognisers is None else recognisers
+    if keep:
+        for recogniser in list(analyzer.registry.recognizers):
+            if recogniser.name not in keep:
+                analyzer.registry.remove_recognizer(recogniser.name)
+    return BatchAnalyzerEngine(analyzer_engine=analyzer)
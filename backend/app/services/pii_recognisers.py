@@ -0,0 +1,165 @@
+"""Fast PII recognisers that run before the NER model.
+
+Tier 1 finds pattern-detectable PII without any model: email
+addresses (regex), phone numbers (the ``phonenumbers`` validator that
+Presidio itself uses) and the names the caller already knows.
+
+Tier 2 is a pre-filter deciding whether a turn could contain a name,
+place or organisation at all. NER entities are capitalised in
+transcripts, so a turn whose only capitalised words are common
+sentence openers ("Yeah, so I think…") is skipped.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+import phonenumbers
+
+EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b")
+# A run of digits and separators long enough to be worth validating
+PHONE_CANDIDATE = re.compile(r"\+?\(?\d[\d\s().-]{5,}\d")
+
+# Same regions and scores as Presidio's default recognisers, so output
+# does not change when a turn is handled here rather than by Presidio
+PHONE_REGIONS = ("US", "GB", "DE", "FR", "IL", "IN", "CA", "BR")
+EMAIL_SCORE = 1.0
+PHONE_SCORE = 0.4
+# Below the auto-redact threshold: a known name is scored by the NER
+# model when it finds the same span (as before tiering), and otherwise
+# left for the researcher to confirm
+KNOWN_NAME_SCORE = 0.6
+
+# Fewest digits a phone number can have
+MIN_PHONE_DIGITS = 7
+
+CAPITALISED = re.compile(r"\b[A-Z][\w'’-]*")
+SENTENCE_END = ".!?…\n"
+OPENING_PUNCTUATION = " \t\"'“‘(-–—"
+
+# Words that are routinely capitalised without being an entity
+COMMON_CAPITALISED = frozenset(
+    "i i'm i've i'd i'll i’m i’ve i’d i’ll ok okay".split()
+)
+COMMON_OPENERS = frozenset(
+    "a about actually after again all also although and any anyway are as at "
+    "basically be because before both but by can could did do does don't "
+    "each either even every exactly first for from generally good great had "
+    "has have he her here hi hm hmm honestly how however if in is it it's "
+    "just kind let let's like maybe me mostly mm mhm my no not now of oh "
+    "on once one only or other our probably quite really right she should "
+    "since so some sometimes sorry sure thank thanks that that's the their "
+    "then there there's these they they're think this those though to "
+    "totally uh um until usually very we we're well what what's when "
+    "where which while who why will with would yeah yep yes you you're "
+    "your".split()
+)
+
+
+@dataclass(frozen=True)
+class FastResult:
+    entity_type: str
+    start: int
+    end: int
+    score: float
+    # Replacement token override for names the caller supplied
+    token: str | None = None
+
+
+@dataclass(frozen=True)
+class KnownNames:
+    """Caller-supplied names compiled into one pattern."""
+
+    pattern: re.Pattern[str]
+    tokens: dict[str, str]
+
+
+def compile_names(names: dict[str, str | None]) -> KnownNames | None:
+    """Compile {token: name} into a whole-word, case-insensitive matcher."""
+    tokens = {n.strip().lower(): t for t, n in names.items() if n and n.strip()}
+    if not tokens:
+        return None
+    alternatives = sorted(tokens, key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<!\w)(?:" + "|".join(re.escape(n) for n in alternatives) + r")(?!\w)",
+        re.IGNORECASE,
+    )
+    return KnownNames(pattern, tokens)
+
+
+@lru_cache(maxsize=4096)
+def _phones(text: str) -> tuple[FastResult, ...]:
+    if not any(
+        sum(c.isdigit() for c in m.group()) >= MIN_PHONE_DIGITS
+        for m in PHONE_CANDIDATE.finditer(text)
+    ):
+        return ()
+    spans: dict[tuple[int, int], FastResult] = {}
+    for region in PHONE_REGIONS:
+        for match in phonenumbers.PhoneNumberMatcher(text, region, leniency=phonenumbers.Leniency.VALID):
+            spans.setdefault(
+                (match.start, match.end),
+                FastResult("PHONE_NUMBER", match.start, match.end, PHONE_SCORE),
+            )
+    return tuple(spans.values())
+
+
+def fast_results(text: str, names: KnownNames | None = None) -> list[FastResult]:
+    """Tier 1: emails, phone numbers and known names."""
+    results = [FastResult("EMAIL_ADDRESS", m.start(), m.end(), EMAIL_SCORE) for m in EMAIL.finditer(text)]
+    results.extend(_phones(text))
+    if names is not None:
+        for m in names.pattern.finditer(text):
+            token = names.tokens[m.group().lower()]
+            results.append(FastResult("PERSON", m.start(), m.end(), KNOWN_NAME_SCORE, token))
+    return results
+
+
+def _at_sentence_start(text: str, i: int) -> bool:
+    before = text[:i].rstrip(OPENING_PUNCTUATION)
+    return not before or before[-1] in SENTENCE_END
+
+
+def needs_ner(text: str) -> bool:
+    """Tier 2: could this turn contain a person, place or organisation?"""
+    for m in CAPITALISED.finditer(text):
+        word = m.group().lower()
+        if word in COMMON_CAPITALISED:
+            continue
+        if word in COMMON_OPENERS and _at_sentence_start(text, m.start()):
+            continue
+        return True
+    return False
+
+
+def overlaps(start: int, end: int, spans: list[FastResult]) -> bool:
+    return any(start < s.end and s.start < end for s in spans)
+
+
+def merge_ner(fast: list[FastResult], ner: list) -> list:
+    """Combine fast-tier and NER spans without losing coverage.
+
+    An NER span inside the fast spans it overlaps is dropped, except that
+    one matching a span of the same type exactly lends it its score. An
+    NER span reaching past them ("Jane Doe" around a known "Jane") is
+    widened to cover them and replaces them, so no part of either is
+    left unredacted.
+    """
+    merged: list = list(fast)
+    for r in ner:
+        hits = [f for f in merged if overlaps(r.start, r.end, [f])]
+        if not hits:
+            merged.append(r)
+            continue
+        inside = next((h for h in hits if h.start <= r.start and r.end <= h.end), None)
+        if inside is not None:
+            if (inside.start, inside.end, inside.entity_type) == (r.start, r.end, r.entity_type):
+                merged[merged.index(inside)] = replace(inside, score=max(inside.score, r.score))
+            continue
+        start = min(r.start, *(h.start for h in hits))
+        end = max(r.end, *(h.end for h in hits))
+        merged = [f for f in merged if not any(f is h for h in hits)]
+        merged.append(FastResult(r.entity_type, start, end, max(r.score, *(h.score for h in hits))))
+    return merged
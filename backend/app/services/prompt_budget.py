@@ -0,0 +1,208 @@
+"""Prompt budgeting and compaction for agent inputs.
+
+Provides a cheap local token estimator, compaction passes over
+transcript turns, and a planner that decides whether an agent call
+fits in one request or has to be split into chunks.
+
+Compaction passes:
+  - drop empty acknowledgements ("Okay.", "Mm-hmm") — all of them from
+    the interviewer, only non-lexical backchannels from the participant
+  - shorten interviewer turns that restate a guide question to a
+    reference such as "[asks Q03]"
+  - merge consecutive same-speaker turns into one line listing every
+    original turn index
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+
+from app.config import settings
+from app.models.guide import ResearchGuide
+from app.models.session import Turn
+from app.services.search import tokenise
+
+# Rough characters per token for English prose. Deliberately a little
+# low so estimates err on the side of over-counting.
+CHARS_PER_TOKEN = 3.5
+
+# Fraction of the remaining context window a single chunk may use
+CHUNK_FILL = 0.8
+
+ACKNOWLEDGEMENT = re.compile(
+    r"^(?:ok(?:ay)?|right|sure|yeah|yes|yep|great|cool|got it|i see|"
+    r"thanks?(?: you)?|perfect|nice|mm+-?hm+|m+hm+|uh-?huh|hmm+|ah+|oh)"
+    r"[\s,.!?]*(?:(?:ok(?:ay)?|right|yeah|great|thanks?)[\s,.!?]*)*$",
+    re.IGNORECASE,
+)
+BACKCHANNEL = re.compile(r"^(?:mm+-?hm+|m+hm+|uh-?huh|hmm+|mm+)[\s,.!?]*$", re.IGNORECASE)
+
+# Token overlap with a guide question above which an interviewer turn
+# is replaced by a reference to that question
+QUESTION_MATCH_THRESHOLD = 0.6
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate Claude tokens for a piece of text without a tokenizer."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# ── Compaction ───────────────────────────────────────────────
+
+@dataclass
+class CompactTurn:
+    """One prompt line, possibly covering several original turns."""
+
+    turn_indices: list[int]
+    text: str
+    timestamp: str = ""
+    is_interviewer: bool = False
+
+    @property
+    def turn_index(self) -> int:
+        return self.turn_indices[0]
+
+
+def is_acknowledgement(text: str, is_interviewer: bool) -> bool:
+    pattern = ACKNOWLEDGEMENT if is_interviewer else BACKCHANNEL
+    return bool(pattern.match(text.strip()))
+
+
+def _question_ref(text: str, questions: dict[str, set[str]]) -> str | None:
+    words = set(tokenise(text))
+    if not words:
+        return None
+    best_id, best = None, 0.0
+    for qid, qwords in questions.items():
+        if not qwords:
+            continue
+        # Share of the question's words the interviewer actually said
+        score = len(words & qwords) / len(qwords)
+        if score > best:
+            best_id, best = qid, score
+    return best_id if best >= QUESTION_MATCH_THRESHOLD else None
+
+
+def compact_turns(turns: list[Turn], guide: ResearchGuide | None = None) -> list[CompactTurn]:
+    """Apply all compaction passes. Order of turns is preserved."""
+    questions = {}
+    if guide:
+        questions = {
+            q.question_id: set(tokenise(q.question_text))
+            for s in guide.sections
+            for q in s.questions
+        }
+
+    compact: list[CompactTurn] = []
+    for turn in turns:
+        if is_acknowledgement(turn.text, turn.is_interviewer):
+            continue
+
+        text = turn.text
+        if turn.is_interviewer and questions:
+            ref = _question_ref(text, questions)
+            if ref:
+                text = f"[asks {ref}]"
+
+        prev = compact[-1] if compact else None
+        if prev is not None and prev.is_interviewer == turn.is_interviewer:
+            prev.turn_indices.append(turn.turn_index)
+            prev.text = f"{prev.text} {text}"
+            continue
+
+        compact.append(
+            CompactTurn(
+                turn_indices=[turn.turn_index],
+                text=text,
+                timestamp=turn.timestamp,
+                is_interviewer=turn.is_interviewer,
+            )
+        )
+    return compact
+
+
+def format_compact_turns(compact: list[CompactTurn]) -> str:
+    """Render compacted turns; merged lines list all their turn indices."""
+    parts = []
+    for ct in compact:
+        role = "INTERVIEWER" if ct.is_interviewer else "PARTICIPANT"
+        ts = f"[{ct.timestamp}] " if ct.timestamp else ""
+        if len(ct.turn_indices) == 1:
+            ref = f"turn {ct.turn_index}"
+        else:
+            ref = "turns " + ", ".join(str(i) for i in ct.turn_indices)
+        parts.append(f"{ts}{role} ({ref}): {ct.text}")
+    return "\n".join(parts)
+
+
+def expansion_map(compact: list[CompactTurn]) -> dict[int, list[int]]:
+    """Map each merged line's first turn index to every index it covers."""
+    return {ct.turn_index: ct.turn_indices for ct in compact if len(ct.turn_indices) > 1}
+
+
+# ── Planning ─────────────────────────────────────────────────
+
+@dataclass
+class CallPlan:
+    estimated_input_tokens: int
+    expected_output_tokens: int
+    max_output_tokens: int
+    chunks: int
+
+    @property
+    def chunked(self) -> bool:
+        return self.chunks > 1
+
+
+def plan_call(
+    fixed_text: str,
+    variable_text: str,
+    max_output_tokens: int,
+    expected_output_tokens: int = 0,
+    context_tokens: int | None = None,
+) -> CallPlan:
+    """Decide between single-shot and chunked execution.
+
+    ``fixed_text`` (system prompt, guide) is repeated in every chunk;
+    ``variable_text`` (transcript) is what gets split. A call is chunked
+    if the input would overflow the context window or the expected
+    output would not fit in ``max_output_tokens``.
+    """
+    context = context_tokens or settings.claude_context_tokens
+    fixed = estimate_tokens(fixed_text)
+    variable = estimate_tokens(variable_text)
+
+    input_budget = max((context - max_output_tokens - fixed) * CHUNK_FILL, 1)
+    output_budget = max_output_tokens * CHUNK_FILL
+    chunks = max(
+        1,
+        math.ceil(variable / input_budget),
+        math.ceil(expected_output_tokens / output_budget),
+    )
+    return CallPlan(
+        estimated_input_tokens=fixed + variable,
+        expected_output_tokens=expected_output_tokens,
+        max_output_tokens=max_output_tokens,
+        chunks=chunks,
+    )
+
+
+def split_evenly(sizes: list[int], chunks: int) -> list[list[int]]:
+    """Split item indices into at most ``chunks`` contiguous groups of
+    roughly equal total size."""
+    if chunks <= 1 or len(sizes) <= 1:
+        return [list(range(len(sizes)))] if sizes else []
+    target = sum(sizes) / chunks
+    groups: list[list[int]] = [[]]
+    running = 0
+    for i, size in enumerate(sizes):
+        if groups[-1] and running + size > target and len(groups) < chunks:
+            groups.append([])
+            running = 0
+        groups[-1].append(i)
+        running += size
+    return groups
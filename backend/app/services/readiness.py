@@ -0,0 +1,106 @@
+"""Startup warm-ups and the readiness state behind ``/api/ready``.
+
+``/api/health`` only says the process is up. Loading the NER model,
+connecting to the store and building the Claude client are slow the
+first time, so they run once at startup in worker threads, and
+``/api/ready`` reports ready only after every warm-up named in
+``settings.startup_warmups`` has succeeded. A failed warm-up (the store
+unreachable at boot, say) is retried with backoff until it succeeds;
+meanwhile the report says "failed".
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from enum import Enum
+
+from app.agents import llm
+from app.config import settings
+from app.db import store
+from app.services import anonymiser
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState(str, Enum):
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
+@dataclass
+class WarmupStatus:
+    state: WarmupState = WarmupState.PENDING
+    seconds: float | None = None
+    error: str | None = None
+    attempts: int = 0
+
+
+# Backoff between attempts of a failed warm-up, doubling up to the cap
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+# Looked up at call time so test doubles patched in later are used
+WARMUPS: dict[str, Callable[[], object]] = {
+    "analyzer": lambda: anonymiser._get_analyzer(),
+    "store": lambda: store.ping(),
+    "llm": lambda: llm.get_client(),
+}
+
+_status: dict[str, WarmupStatus] = {}
+_started = False
+
+
+async def _run(name: str) -> None:
+    status = _status[name]
+    warmup = WARMUPS.get(name)
+    if warmup is None:
+        status.state, status.error = WarmupState.FAILED, f"Unknown warm-up {name!r}"
+        logger.error("Unknown warm-up %r; expected one of %s", name, sorted(WARMUPS))
+        return
+    while True:
+        status.attempts += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(warmup)
+        except Exception as e:
+            status.state, status.error = WarmupState.FAILED, f"{type(e).__name__}: {e}"
+            status.seconds = round(time.perf_counter() - start, 3)
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (status.attempts - 1))
+            logger.exception("Warm-up %s failed (attempt %d); retrying in %.0fs", name, status.attempts, delay)
+            await asyncio.sleep(delay)
+            continue
+        status.state, status.error = WarmupState.READY, None
+        status.seconds = round(time.perf_counter() - start, 3)
+        logger.info("Warm-up %s ready in %.2fs (attempt %d)", name, status.seconds, status.attempts)
+        return
+
+
+async def run_warmups(names: list[str] | None = None) -> None:
+    """Run the warm-ups concurrently until each has succeeded, recording
+    their progress."""
+    global _started
+    names = settings.startup_warmups if names is None else names
+    _status.clear()
+    _status.update({name: WarmupStatus() for name in names})
+    _started = True
+    await asyncio.gather(*(_run(name) for name in names))
+
+
+def status() -> dict:
+    """"ready" once every warm-up has succeeded, "failed" while any has
+    failed (it is being retried), otherwise "starting"."""
+    warmups = {name: asdict(s) for name, s in _status.items()}
+    states = {s.state for s in _status.values()}
+    if _started and states <= {WarmupState.READY}:
+        overall = "ready"
+    elif WarmupState.FAILED in states:
+        overall = "failed"
+    else:
+        overall = "starting"
+    return {"status": overall, "warmups": warmups}
@@ -0,0 +1,335 @@
+"""Project-wide full-text search over anonymised transcripts and evidence.
+
+Keeps an in-process inverted index per project, ranked with BM25. An
+index is built from the store on the first query for a project and is
+then kept current by the store facade whenever ``update_session`` or
+``save_themes`` runs, so no external search service is needed.
+
+Only participant turns of anonymised sessions are indexed — raw
+uploads awaiting PII review never enter the index.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from app.models.search import (
+    FacetCount,
+    SearchFacets,
+    SearchHit,
+    SearchResponse,
+    SearchSource,
+)
+from app.models.session import Session, SessionStatus
+from app.models.theme import SessionThemes, ThemeStatus
+from app.services.parser import timestamp_to_seconds
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+REDACTION_TOKEN = re.compile(r"\[[A-Z_]+\]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have i if in into is it "
+    "its me my of on or so that the their them then there they this to was "
+    "we were what when which who will with you your".split()
+)
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+OFF_SCRIPT = "Off-script"
+TIMESTAMP_BUCKET_MINUTES = 10
+
+
+def tokenise(text: str) -> list[str]:
+    """Lowercase word tokens, ignoring stopwords and redaction tokens."""
+    text = REDACTION_TOKEN.sub(" ", text).lower()
+    return [t for t in TOKEN_PATTERN.findall(text) if t not in STOPWORDS]
+
+
+def _timestamp_bucket(seconds: int) -> str:
+    start = seconds // 60 // TIMESTAMP_BUCKET_MINUTES * TIMESTAMP_BUCKET_MINUTES
+    return f"{start}:00-{start + TIMESTAMP_BUCKET_MINUTES}:00"
+
+
+@dataclass
+class _Doc:
+    source: SearchSource
+    session_id: str
+    participant_id: str
+    turn_index: int
+    timestamp: str
+    seconds: int | None
+    section: str
+    text: str
+    length: int
+    theme_id: str | None = None
+    theme_name: str | None = None
+
+
+class ProjectIndex:
+    """Inverted index over one project's transcript turns and evidence."""
+
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self._docs: dict[int, _Doc] = {}
+        self._postings: dict[str, dict[int, int]] = {}
+        self._by_session: dict[tuple[str, SearchSource], list[int]] = {}
+        self._next_id = 0
+        self._total_length = 0
+
+    @property
+    def doc_count(self) -> int:
+        return len(self._docs)
+
+    # ── mutation ─────────────────────────────────────────────
+
+    def _add(self, doc: _Doc, tokens: list[str]) -> None:
+        doc_id = self._next_id
+        self._next_id += 1
+        self._docs[doc_id] = doc
+        self._total_length += doc.length
+        for term, tf in Counter(tokens).items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._by_session.setdefault((doc.session_id, doc.source), []).append(doc_id)
+
+    def _remove(self, session_id: str, source: SearchSource) -> None:
+        for doc_id in self._by_session.pop((session_id, source), []):
+            doc = self._docs.pop(doc_id)
+            self._total_length -= doc.length
+            for term in set(tokenise(doc.text)):
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def replace_session_turns(self, session: Session) -> None:
+        """Re-index the participant turns of one session."""
+        self._remove(session.session_id, SearchSource.TRANSCRIPT)
+        if session.status == SessionStatus.UPLOADED:
+            return
+
+        sections: dict[int, str] = {}
+        if session.organised:
+            for mapping in session.organised.section_mappings:
+                for mt in mapping.mapped_turns:
+                    sections[mt.turn_index] = mapping.section_name
+            for turn in session.organised.off_script_turns:
+                sections[turn.turn_index] = OFF_SCRIPT
+
+        for turn in session.transcript:
+            if turn.is_interviewer:
+                continue
+            tokens = tokenise(turn.text)
+            if not tokens:
+                continue
+            self._add(
+                _Doc(
+                    source=SearchSource.TRANSCRIPT,
+                    session_id=session.session_id,
+                    participant_id=session.participant_id,
+                    turn_index=turn.turn_index,
+                    timestamp=turn.timestamp,
+                    seconds=timestamp_to_seconds(turn.timestamp) if turn.timestamp else None,
+                    section=sections.get(turn.turn_index, ""),
+                    text=turn.text,
+                    length=len(tokens),
+                ),
+                tokens,
+            )
+
+    def replace_session_evidence(self, themes: SessionThemes) -> None:
+        """Re-index the evidence quotes of one session's themes."""
+        self._remove(themes.session_id, SearchSource.EVIDENCE)
+        for theme in themes.themes:
+            if theme.status == ThemeStatus.DISCARDED:
+                continue
+            for e in theme.evidence:
+                tokens = tokenise(e.quote)
+                if not tokens:
+                    continue
+                self._add(
+                    _Doc(
+                        source=SearchSource.EVIDENCE,
+                        session_id=themes.session_id,
+                        participant_id=e.participant_id or themes.participant_id,
+                        turn_index=e.turn_index,
+                        timestamp=e.timestamp,
+                        seconds=timestamp_to_seconds(e.timestamp) if e.timestamp else None,
+                        section=e.guide_section,
+                        text=e.quote,
+                        length=len(tokens),
+                        theme_id=theme.theme_id,
+                        theme_name=theme.theme_name,
+                    ),
+                    tokens,
+                )
+
+    def remove_session(self, session_id: str) -> None:
+        for source in SearchSource:
+            self._remove(session_id, source)
+
+    # ── query ────────────────────────────────────────────────
+
+    def search(
+        self,
+        query: str,
+        participant: str | None = None,
+        section: str | None = None,
+        ts_from: str | None = None,
+        ts_to: str | None = None,
+        source: SearchSource | None = None,
+        limit: int = 20,
+    ) -> SearchResponse:
+        """BM25-ranked search. Facet counts cover every filtered match."""
+        terms = set(tokenise(query))
+        if not terms or not self._docs:
+            return SearchResponse(query=query)
+
+        n_docs = len(self._docs)
+        avg_len = self._total_length / n_docs
+        from_s = timestamp_to_seconds(ts_from) if ts_from else None
+        to_s = timestamp_to_seconds(ts_to) if ts_to else None
+
+        scores: dict[int, float] = {}
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                doc = self._docs[doc_id]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc.length / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        matched: list[int] = []
+        for doc_id in scores:
+            doc = self._docs[doc_id]
+            if participant and doc.participant_id != participant:
+                continue
+            if section and doc.section != section:
+                continue
+            if source and doc.source != source:
+                continue
+            if from_s is not None or to_s is not None:
+                if doc.seconds is None:
+                    continue
+                if from_s is not None and doc.seconds < from_s:
+                    continue
+                if to_s is not None and doc.seconds > to_s:
+                    continue
+            matched.append(doc_id)
+
+        participants: Counter[str] = Counter()
+        sections: Counter[str] = Counter()
+        buckets: Counter[str] = Counter()
+        for doc_id in matched:
+            doc = self._docs[doc_id]
+            participants[doc.participant_id] += 1
+            if doc.section:
+                sections[doc.section] += 1
+            if doc.seconds is not None:
+                buckets[_timestamp_bucket(doc.seconds)] += 1
+
+        top = heapq.nlargest(limit, matched, key=scores.__getitem__)
+        hits = []
+        for doc_id in top:
+            doc = self._docs[doc_id]
+            hits.append(
+                SearchHit(
+                    source=doc.source,
+                    session_id=doc.session_id,
+                    participant_id=doc.participant_id,
+                    turn_index=doc.turn_index,
+                    timestamp=doc.timestamp,
+                    section=doc.section,
+                    text=doc.text,
+                    score=round(scores[doc_id], 4),
+                    theme_id=doc.theme_id,
+                    theme_name=doc.theme_name,
+                )
+            )
+
+        return SearchResponse(
+            query=query,
+            total=len(matched),
+            hits=hits,
+            facets=SearchFacets(
+                participant=_facet(participants, by_value=True),
+                section=_facet(sections),
+                timestamp=sorted(
+                    _facet(buckets), key=lambda f: int(f.value.split(":")[0])
+                ),
+            ),
+        )
+
+
+def _facet(counts: Counter[str], by_value: bool = False) -> list[FacetCount]:
+    items = sorted(counts.items()) if by_value else counts.most_common()
+    return [FacetCount(value=v, count=c) for v, c in items]
+
+
+# ── Per-project registry ─────────────────────────────────────
+
+_indexes: dict[str, ProjectIndex] = {}
+_session_projects: dict[str, str] = {}
+_lock = threading.RLock()
+
+
+def get_index(project_id: str) -> ProjectIndex | None:
+    return _indexes.get(project_id)
+
+
+def build_index(
+    project_id: str,
+    sessions: list[Session],
+    themes: list[SessionThemes],
+) -> ProjectIndex:
+    """Build (or rebuild) a project's index from stored data."""
+    index = ProjectIndex(project_id)
+    with _lock:
+        for session in sessions:
+            _session_projects[session.session_id] = project_id
+            index.replace_session_turns(session)
+        for st in themes:
+            index.replace_session_evidence(st)
+        _indexes[project_id] = index
+    return index
+
+
+def index_session(session: Session) -> None:
+    """Incrementally re-index a session, if its project is indexed.
+
+    Projects without an index are skipped — their index is built
+    from the store on first query and will include this write.
+    """
+    with _lock:
+        index = _indexes.get(session.project_id)
+        if index is None:
+            return
+        _session_projects[session.session_id] = session.project_id
+        index.replace_session_turns(session)
+
+
+def index_themes(themes: SessionThemes) -> None:
+    """Incrementally re-index a session's evidence, if its project is indexed."""
+    with _lock:
+        project_id = _session_projects.get(themes.session_id)
+        index = _indexes.get(project_id) if project_id else None
+        if index is None:
+            return
+        index.replace_session_evidence(themes)
+
+
+def drop_index(project_id: str) -> None:
+    with _lock:
+        _indexes.pop(project_id, None)
+        for sid in [s for s, p in _session_projects.items() if p == project_id]:
+            del _session_projects[sid]
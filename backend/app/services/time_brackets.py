@@ -0,0 +1,153 @@
+"""Deterministic pre-assignment of transcript turns to guide sections.
+
+Guide sections carry time brackets ("0:00-10:00") and parsed turns carry
+timestamps, so most participant turns can be placed without asking a
+model. Each timestamped participant turn inside a bracket is scored by
+its distance from the nearest bracket boundary; turns well inside a
+bracket are assigned locally. Turns that are near a boundary, have no
+timestamp, fall outside every bracket, or answer a question from a
+different section are left for the organiser agent to decide.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from app.models.guide import GuideSection, ResearchGuide
+from app.models.session import MappedTurn, Turn
+from app.services.parser import timestamp_to_seconds
+from app.services.search import tokenise
+
+BRACKET_SPLIT = re.compile(r"\s*[-–—]\s*|\s+to\s+")
+MINUTE_UNITS = re.compile(r"\s*(?:minutes|mins|min|m)\b\.?")
+
+# Turns closer than this to a bracket boundary are less certain
+BOUNDARY_MARGIN_SECONDS = 90
+
+# Minimum score for a local assignment to skip the model
+CONFIDENT_THRESHOLD = 0.8
+
+# How much better another section's questions must match the preceding
+# interviewer turn before a bracket assignment is treated as off-topic
+OFF_TOPIC_OVERLAP_MARGIN = 0.15
+
+
+def parse_time_bracket(bracket: str) -> tuple[int, int] | None:
+    """Parse "0:00-10:00", "5–15" or "00:05:00 to 00:15:00" into seconds.
+
+    Bare numbers are read as minutes. Returns None if unparseable.
+    """
+    cleaned = MINUTE_UNITS.sub("", bracket.lower()).strip()
+    parts = [p for p in BRACKET_SPLIT.split(cleaned) if p]
+    if len(parts) != 2:
+        return None
+
+    bounds = []
+    for part in parts:
+        if ":" in part:
+            seconds = timestamp_to_seconds(part)
+        elif part.isdigit():
+            seconds = int(part) * 60
+        else:
+            seconds = None
+        if seconds is None:
+            return None
+        bounds.append(seconds)
+
+    start, end = bounds
+    if end <= start:
+        return None
+    return start, end
+
+
+@dataclass
+class PreAssignment:
+    """Result of local section mapping for one transcript."""
+
+    # section_id -> turns assigned with high confidence
+    assigned: dict[str, list[MappedTurn]] = field(default_factory=dict)
+    # participant turns the model still has to place
+    ambiguous: list[Turn] = field(default_factory=list)
+
+    @property
+    def assigned_count(self) -> int:
+        return sum(len(v) for v in self.assigned.values())
+
+
+def _overlap(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _section_vocab(section: GuideSection) -> set[str]:
+    words: set[str] = set()
+    for q in section.questions:
+        words.update(tokenise(q.question_text))
+        for probe in q.probes:
+            words.update(tokenise(probe))
+    return words
+
+
+def boundary_confidence(seconds: int, start: int, end: int, first: bool) -> float:
+    """0.5 at a boundary rising to 0.95 once a margin inside the bracket.
+
+    The opening boundary of the first section is not a real boundary —
+    nothing can precede it.
+    """
+    distance = end - seconds
+    if not first:
+        distance = min(distance, seconds - start)
+    return 0.5 + 0.45 * min(distance / BOUNDARY_MARGIN_SECONDS, 1.0)
+
+
+def pre_assign_turns(turns: list[Turn], guide: ResearchGuide) -> PreAssignment:
+    """Assign confidently timestamped participant turns to guide sections."""
+    brackets: list[tuple[GuideSection, int, int]] = []
+    for section in guide.sections:
+        parsed = parse_time_bracket(section.time_bracket)
+        if parsed:
+            brackets.append((section, *parsed))
+    brackets.sort(key=lambda b: b[1])
+
+    vocab = {section.section_id: _section_vocab(section) for section, _, _ in brackets}
+    result = PreAssignment()
+    last_question: set[str] = set()
+
+    for turn in turns:
+        if turn.is_interviewer:
+            last_question = set(tokenise(turn.text))
+            continue
+
+        seconds = timestamp_to_seconds(turn.timestamp) if turn.timestamp else None
+        placed = None
+        if seconds is not None:
+            for i, (section, start, end) in enumerate(brackets):
+                if start <= seconds < end:
+                    placed = (section, boundary_confidence(seconds, start, end, i == 0))
+                    break
+
+        if placed is None or placed[1] < CONFIDENT_THRESHOLD:
+            result.ambiguous.append(turn)
+            continue
+
+        section, confidence = placed
+        if last_question:
+            own = _overlap(last_question, vocab[section.section_id])
+            best = max(_overlap(last_question, v) for v in vocab.values())
+            if best - own > OFF_TOPIC_OVERLAP_MARGIN:
+                result.ambiguous.append(turn)
+                continue
+
+        result.assigned.setdefault(section.section_id, []).append(
+            MappedTurn(
+                turn_index=turn.turn_index,
+                speaker=turn.speaker,
+                text=turn.text,
+                timestamp=turn.timestamp,
+                mapping_confidence=round(confidence, 2),
+            )
+        )
+
+    return result
@@ -0,0 +1,335 @@
+"""Transcript formats other than Askable markdown.
+
+Zoom and Teams export recordings as WebVTT or SRT captions, with one
+cue every few seconds, and transcription services emit JSON cue lists.
+Each format has a streaming parser that reads lines one at a time and
+yields cues; ``merge_cues`` folds consecutive cues labelled with the
+same speaker into one ``Turn``. Only the current cue and the current turn
+are held in memory, so cost stays constant with file size.
+
+``parse_transcript`` detects the format from the filename and the first
+few lines and dispatches to the registered parser.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import PurePosixPath
+
+from app.models.session import Turn
+from app.services.parser import (
+    _is_interviewer,
+    _normalise_timestamp,
+    parse_markdown_transcript,
+)
+
+
+class TranscriptFormat(str, Enum):
+    MARKDOWN = "markdown"
+    VTT = "vtt"
+    SRT = "srt"
+    JSON = "json"
+
+
+CUE_TIMING = re.compile(
+    r"^\s*((?:\d+:)?\d{1,2}:\d{2})(?:[.,]\d+)?\s*-->\s*((?:\d+:)?\d{1,2}:\d{2})(?:[.,]\d+)?"
+)
+# Teams: "<v Jane Doe>text</v>"
+VOICE_TAG = re.compile(r"^<v(?:\.[\w.-]+)?\s+([^>]+)>(.*?)(?:</v>)?$", re.DOTALL)
+# Zoom and most SRT exports: "Jane Doe: text"
+SPEAKER_PREFIX = re.compile(r"^([A-Za-z][A-Za-z0-9 .'_-]{0,60}?)\s*:\s+(.+)$", re.DOTALL)
+MARKUP_TAG = re.compile(r"</?[^>]+>")
+
+JSON_CUE_KEYS = ("cues", "segments", "utterances", "results")
+JSON_WHITESPACE = re.compile(r"\s*")
+
+DEFAULT_SPEAKER = "Speaker"
+
+# Byte-order mark some exporters put at the start of the file
+BOM = "\ufeff"
+
+# How many leading lines format detection looks at
+SNIFF_LINES = 5
+
+
+@dataclass(frozen=True)
+class Cue:
+    """One caption cue. ``speaker`` is None when the cue has no label."""
+
+    timestamp: str
+    speaker: str | None
+    text: str
+
+
+# ── Timestamps ───────────────────────────────────────────────
+
+
+def _cue_timestamp(raw: str | float) -> str:
+    """"01:02.500" / "00:01:02,500" / 62.5 → "00:01:02"."""
+    if isinstance(raw, (int, float)):
+        seconds = int(raw)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return _normalise_timestamp(re.split(r"[.,]", raw.strip(), maxsplit=1)[0])
+
+
+def _split_speaker(text: str) -> tuple[str | None, str]:
+    voice = VOICE_TAG.match(text)
+    if voice:
+        return voice.group(1).strip(), MARKUP_TAG.sub("", voice.group(2)).strip()
+    text = MARKUP_TAG.sub("", text).strip()
+    prefixed = SPEAKER_PREFIX.match(text)
+    if prefixed:
+        return prefixed.group(1).strip(), prefixed.group(2).strip()
+    return None, text
+
+
+# ── Cue parsers ──────────────────────────────────────────────
+
+
+def _iter_timed_blocks(lines: Iterable[str]) -> Iterator[Cue]:
+    """Shared VTT/SRT reader: a timing line, then payload lines up to a
+    blank line. Cue identifiers, SRT indices and VTT NOTE/STYLE blocks
+    carry no timing line and are skipped."""
+    timestamp: str | None = None
+    payload: list[str] = []
+
+    def cue() -> Cue | None:
+        text = " ".join(payload).strip()
+        if timestamp is None or not text:
+            return None
+        speaker, text = _split_speaker(text)
+        return Cue(timestamp, speaker, text) if text else None
+
+    for line in lines:
+        stripped = line.strip().lstrip(BOM)
+        if not stripped:
+            done = cue()
+            if done:
+                yield done
+            timestamp, payload = None, []
+            continue
+        if timestamp is None:
+            timing = CUE_TIMING.match(stripped)
+            if timing:
+                timestamp = _cue_timestamp(timing.group(1))
+            continue
+        payload.append(stripped)
+
+    done = cue()
+    if done:
+        yield done
+
+
+def iter_vtt_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    return _iter_timed_blocks(lines)
+
+
+def iter_srt_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    return _iter_timed_blocks(lines)
+
+
+def _json_cue(obj: dict) -> Cue | None:
+    text = str(obj.get("text") or obj.get("transcript") or "").strip()
+    if not text:
+        return None
+    speaker = obj.get("speaker") or obj.get("speaker_label") or obj.get("name")
+    start = obj.get("start", obj.get("start_time", obj.get("timestamp", "")))
+    if isinstance(start, bool) or not isinstance(start, (str, int, float)):
+        raise ValueError(f"Cue start must be a time or a number of seconds, not {start!r}")
+    if isinstance(start, str) and start.strip():
+        try:
+            start = float(start)
+        except ValueError:
+            pass
+    timestamp = _cue_timestamp(start) if start != "" else ""
+    if speaker is None:
+        speaker, text = _split_speaker(text)
+    return Cue(timestamp, str(speaker).strip() if speaker else None, text)
+
+
+def _iter_json_array(lines: Iterable[str]) -> Iterator[dict]:
+    """Decode a top-level JSON array one element at a time.
+
+    Decoding walks a position through the buffer, and the consumed
+    prefix is only dropped when the next line is appended, so a minified
+    array on a single line is still read in linear time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    for line in lines:
+        buffer = buffer[pos:] + line
+        pos = 0
+        while True:
+            pos = JSON_WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                pos, started = pos + 1, True
+                continue
+            if buffer[pos] == ",":
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                break
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # element continues on a later line
+            if isinstance(item, dict):
+                yield item
+    if buffer[pos:].strip() not in ("", "]"):
+        raise ValueError("Malformed JSON cue array")
+
+
+def iter_json_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """JSON cues: a top-level array, JSON Lines, or an object holding
+    the array under one of ``JSON_CUE_KEYS``."""
+    lines = iter(lines)
+    head: list[str] = []
+    for line in lines:
+        head.append(line)
+        if line.strip():
+            break
+    first = "".join(head).lstrip().lstrip(BOM)
+    rest = _chain(head, lines)
+
+    if first.startswith("["):
+        objects: Iterable[dict] = _iter_json_array(rest)
+    elif first.startswith("{") and _is_json_line(first):
+        objects = (json.loads(line) for line in rest if line.strip())
+    else:
+        document = json.loads("".join(rest))
+        if not isinstance(document, dict):
+            raise ValueError(f"Expected a JSON array or object of cues, not {type(document).__name__}")
+        key = next((k for k in JSON_CUE_KEYS if isinstance(document.get(k), list)), None)
+        objects = document[key] if key else []
+
+    for obj in objects:
+        if isinstance(obj, dict):
+            cue = _json_cue(obj)
+            if cue:
+                yield cue
+
+
+def _is_json_line(line: str) -> bool:
+    """A complete cue object on one line (JSON Lines), as opposed to a
+    whole document or the first line of a pretty-printed one."""
+    try:
+        obj = json.loads(line)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(obj, dict) and not any(k in obj for k in JSON_CUE_KEYS)
+
+
+def _chain(head: list[str], rest: Iterator[str]) -> Iterator[str]:
+    yield from head
+    yield from rest
+
+
+# ── Turns ────────────────────────────────────────────────────
+
+
+def merge_cues(cues: Iterable[Cue]) -> Iterator[Turn]:
+    """Fold consecutive cues labelled with the same speaker into a
+    single turn, which keeps the timestamp of its first cue.
+
+    A cue without a speaker label is attributed to the previous
+    speaker but kept as its own turn, so unlabelled captions (most
+    speech-to-text exports) keep their per-cue timing.
+    """
+    speaker: str | None = None
+    labelled = False
+    timestamp = ""
+    parts: list[str] = []
+    turn_index = 0
+
+    for cue in cues:
+        if parts and labelled and cue.speaker == speaker:
+            parts.append(cue.text)
+            continue
+        if parts:
+            yield Turn(
+                turn_index=turn_index,
+                speaker=speaker,
+                text=" ".join(parts),
+                timestamp=timestamp,
+                is_interviewer=_is_interviewer(speaker),
+            )
+            turn_index += 1
+        labelled = cue.speaker is not None
+        speaker = cue.speaker or speaker or DEFAULT_SPEAKER
+        timestamp, parts = cue.timestamp, [cue.text]
+
+    if parts:
+        yield Turn(
+            turn_index=turn_index,
+            speaker=speaker,
+            text=" ".join(parts),
+            timestamp=timestamp,
+            is_interviewer=_is_interviewer(speaker),
+        )
+
+
+def _iter_markdown_turns(lines: Iterable[str]) -> Iterator[Turn]:
+    # Markdown turns run across arbitrary lines, so this one is not streamed
+    yield from parse_markdown_transcript("".join(lines))
+
+
+CUE_PARSERS: dict[TranscriptFormat, Callable[[Iterable[str]], Iterator[Cue]]] = {
+    TranscriptFormat.VTT: iter_vtt_cues,
+    TranscriptFormat.SRT: iter_srt_cues,
+    TranscriptFormat.JSON: iter_json_cues,
+}
+
+SUFFIX_FORMATS = {
+    ".vtt": TranscriptFormat.VTT,
+    ".srt": TranscriptFormat.SRT,
+    ".json": TranscriptFormat.JSON,
+    ".jsonl": TranscriptFormat.JSON,
+    ".md": TranscriptFormat.MARKDOWN,
+    ".markdown": TranscriptFormat.MARKDOWN,
+}
+
+
+def detect_format(head: str, filename: str | None = None) -> TranscriptFormat:
+    """Pick a format from the file suffix, falling back to the content.
+
+    ``head`` only needs to hold the first few lines of the file.
+    """
+    if filename:
+        suffix = PurePosixPath(filename).suffix.lower()
+        if suffix in SUFFIX_FORMATS:
+            return SUFFIX_FORMATS[suffix]
+
+    text = head.lstrip(BOM).lstrip()
+    if text.startswith("WEBVTT"):
+        return TranscriptFormat.VTT
+    if re.match(r"\[\s*[{\]]", text) or text.startswith("{"):
+        return TranscriptFormat.JSON
+    lines = [line.strip() for line in text.splitlines()[:SNIFF_LINES] if line.strip()]
+    if any(CUE_TIMING.match(line) for line in lines):
+        return TranscriptFormat.SRT
+    return TranscriptFormat.MARKDOWN
+
+
+def iter_turns(lines: Iterable[str], fmt: TranscriptFormat) -> Iterator[Turn]:
+    """Stream turns from lines of a transcript in a known format."""
+    if fmt == TranscriptFormat.MARKDOWN:
+        return _iter_markdown_turns(lines)
+    return merge_cues(CUE_PARSERS[fmt](lines))
+
+
+def parse_transcript(text: str, filename: str | None = None) -> list[Turn]:
+    """Parse a transcript in any supported format into turns."""
+    head = "\n".join(text[:4096].splitlines()[:SNIFF_LINES])
+    fmt = detect_format(head, filename)
+    return list(iter_turns(io.StringIO(text), fmt))
@@ -0,0 +1,172 @@
+"""LLM token and cost accounting.
+
+Every Claude call is recorded against the project and session it ran
+for, so spend can be broken down by study, session, stage and model.
+Attribution travels in a context variable: API handlers wrap agent
+calls in ``attribute(project_id, session_id)`` and ``llm.create_message``
+records whatever scope is current, including inside gathered chunks.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app.config import settings
+from app.db import store
+from app.models.project import Project
+from app.models.usage import LlmUsage, ProjectUsage, UsageTotals
+
+logger = logging.getLogger(__name__)
+
+# USD per million input / output tokens, by model name prefix
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    # The longest matching prefix wins, so Opus 4.5 onwards is not
+    # priced as Opus 4 / 4.1
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-opus-4-6": (5.0, 25.0),
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+# Prompt caching: writes cost more than plain input, reads much less
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+# Message Batches are billed at half the standard price
+BATCH_PRICE_MULTIPLIER = 0.5
+
+
+class BudgetExceededError(Exception):
+    def __init__(self, project_id: str, spent: float, budget: float):
+        super().__init__(f"Project LLM budget of ${budget:.2f} exhausted (${spent:.2f} spent)")
+        self.project_id = project_id
+        self.spent = spent
+        self.budget = budget
+
+
+def _prices(model: str) -> tuple[float, float] | None:
+    table = {**MODEL_PRICES, **settings.llm_prices}
+    matches = [prefix for prefix in table if model.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else None
+
+
+def cost_usd(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_creation_input_tokens: int = 0,
+    cache_read_input_tokens: int = 0,
+) -> float:
+    prices = _prices(model)
+    if prices is None:
+        logger.warning("No price for model %s; recording zero cost", model)
+        return 0.0
+    input_price, output_price = prices
+    return (
+        input_tokens * input_price
+        + cache_creation_input_tokens * input_price * CACHE_WRITE_MULTIPLIER
+        + cache_read_input_tokens * input_price * CACHE_READ_MULTIPLIER
+        + output_tokens * output_price
+    ) / 1_000_000
+
+
+# ── Attribution ──────────────────────────────────────────────
+
+_scope: contextvars.ContextVar[tuple[str, str | None] | None] = contextvars.ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def attribute(project_id: str, session_id: str | None = None) -> Iterator[None]:
+    """Attribute Claude calls made inside the block to a project/session."""
+    token = _scope.set((project_id, session_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def record(stage: str, model: str, usage, latency_ms: float, batch: bool = False) -> LlmUsage | None:
+    """Persist one call's usage against the current scope.
+
+    ``usage`` is the ``usage`` block of an Anthropic message; ``batch``
+    marks a Message Batches result, priced at the batch discount. Calls
+    made outside any ``attribute`` block are not persisted.
+    """
+    scope = _scope.get()
+    if scope is None or usage is None:
+        return None
+    counts = {
+        field: getattr(usage, field, 0) or 0
+        for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    }
+    entry = LlmUsage(
+        project_id=scope[0],
+        session_id=scope[1],
+        stage=stage,
+        model=model,
+        latency_ms=round(latency_ms, 1),
+        cost_usd=cost_usd(model, **counts) * (BATCH_PRICE_MULTIPLIER if batch else 1.0),
+        batch=batch,
+        **counts,
+    )
+    store.record_llm_usage(entry)
+    return entry
+
+
+# ── Aggregates and budget ────────────────────────────────────
+
+
+def _add(totals: UsageTotals, entry: LlmUsage) -> None:
+    totals.calls += 1
+    totals.input_tokens += entry.input_tokens
+    totals.output_tokens += entry.output_tokens
+    totals.cache_creation_input_tokens += entry.cache_creation_input_tokens
+    totals.cache_read_input_tokens += entry.cache_read_input_tokens
+    totals.latency_ms += entry.latency_ms
+    totals.cost_usd += entry.cost_usd
+
+
+def budget_for(project: Project) -> float | None:
+    """The project's budget in USD, or None if it is unlimited."""
+    budget = project.budget_usd if project.budget_usd is not None else settings.project_budget_usd
+    return budget if budget > 0 else None
+
+
+def summarise(project: Project, entries: list[LlmUsage]) -> ProjectUsage:
+    summary = ProjectUsage(project_id=project.project_id)
+    for entry in entries:
+        _add(summary.total, entry)
+        _add(summary.by_stage.setdefault(entry.stage, UsageTotals()), entry)
+        _add(summary.by_model.setdefault(entry.model, UsageTotals()), entry)
+        if entry.session_id:
+            _add(summary.by_session.setdefault(entry.session_id, UsageTotals()), entry)
+    for totals in [summary.total, *summary.by_stage.values(), *summary.by_model.values(), *summary.by_session.values()]:
+        totals.cost_usd = round(totals.cost_usd, 6)
+        totals.latency_ms = round(totals.latency_ms, 1)
+
+    budget = budget_for(project)
+    if budget is not None:
+        summary.budget_usd = budget
+        summary.budget_remaining_usd = round(max(budget - summary.total.cost_usd, 0.0), 6)
+        summary.budget_exceeded = summary.total.cost_usd >= budget
+    return summary
+
+
+def project_usage(project: Project) -> ProjectUsage:
+    return summarise(project, store.list_llm_usage(project.project_id))
+
+
+def check_budget(project: Project) -> None:
+    """Refuse a new LLM run once the project has spent its budget."""
+    budget = budget_for(project)
+    if budget is None:
+        return
+    spent = sum(e.cost_usd for e in store.list_llm_usage(project.project_id))
+    if spent >= budget:
+        raise BudgetExceededError(project.project_id, spent, budget)
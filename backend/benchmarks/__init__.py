@@ -0,0 +1 @@
+"""Benchmarks that drive the whole app. Not shipped with the package."""
@@ -0,0 +1,251 @@
+"""End-to-end pipeline benchmark against the in-memory store.
+
+Drives the real FastAPI app over httpx through upload → scan-pii →
+anonymise → organise → extract-themes for N sessions at a given
+concurrency, with Claude replaced by ``StubAnthropic``. Reports per-stage
+p50/p95 latency, session throughput and store/LLM call counts as JSON
+with sorted keys, so reports from two releases diff cleanly.
+
+    python -m benchmarks.pipeline \\
+        --sessions 50 --concurrency 8 --latency-ms 400 --out before.json
+
+``--stub-ner`` swaps Presidio's NLP engine for one that finds nothing,
+for machines without a spaCy model; the fast recognisers still run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, replace
+
+# The benchmark always runs against the in-memory store
+os.environ["STORE_BACKEND"] = "memory"
+
+import httpx  # noqa: E402
+
+from app.agents import llm  # noqa: E402
+from app.db import store  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import anonymiser  # noqa: E402
+from benchmarks.stub_anthropic import StubAnthropic, StubConfig  # noqa: E402
+from tests.transcript_generator import generate_transcript  # noqa: E402
+
+STAGES = ("upload", "scan_pii", "anonymise", "organise", "extract_themes")
+
+GUIDE = """\
+# Discovery interview guide
+
+## Warm-up
+- Can you tell me about your role?
+- How long have you been in the team?
+
+## Current workflow
+- Can you walk me through a typical day?
+- What happens when the export fails?
+
+## Reporting
+- How do you decide what to report on?
+- Who else is involved at that point?
+
+## Wrap-up
+- Is there anything else you would like to add?
+"""
+
+
+class _NoEntities:
+    """Presidio stand-in that finds nothing, for ``--stub-ner``."""
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        return [[] for _ in texts]
+
+
+def _count_store_calls() -> Counter[str]:
+    """Wrap every public store function so calls are counted by name."""
+    calls: Counter[str] = Counter()
+
+    def counted(name, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    for name, fn in list(vars(store).items()):
+        if name.startswith("_") or not inspect.isfunction(fn) or not fn.__module__.startswith("app.db"):
+            continue
+        setattr(store, name, counted(name, fn))
+    return calls
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class _Timings:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+
+    async def call(self, stage: str, request) -> httpx.Response | None:
+        start = time.perf_counter()
+        response = await request
+        self.latencies[stage].append((time.perf_counter() - start) * 1000)
+        if response.is_error:
+            self.errors[stage] += 1
+            return None
+        return response
+
+    def summary(self) -> dict:
+        return {
+            stage: {
+                "count": len(self.latencies[stage]),
+                "errors": self.errors[stage],
+                "mean_ms": round(sum(self.latencies[stage]) / len(self.latencies[stage]), 2)
+                if self.latencies[stage]
+                else 0.0,
+                "p50_ms": round(percentile(self.latencies[stage], 50), 2),
+                "p95_ms": round(percentile(self.latencies[stage], 95), 2),
+            }
+            for stage in STAGES
+        }
+
+
+async def _run_session(client: httpx.AsyncClient, timings: _Timings, project_id: str, n: int, turns: int) -> bool:
+    base = f"/api/projects/{project_id}/sessions"
+    transcript = generate_transcript(turns, seed=n, layout="timestamped", multiline_ratio=0.3)
+    files = {"file": (f"session-{n}.md", transcript.text.encode("utf-8"), "text/markdown")}
+
+    uploaded = await timings.call("upload", client.post(f"{base}/upload", files=files))
+    if uploaded is None:
+        return False
+    session_id = uploaded.json()["session_id"]
+
+    scanned = await timings.call("scan_pii", client.post(f"{base}/{session_id}/scan-pii"))
+    if scanned is None:
+        return False
+    anonymised = await timings.call(
+        "anonymise",
+        client.post(f"{base}/{session_id}/anonymise", json={"detections": scanned.json()}),
+    )
+    if anonymised is None:
+        return False
+    if await timings.call("organise", client.post(f"{base}/{session_id}/organise")) is None:
+        return False
+    return await timings.call("extract_themes", client.post(f"{base}/{session_id}/extract-themes")) is not None
+
+
+async def run(
+    sessions: int = 10,
+    concurrency: int = 4,
+    turns: int = 60,
+    stub: StubConfig | None = None,
+    stub_ner: bool = False,
+) -> dict:
+    """Run the pipeline benchmark and return the report."""
+    stub = stub or StubConfig()
+    # Project setup is not measured and must not fail
+    llm._client = StubAnthropic(replace(stub, latency_ms=0, jitter_ms=0, failure_rate=0, rate_limit_rpm=0))
+    if stub_ner:
+        anonymiser._get_analyzer = lambda: _NoEntities()
+    store_calls = _count_store_calls()
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        project = (await client.post("/api/projects", json={"name": "Pipeline benchmark"})).json()
+        project_id = project["project_id"]
+        guide_files = {"file": ("guide.md", GUIDE.encode("utf-8"), "text/markdown")}
+        (await client.post(f"/api/projects/{project_id}/guide/upload", files=guide_files)).raise_for_status()
+        (await client.post(f"/api/projects/{project_id}/guide/lock")).raise_for_status()
+        setup_calls = sum(store_calls.values())
+        fake = StubAnthropic(stub)
+        llm._client = fake
+
+        timings = _Timings()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(n: int) -> bool:
+            async with gate:
+                return await _run_session(client, timings, project_id, n, turns)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(n) for n in range(sessions)))
+        wall = time.perf_counter() - start
+
+    completed = sum(results)
+    return {
+        "config": {
+            "sessions": sessions,
+            "concurrency": concurrency,
+            "turns_per_session": turns,
+            "stub": asdict(stub),
+            "stub_ner": stub_ner,
+        },
+        "wall_seconds": round(wall, 3),
+        "sessions_completed": completed,
+        "sessions_failed": sessions - completed,
+        "throughput_sessions_per_sec": round(completed / wall, 3) if wall else 0.0,
+        "stages": timings.summary(),
+        "llm_calls": dict(fake.calls),
+        "llm_failures": dict(fake.failures),
+        "llm_rate_limited": dict(fake.rate_limited),
+        "llm_tokens": {"input": fake.input_tokens, "output": fake.output_tokens},
+        "store_calls": dict(store_calls),
+        "store_calls_per_session": round((sum(store_calls.values()) - setup_calls) / sessions, 2) if sessions else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=60, help="turns per transcript")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--ms-per-output-token", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rpm", type=float, default=0.0, help="requests per minute the stub accepts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-ner", action="store_true", help="skip the Presidio NLP model")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(
+        run(
+            sessions=args.sessions,
+            concurrency=args.concurrency,
+            turns=args.turns,
+            stub=StubConfig(
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                ms_per_output_token=args.ms_per_output_token,
+                failure_rate=args.failure_rate,
+                rate_limit_rpm=args.rate_limit_rpm,
+                seed=args.seed,
+            ),
+            stub_ner=args.stub_ner,
+        )
+    )
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""A local stand-in for the Anthropic Messages API.
+
+``StubAnthropic`` has the ``messages.create`` and ``messages.batches``
+surface of ``anthropic.AsyncAnthropic``. It recognises each agent by its system
+prompt and answers with schema-valid JSON built from the request itself
+(sections from the guide, turn indices from the transcript, anchors
+copied from quoted turns), so the real agents run unchanged. Latency,
+token counts, failure rate and a requests-per-minute limit are
+configurable and seeded. Batches answer every request when created and
+report "ended" once ``batch_latency_ms`` has passed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import anthropic
+import httpx
+from anthropic.types import Message, TextBlock, Usage
+from anthropic.types.messages import (
+    MessageBatch,
+    MessageBatchErroredResult,
+    MessageBatchIndividualResponse,
+    MessageBatchRequestCounts,
+    MessageBatchSucceededResult,
+)
+
+from app.agents import guide_reviewer, insight_synthesiser, theme_extractor, transcript_organiser
+from app.agents.scheduler import TokenBucket
+from app.services.parser import timestamp_to_seconds
+from app.services.prompt_budget import estimate_tokens
+
+SECTION_HEADING = re.compile(r"^## (S\d+):", re.M)
+PARTICIPANT_LINE = re.compile(r"^(?:\[([\d:]+)\] )?PARTICIPANT \(turns? (\d+)", re.M)
+QUOTED_TURN = re.compile(r"\(turn (\d+)\): \"(.*)\"$", re.M)
+GUIDE_HEADING = re.compile(r"^#{1,3}\s+(.+)$")
+GUIDE_QUESTION = re.compile(r"^(?:[-*]|\d+[.)])\s+(.+)$")
+
+# Minutes per guide section when the guide gives no timings
+SECTION_MINUTES = 10
+THEMES_PER_SESSION = 3
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    # Uniform jitter added to latency_ms
+    jitter_ms: float = 0.0
+    # Extra latency per output token, to mimic generation time
+    ms_per_output_token: float = 0.0
+    # Share of calls that fail with a 529 overloaded error (an errored
+    # result in a batch)
+    failure_rate: float = 0.0
+    # Requests per minute accepted before answering 429; 0 is unlimited
+    rate_limit_rpm: float = 0.0
+    # Scale the locally estimated token counts reported in usage
+    input_token_scale: float = 1.0
+    output_token_scale: float = 1.0
+    # Time from creating a message batch until it has ended
+    batch_latency_ms: float = 0.0
+    seed: int = 0
+
+
+# ── Responses per agent ──────────────────────────────────────
+
+
+def _review_guide(user_content: str) -> dict:
+    guide = user_content.split("Interview Guide:", 1)[-1]
+    sections: list[dict] = []
+    question_count = 0
+    for line in guide.splitlines():
+        line = line.strip()
+        heading = GUIDE_HEADING.match(line)
+        question = GUIDE_QUESTION.match(line)
+        if heading:
+            start = len(sections) * SECTION_MINUTES
+            sections.append(
+                {
+                    "section_id": f"S{len(sections) + 1:02d}",
+                    "section_name": heading.group(1),
+                    "time_bracket": f"{start}:00-{start + SECTION_MINUTES}:00",
+                    "questions": [],
+                }
+            )
+        elif question and sections:
+            question_count += 1
+            sections[-1]["questions"].append(
+                {
+                    "question_id": f"Q{question_count:02d}",
+                    "question_text": question.group(1),
+                    "mapped_goal": None,
+                    "required": True,
+                    "probes": [],
+                }
+            )
+    return {
+        "sections": sections,
+        "flags": [],
+        "suggested_probes": [],
+        "coverage_gaps": [],
+        "estimated_duration_minutes": len(sections) * SECTION_MINUTES,
+    }
+
+
+def _organise(user_content: str, rng: random.Random) -> dict:
+    guide, _, to_map = user_content.partition("## Turns to map")
+    section_ids = SECTION_HEADING.findall(guide) or ["S01"]
+    mapped: dict[str, list[dict]] = {s: [] for s in section_ids}
+    for timestamp, index in PARTICIPANT_LINE.findall(to_map):
+        # Follow the guide's timing where the turn has a timestamp
+        seconds = timestamp_to_seconds(timestamp) if timestamp else None
+        if seconds is None:
+            section = rng.choice(section_ids)
+        else:
+            section = section_ids[min(seconds // (SECTION_MINUTES * 60), len(section_ids) - 1)]
+        mapped[section].append({"turn_index": int(index), "mapping_confidence": round(rng.uniform(0.6, 0.95), 2)})
+    return {
+        "section_mappings": [
+            {
+                "section_id": s,
+                "coverage_status": "covered" if turns else "not_covered",
+                "mapped_turns": turns,
+                "coverage_notes": "" if turns else "Not discussed",
+            }
+            for s, turns in mapped.items()
+        ],
+        "off_script_turns": [],
+    }
+
+
+def _extract_themes(user_content: str) -> dict:
+    quoted = QUOTED_TURN.findall(user_content)
+    themes = [
+        {
+            "theme_id": f"T{i + 1:02d}",
+            "theme_name": f"Theme {i + 1}",
+            "theme_description": "A recurring pattern in this session.",
+            "evidence": [],
+            "instance_count": 0,
+        }
+        for i in range(min(THEMES_PER_SESSION, len(quoted)))
+    ]
+    for n, (index, text) in enumerate(quoted):
+        words = text.split()
+        evidence = {"turn_index": int(index), "start": " ".join(words[:5]), "guide_question_id": None}
+        if len(words) > 5:
+            evidence["end"] = " ".join(words[-4:])
+        theme = themes[n % len(themes)]
+        theme["evidence"].append(evidence)
+        theme["instance_count"] += 1
+    return {"themes": themes}
+
+
+def _respond(system: str, user_content: str, rng: random.Random) -> tuple[str, dict]:
+    if system == guide_reviewer.SYSTEM_PROMPT:
+        return "guide_reviewer", _review_guide(user_content)
+    if system == transcript_organiser.SYSTEM_PROMPT:
+        return "transcript_organiser", _organise(user_content, rng)
+    if system == theme_extractor.SYSTEM_PROMPT:
+        return "theme_extractor", _extract_themes(user_content)
+    if system in (insight_synthesiser.MAP_SYSTEM_PROMPT, insight_synthesiser.REDUCE_SYSTEM_PROMPT):
+        return "insight_synthesiser", {"insights": []}
+    return "unknown", {}
+
+
+# ── Client ───────────────────────────────────────────────────
+
+
+def overloaded_error() -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "http://stub/v1/messages")
+    return anthropic.OverloadedError(
+        "Overloaded",
+        response=httpx.Response(529, request=request),
+        body={"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+    )
+
+
+def rate_limit_error(limit: float, retry_after: float) -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "http://stub/v1/messages")
+    headers = {
+        "retry-after": f"{retry_after:.3f}",
+        "anthropic-ratelimit-requests-limit": str(int(limit)),
+        "anthropic-ratelimit-requests-remaining": "0",
+    }
+    return anthropic.RateLimitError(
+        "Rate limited",
+        response=httpx.Response(429, headers=headers, request=request),
+        body={"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}},
+    )
+
+
+class _StubBatches:
+    def __init__(self, stub: StubAnthropic):
+        self._stub = stub
+        self._batches: dict[str, tuple[float, list[MessageBatchIndividualResponse]]] = {}
+
+    async def create(self, *, requests: list[dict], **kwargs) -> MessageBatch:
+        batch_id = f"msgbatch_stub_{uuid.uuid4().hex[:16]}"
+        self._batches[batch_id] = (
+            time.monotonic(),
+            [
+                MessageBatchIndividualResponse(custom_id=r["custom_id"], result=self._stub.batch_result(**r["params"]))
+                for r in requests
+            ],
+        )
+        return await self.retrieve(batch_id)
+
+    async def retrieve(self, message_batch_id: str, **kwargs) -> MessageBatch:
+        created, results = self._batches[message_batch_id]
+        ended = (time.monotonic() - created) * 1000 >= self._stub.config.batch_latency_ms
+        counts = {"canceled": 0, "expired": 0, "processing": 0, "errored": 0, "succeeded": 0}
+        for entry in results:
+            counts["processing" if not ended else entry.result.type] += 1
+        now = datetime.now(timezone.utc)
+        return MessageBatch(
+            id=message_batch_id,
+            type="message_batch",
+            processing_status="ended" if ended else "in_progress",
+            request_counts=MessageBatchRequestCounts(**counts),
+            created_at=now,
+            expires_at=now + timedelta(days=1),
+            ended_at=now if ended else None,
+        )
+
+    async def results(self, message_batch_id: str, **kwargs) -> AsyncIterator[MessageBatchIndividualResponse]:
+        _, results = self._batches[message_batch_id]
+
+        async def entries():
+            for entry in results:
+                yield entry
+
+        return entries()
+
+
+class _StubMessages:
+    def __init__(self, stub: StubAnthropic):
+        self._stub = stub
+        self.batches = _StubBatches(stub)
+
+    async def create(self, *, model: str, max_tokens: int, system: str, messages: list[dict], **kwargs) -> Message:
+        return await self._stub.respond(model, system, messages[0]["content"])
+
+
+class StubAnthropic:
+    """Drop-in for ``anthropic.AsyncAnthropic`` in ``llm.get_client``."""
+
+    def __init__(self, config: StubConfig | None = None):
+        self.config = config or StubConfig()
+        self.messages = _StubMessages(self)
+        self.calls: Counter[str] = Counter()
+        self.batched: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self._bucket = TokenBucket(self.config.rate_limit_rpm)
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._rng = random.Random(self.config.seed)
+
+    def _message(self, model: str, system: str, user_content: str, data: dict) -> Message:
+        text = json.dumps(data)
+        output_tokens = int(estimate_tokens(text) * self.config.output_token_scale)
+        input_tokens = int((estimate_tokens(system) + estimate_tokens(user_content)) * self.config.input_token_scale)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        return Message(
+            id=f"msg_stub_{uuid.uuid4().hex[:16]}",
+            type="message",
+            role="assistant",
+            model=model,
+            content=[TextBlock(type="text", text=text)],
+            stop_reason="end_turn",
+            stop_sequence=None,
+            usage=Usage(input_tokens=input_tokens, output_tokens=output_tokens),
+        )
+
+    async def respond(self, model: str, system: str, user_content: str) -> Message:
+        agent, data = _respond(system, user_content, self._rng)
+        wait = self._bucket.delay(1, time.monotonic())
+        if wait > 0:
+            self.rate_limited[agent] += 1
+            raise rate_limit_error(self.config.rate_limit_rpm, wait)
+        self._bucket.take(1, time.monotonic())
+
+        delay = self.config.latency_ms + self._rng.uniform(0, self.config.jitter_ms)
+        delay += self.config.ms_per_output_token * int(estimate_tokens(json.dumps(data)) * self.config.output_token_scale)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        self.calls[agent] += 1
+        if self._rng.random() < self.config.failure_rate:
+            self.failures[agent] += 1
+            raise overloaded_error()
+        return self._message(model, system, user_content, data)
+
+    def batch_result(self, *, model: str, system: str, messages: list[dict], **kwargs):
+        """The result of one batched request (batches skip rate limits)."""
+        user_content = messages[0]["content"]
+        agent, data = _respond(system, user_content, self._rng)
+        self.batched[agent] += 1
+        if self._rng.random() < self.config.failure_rate:
+            self.failures[agent] += 1
+            return MessageBatchErroredResult(
+                type="errored",
+                error={"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+            )
+        return MessageBatchSucceededResult(type="succeeded", message=self._message(model, system, user_content, data))
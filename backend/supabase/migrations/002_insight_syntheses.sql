@@ -0,0 +1,20 @@
+-- Insight Tool — Stored insight synthesis
+-- Keeps the last synthesis per project so new sessions can be folded
+-- in incrementally instead of re-synthesising the whole study.
+
+-- ============================================================
+-- INSIGHT_SYNTHESES
+-- One row per project. The result is stored as JSONB alongside
+-- the version of each session's accepted themes it consumed.
+-- ============================================================
+create table if not exists insight_syntheses (
+  project_id text primary key references projects(project_id) on delete cascade,
+  result jsonb not null,
+  consumed_versions jsonb not null default '{}',
+  instance_counts jsonb not null default '{}'
+);
+
+alter table insight_syntheses enable row level security;
+
+create policy "Allow all for authenticated users" on insight_syntheses
+  for all using (auth.role() = 'authenticated');
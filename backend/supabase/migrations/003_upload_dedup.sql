@@ -0,0 +1,29 @@
+-- Insight Tool — Upload deduplication
+-- Transcript and guide uploads are hashed on normalised content so a
+-- re-upload reuses earlier work instead of paying for it again.
+
+-- ============================================================
+-- SESSIONS.CONTENT_HASH
+-- sha256 of the normalised uploaded transcript.
+-- ============================================================
+alter table sessions add column if not exists content_hash text;
+
+create index if not exists idx_sessions_project_content_hash
+  on sessions(project_id, content_hash);
+
+-- ============================================================
+-- GUIDE_REVIEWS
+-- Guide reviewer output keyed by a hash of the guide text and
+-- review inputs, reused when an identical guide is uploaded.
+-- ============================================================
+create table if not exists guide_reviews (
+  project_id text not null references projects(project_id) on delete cascade,
+  content_hash text not null,
+  result jsonb not null,
+  primary key (project_id, content_hash)
+);
+
+alter table guide_reviews enable row level security;
+
+create policy "Allow all for authenticated users" on guide_reviews
+  for all using (auth.role() = 'authenticated');
@@ -0,0 +1,10 @@
+-- Insight Tool — Project deny-list
+-- Names and terms known to the research team (colleagues, the client,
+-- competitor products, recruited participants) that are always
+-- redacted in this project's transcripts.
+
+-- ============================================================
+-- PROJECTS.DENY_LIST
+-- List of {term, replacement_token, pii_type} objects.
+-- ============================================================
+alter table projects add column if not exists deny_list jsonb not null default '[]';
@@ -0,0 +1,36 @@
+-- Insight Tool — LLM token and cost accounting
+-- One row per Claude call, attributed to the project and (where there
+-- is one) the session it ran for, plus an optional per-project budget.
+
+-- ============================================================
+-- LLM_USAGE
+-- stage is the agent that made the call. cost_usd is computed
+-- from the model's price list when the call is recorded.
+-- ============================================================
+create table if not exists llm_usage (
+  id bigint generated always as identity primary key,
+  project_id text not null references projects(project_id) on delete cascade,
+  session_id text references sessions(session_id) on delete set null,
+  stage text not null,
+  model text not null,
+  input_tokens integer not null default 0,
+  output_tokens integer not null default 0,
+  cache_creation_input_tokens integer not null default 0,
+  cache_read_input_tokens integer not null default 0,
+  latency_ms double precision not null default 0,
+  cost_usd numeric(12, 6) not null default 0,
+  created_at timestamptz not null default now()
+);
+
+create index if not exists idx_llm_usage_project on llm_usage(project_id);
+
+alter table llm_usage enable row level security;
+
+create policy "Allow all for authenticated users" on llm_usage
+  for all using (auth.role() = 'authenticated');
+
+-- ============================================================
+-- PROJECTS.BUDGET_USD
+-- Null falls back to the server's default budget; 0 means no limit.
+-- ============================================================
+alter table projects add column if not exists budget_usd numeric(12, 2);
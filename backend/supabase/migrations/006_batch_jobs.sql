@@ -0,0 +1,44 @@
+-- Insight Tool — offline bulk processing
+-- One row per Message Batch submitted for a project's bulk
+-- organise / extract-themes run. Submitted rows are picked up again
+-- after a restart and polled until their results are saved, by one
+-- worker at a time (claimed_by / lease_until).
+
+-- ============================================================
+-- BATCH_JOBS
+-- batch_id is Anthropic's message batch id. stage is "organise"
+-- or "extract_themes"; status is "submitted", "completed" or
+-- "failed".
+-- ============================================================
+create table if not exists batch_jobs (
+  batch_id text primary key,
+  project_id text not null references projects(project_id) on delete cascade,
+  stage text not null,
+  status text not null default 'submitted',
+  session_ids jsonb not null default '[]',
+  request_count integer not null default 0,
+  request_digests jsonb not null default '{}',
+  sessions_saved integer not null default 0,
+  failed_session_ids jsonb not null default '[]',
+  fallback_requests integer not null default 0,
+  error text,
+  created_at timestamptz not null default now(),
+  ended_at timestamptz,
+  -- Lease held by the worker polling the batch
+  claimed_by text,
+  lease_until timestamptz
+);
+
+create index if not exists idx_batch_jobs_project on batch_jobs(project_id);
+create index if not exists idx_batch_jobs_status on batch_jobs(status);
+
+alter table batch_jobs enable row level security;
+
+create policy "Allow all for authenticated users" on batch_jobs
+  for all using (auth.role() = 'authenticated');
+
+-- ============================================================
+-- LLM_USAGE.BATCH
+-- Calls sent through the Message Batches API, billed at half price.
+-- ============================================================
+alter table llm_usage add column if not exists batch boolean not null default false;
@@ -0,0 +1,38 @@
+"""Shared fixtures."""
+
+import pytest
+
+from app.db import memory_store, store
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: throughput benchmark, run only with --benchmark-only")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmarks unless they were asked for."""
+    if config.getoption("benchmark_only", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with --benchmark-only")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
+
+
+# Facade functions that wrap the backend (they call ``store._backend``)
+FACADE_WRAPPERS = {"delete_project", "update_session", "save_themes"}
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """Point the store facade at the in-memory backend."""
+    monkeypatch.setattr(store, "_backend", memory_store)
+    for name, fn in vars(memory_store).items():
+        if (
+            callable(fn)
+            and not name.startswith("_")
+            and getattr(fn, "__module__", None) == memory_store.__name__
+            and name not in FACADE_WRAPPERS
+        ):
+            monkeypatch.setattr(store, name, fn)
+    return memory_store
@@ -0,0 +1,197 @@
+"""Tests for offline bulk runs through the Message Batches API."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types.messages import MessageBatchErroredResult
+
+from app.agents import batches, llm, scheduler, structured
+from app.config import settings
+from app.db import memory_store, store
+from app.models.batch import BatchStage, BatchStatus
+from app.models.guide import GuideSection, ResearchGuide
+from app.models.session import SessionStatus, Turn
+from app.services import bulk_processing, usage
+from benchmarks.stub_anthropic import StubAnthropic
+
+MEMORY_FUNCTIONS = (
+    "create_project", "get_project", "save_guide", "get_guide", "create_session", "get_session",
+    "list_sessions", "record_llm_usage", "list_llm_usage", "save_batch_job", "list_batch_jobs",
+    "list_pending_batch_jobs", "claim_batch_job",
+)
+
+TURNS = [
+    Turn(turn_index=0, speaker="Interviewer", text="How do you share reports?", is_interviewer=True),
+    Turn(turn_index=1, speaker="Sam", text="I export them every Friday and email the whole team a PDF."),
+    Turn(turn_index=2, speaker="Interviewer", text="What gets in the way?", is_interviewer=True),
+    Turn(turn_index=3, speaker="Sam", text="The export times out whenever the report has more than a year of data."),
+]
+
+
+@pytest.fixture
+def stub(monkeypatch) -> StubAnthropic:
+    """The in-memory store, a stubbed client and instant polling."""
+    monkeypatch.setattr(store, "_backend", memory_store)
+    for name in MEMORY_FUNCTIONS:
+        monkeypatch.setattr(store, name, getattr(memory_store, name))
+    monkeypatch.setattr(memory_store, "_batch_jobs", {})
+    monkeypatch.setattr(scheduler, "_scheduler", scheduler.Scheduler(0, 0, 0))
+    monkeypatch.setattr(settings, "batch_poll_seconds", 0.01)
+    client = StubAnthropic()
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+    return client
+
+
+def _project(sessions: int = 2):
+    project = store.create_project("Bulk")
+    guide = ResearchGuide(
+        project_id=project.project_id,
+        project_name=project.name,
+        sections=[
+            GuideSection(section_id="S01", section_name="Sharing"),
+            GuideSection(section_id="S02", section_name="Problems"),
+        ],
+        locked=True,
+    )
+    store.save_guide(project.project_id, guide)
+    for _ in range(sessions):
+        session = store.create_session(project.project_id)
+        session.transcript = [t.model_copy() for t in TURNS]
+        session.status = SessionStatus.ANONYMISED
+        store.update_session(session)
+    return store.get_project(project.project_id)
+
+
+def _bulk_run(project):
+    async def go():
+        job = await bulk_processing.start(project)
+        await bulk_processing.run(job)
+        return job
+
+    return asyncio.run(go())
+
+
+def test_bulk_run_organises_then_themes_at_batch_prices(stub):
+    project = _project()
+    first = _bulk_run(project)
+
+    assert first.stage == BatchStage.ORGANISE
+    sessions = store.list_sessions(project.project_id)
+    assert {s.status for s in sessions} == {SessionStatus.THEMED}
+    assert all(s.organised.section_mappings for s in sessions)
+
+    jobs = store.list_batch_jobs(project.project_id)
+    assert [(j.stage, j.status, j.sessions_saved) for j in jobs] == [
+        (BatchStage.ORGANISE, BatchStatus.COMPLETED, 2),
+        (BatchStage.EXTRACT_THEMES, BatchStatus.COMPLETED, 2),
+    ]
+    # Everything went through batches
+    assert not stub.calls
+    assert stub.batched["transcript_organiser"] == jobs[0].request_count
+
+    entries = store.list_llm_usage(project.project_id)
+    assert len(entries) == sum(j.request_count for j in jobs)
+    for entry in entries:
+        assert entry.batch
+        full = usage.cost_usd(entry.model, entry.input_tokens, entry.output_tokens)
+        assert entry.cost_usd == pytest.approx(full * usage.BATCH_PRICE_MULTIPLIER)
+
+
+def test_errored_results_fall_back_to_direct_calls(stub, monkeypatch):
+    errored = MessageBatchErroredResult(
+        type="errored", error={"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+    )
+    monkeypatch.setattr(stub, "batch_result", lambda **params: errored)
+    project = _project(sessions=1)
+    _bulk_run(project)
+
+    organise, themes = store.list_batch_jobs(project.project_id)
+    assert organise.fallback_requests == organise.request_count
+    assert stub.calls["transcript_organiser"] == organise.request_count
+    assert stub.calls["theme_extractor"] == themes.request_count
+    assert store.list_sessions(project.project_id)[0].status == SessionStatus.THEMED
+    assert not any(e.batch for e in store.list_llm_usage(project.project_id))
+
+
+def test_truncated_result_is_billed_and_falls_back(stub):
+    request = structured.JsonRequest(agent="guide_reviewer", system="s", user_content="u", max_tokens=10)
+    message = SimpleNamespace(
+        model=settings.claude_model, stop_reason="max_tokens", content=[],
+        usage=SimpleNamespace(input_tokens=100, output_tokens=10),
+    )
+    project = store.create_project("Truncated")
+    with usage.attribute(project.project_id):
+        _, fell_back = asyncio.run(batches.resolve(request, SimpleNamespace(type="succeeded", message=message)))
+    assert fell_back
+    assert stub.calls["unknown"] == 1
+    assert [e.batch for e in store.list_llm_usage(project.project_id)] == [True, False]
+
+
+def test_changed_requests_fall_back_instead_of_taking_another_result(stub):
+    project = _project(sessions=1)
+
+    async def go():
+        job = await bulk_processing.start(project)
+        # As if the chunking had changed across a restart
+        job.request_digests = {custom_id: "0" * 64 for custom_id in job.request_digests}
+        store.save_batch_job(job)
+        await bulk_processing.run(job)
+        return job
+
+    job = asyncio.run(go())
+    organise = store.list_batch_jobs(project.project_id)[0]
+    assert organise.fallback_requests == job.request_count
+    assert stub.calls["transcript_organiser"] == job.request_count
+    assert store.list_sessions(project.project_id)[0].status == SessionStatus.THEMED
+
+
+def test_theme_submission_failure_leaves_organise_completed(stub, monkeypatch):
+    project = _project(sessions=1)
+    job = asyncio.run(bulk_processing.start(project))
+
+    async def refuse(requests):
+        raise RuntimeError("batch quota exceeded")
+
+    monkeypatch.setattr(batches, "submit", refuse)
+    asyncio.run(bulk_processing.run(job))
+
+    (organise,) = store.list_batch_jobs(project.project_id)
+    assert organise.status == BatchStatus.COMPLETED
+    assert "batch quota exceeded" in organise.error
+    assert store.list_sessions(project.project_id)[0].status == SessionStatus.ORGANISED
+
+
+def test_jobs_leased_to_another_worker_are_left_alone(stub):
+    project = _project(sessions=1)
+    job = asyncio.run(bulk_processing.start(project))
+    lease = datetime.now(timezone.utc) + timedelta(minutes=5)
+    assert store.claim_batch_job(job.batch_id, "worker-b", lease) is False
+    # Once this worker's lease lapses, another one can take the job
+    memory_store._batch_jobs[job.batch_id].lease_until = datetime.now(timezone.utc)
+    assert store.claim_batch_job(job.batch_id, "worker-b", lease)
+
+    asyncio.run(bulk_processing.run(job))
+    assert store.list_pending_batch_jobs()[0].claimed_by == "worker-b"
+    assert store.list_sessions(project.project_id)[0].status == SessionStatus.ANONYMISED
+
+
+def test_pending_runs_resume_and_block_new_runs(stub):
+    stub.config.batch_latency_ms = 50
+    project = _project(sessions=1)
+    job = asyncio.run(bulk_processing.start(project))
+    with pytest.raises(bulk_processing.BulkRunInProgressError):
+        asyncio.run(bulk_processing.start(project))
+
+    async def restart():
+        bulk_processing.resume()
+        await asyncio.gather(*bulk_processing._tasks)
+
+    asyncio.run(restart())
+
+    assert store.list_pending_batch_jobs() == []
+    assert [j.batch_id for j in store.list_batch_jobs(project.project_id)][0] == job.batch_id
+    assert store.list_sessions(project.project_id)[0].status == SessionStatus.THEMED
+    with pytest.raises(ValueError):
+        asyncio.run(bulk_processing.start(project))
@@ -0,0 +1,93 @@
+"""Tests for bulk transcript upload parsing and batched session creation."""
+
+import asyncio
+import io
+import struct
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import memory_store
+from app.main import app
+from app.services.bulk_upload import expand_uploads, parse_uploads
+
+
+def _transcript(n: int) -> str:
+    return f"**Interviewer:** [00:00:0{n}] Question {n}\n\n**Participant:** [00:00:1{n}] Answer {n}\n"
+
+
+def _zip(*members: tuple[str, str | bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_expand_uploads_keeps_order_and_skips_non_transcripts():
+    archive = _zip(("b.md", _transcript(2)), ("__MACOSX/._b.md", "x"), ("notes.png", b"x"), ("c.txt", _transcript(3)))
+    uploads = expand_uploads([("a.md", b"a"), ("study.zip", archive), ("broken.zip", b"nope")])
+
+    assert [u.filename for u in uploads] == ["a.md", "study.zip/b.md", "study.zip/c.txt", "broken.zip"]
+    assert uploads[-1].error
+
+
+def test_expand_uploads_caps_inflated_size(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_size_mb", 1)
+    big = _zip(("big.md", "x" * (1024 * 1024 + 1)))
+    # Claim a tiny size in the central directory; inflating must not trust it
+    lying = bytearray(big)
+    struct.pack_into("<I", lying, lying.find(b"PK\x01\x02") + 24, 10)
+
+    uploads = expand_uploads([("big.zip", big), ("lying.zip", bytes(lying))])
+
+    assert uploads[0].error == "File too large"
+    assert uploads[1].error and not uploads[1].data
+
+
+def test_parse_uploads_in_parallel_preserves_order():
+    files = [(f"{n}.md", _transcript(n).encode()) for n in range(1, 7)] + [("bad.md", b"\xff\xfe")]
+    parsed = asyncio.run(parse_uploads(expand_uploads(files)))
+
+    assert [p.filename for p in parsed] == [f for f, _ in files]
+    assert all(p.turns and p.content_hash for p in parsed[:-1])
+    assert parsed[0].turns[-1].text.endswith("Answer 1")
+    assert parsed[-1].error and not parsed[-1].turns
+
+
+def test_create_sessions_allocates_participant_ids_in_order():
+    project = memory_store.create_project("Bulk")
+    memory_store.create_session(project.project_id)
+    parsed = asyncio.run(parse_uploads(expand_uploads([(f"{n}.md", _transcript(n).encode()) for n in (1, 2, 3)])))
+
+    sessions = memory_store.create_sessions(project.project_id, [(p.turns, p.content_hash) for p in parsed])
+
+    assert [s.participant_id for s in sessions] == ["P02", "P03", "P04"]
+    assert memory_store.get_project(project.project_id).session_count == 4
+    assert memory_store.find_session_by_hash(project.project_id, parsed[1].content_hash).participant_id == "P03"
+    memory_store.delete_project(project.project_id)
+
+
+def test_bulk_upload_endpoint(memory_backend):
+    project = memory_store.create_project("Bulk API")
+    archive = _zip(("b.md", _transcript(2)), ("c.md", "no turns here"), ("d.md", _transcript(4)))
+    files = [
+        ("files", ("a.md", _transcript(1))),
+        ("files", ("study.zip", archive)),
+        ("files", ("again.md", _transcript(1))),
+    ]
+    response = TestClient(app).post(f"/api/projects/{project.project_id}/sessions/bulk-upload", files=files)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert [(i["filename"], i["status"], i["participant_id"]) for i in report["items"]] == [
+        ("a.md", "created", "P01"),
+        ("study.zip/b.md", "created", "P02"),
+        ("study.zip/c.md", "failed", None),
+        ("study.zip/d.md", "created", "P03"),
+        ("again.md", "duplicate", "P01"),
+    ]
+    assert (report["created"], report["duplicates"], report["failed"]) == (3, 1, 1)
+    assert [s.participant_id for s in memory_store.list_sessions(project.project_id)] == ["P01", "P02", "P03"]
+    memory_store.delete_project(project.project_id)
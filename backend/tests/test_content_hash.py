@@ -0,0 +1,64 @@
+"""Tests for upload content hashing and duplicate lookup."""
+
+from fastapi.testclient import TestClient
+
+from app.db import memory_store
+from app.models.guide import GuideReviewResult, ResearchGuide
+from app.main import app
+from app.services.content_hash import content_hash, guide_review_key
+
+TRANSCRIPT = "**Interviewer:** Hi there\n\n**P01:** Hello  \n"
+
+
+def test_hash_ignores_line_endings_bom_and_trailing_whitespace():
+    variant = "\ufeff" + TRANSCRIPT.replace("\n", "\r\n").replace("  ", "") + "\n\n\n"
+    assert content_hash(variant) == content_hash(TRANSCRIPT)
+    assert content_hash(TRANSCRIPT + "**P01:** More") != content_hash(TRANSCRIPT)
+
+
+def test_guide_review_key_covers_review_inputs():
+    key = guide_review_key("Guide", "Study", "Objective", ["a", "b"])
+    assert key == guide_review_key("Guide\r\n", "Study", "Objective", ["a", "b"])
+    assert key != guide_review_key("Guide", "Study", "Other objective", ["a", "b"])
+    assert key != guide_review_key("Guide", "Study", "Objective", ["a"])
+
+
+def test_memory_store_finds_duplicates_within_project():
+    project = memory_store.create_project("Dedup")
+    other = memory_store.create_project("Other")
+    digest = content_hash(TRANSCRIPT)
+
+    session = memory_store.create_session(project.project_id)
+    session.content_hash = digest
+    memory_store.update_session(session)
+
+    assert memory_store.find_session_by_hash(project.project_id, digest).session_id == session.session_id
+    assert memory_store.find_session_by_hash(other.project_id, digest) is None
+
+    result = GuideReviewResult(parsed_guide=ResearchGuide(project_id=project.project_id, project_name="Dedup"))
+    memory_store.save_guide_review(project.project_id, "k", result)
+    assert memory_store.get_guide_review(project.project_id, "k") == result
+    assert memory_store.get_guide_review(other.project_id, "k") is None
+
+    memory_store.delete_project(project.project_id)
+    assert memory_store.get_guide_review(project.project_id, "k") is None
+    memory_store.delete_project(other.project_id)
+
+
+def test_upload_returns_existing_session_for_duplicates(memory_backend):
+    project = memory_store.create_project("Dedup API")
+    client = TestClient(app)
+    url = f"/api/projects/{project.project_id}/sessions/upload"
+    text = "**Interviewer:** [00:00:01] How do you export?\n\n**Participant:** [00:00:05] Every Friday.\n"
+
+    first = client.post(url, files={"file": ("p1.md", text)})
+    again = client.post(url, files={"file": ("p1-copy.md", text.replace("\n", "\r\n"))})
+    forced = client.post(url, params={"allow_duplicate": "true"}, files={"file": ("p1.md", text)})
+
+    assert first.status_code == again.status_code == forced.status_code == 200
+    assert "X-Duplicate-Of" not in first.headers
+    assert again.json()["session_id"] == first.json()["session_id"]
+    assert again.headers["X-Duplicate-Of"] == first.json()["session_id"]
+    assert forced.json()["session_id"] != first.json()["session_id"]
+    assert "X-Duplicate-Of" not in forced.headers
+    memory_store.delete_project(project.project_id)
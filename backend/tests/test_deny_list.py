@@ -0,0 +1,64 @@
+"""Tests for project deny-list redaction."""
+
+from types import SimpleNamespace
+
+from app.db import memory_store
+from app.models.project import DenyListEntry
+from app.models.session import Turn
+from app.services import anonymiser
+from app.services.deny_list import DenyListMatcher, matcher_for
+from app.services.pii_cache import pii_cache
+
+ENTRIES = [
+    DenyListEntry(term="Acme", replacement_token="[COMPANY]"),
+    DenyListEntry(term="Acme  Cloud", replacement_token="[PRODUCT]"),
+    DenyListEntry(term="Ann", replacement_token="[NAME]"),
+]
+
+
+def test_whole_word_case_insensitive_longest_match():
+    matcher = DenyListMatcher(ENTRIES)
+    text = "ACME cloud beat acme; Anna and ann agreed. Acme's fine."
+    found = [(text[m.start : m.end], m.entry.replacement_token) for m in matcher.find(text)]
+    assert found == [
+        ("ACME cloud", "[PRODUCT]"),
+        ("acme", "[COMPANY]"),
+        ("ann", "[NAME]"),
+        ("Acme", "[COMPANY]"),
+    ]
+
+
+def test_scan_emits_redacted_detections(monkeypatch):
+    monkeypatch.setattr(anonymiser, "needs_ner", lambda text: False)
+    turns = [Turn(turn_index=3, speaker="P", text="we moved from acme to them")]
+    (d,) = anonymiser.scan_turns_for_pii(turns, deny_list=DenyListMatcher(ENTRIES))
+    assert (d.original_text, d.replacement_token, d.pii_type, d.status) == ("acme", "[COMPANY]", "DENY_LIST", "redacted")
+    assert (d.start_offset, d.end_offset, d.turn_index) == (14, 18, 3)
+
+
+def test_term_inside_ner_entity_widens_to_cover_it(monkeypatch):
+    class _Ner:
+        def analyze_iterator(self, texts, language, batch_size, entities):
+            spans = [(t.find("Ann Smith"), t.find("Ann Smith") + len("Ann Smith")) for t in texts]
+            return [[SimpleNamespace(entity_type="PERSON", start=s, end=e, score=0.7)] for s, e in spans]
+
+    monkeypatch.setattr(anonymiser, "_get_analyzer", lambda: _Ner())
+    pii_cache.clear()
+    turns = [Turn(turn_index=0, speaker="P", text="I asked Ann Smith about it.")]
+    (d,) = anonymiser.scan_turns_for_pii(turns, deny_list=DenyListMatcher(ENTRIES))
+    pii_cache.clear()
+    assert (d.original_text, d.replacement_token, d.status) == ("Ann Smith", "[NAME]", "redacted")
+
+
+def test_matcher_cached_until_list_changes():
+    project = memory_store.create_project("Deny")
+    assert matcher_for(project) is None
+
+    project = memory_store.update_deny_list(project.project_id, ENTRIES)
+    first = matcher_for(project)
+    assert matcher_for(memory_store.get_project(project.project_id)) is first
+
+    project = memory_store.update_deny_list(project.project_id, ENTRIES[:1])
+    assert matcher_for(project) is not first
+    assert len(matcher_for(project)) == 1
+    memory_store.delete_project(project.project_id)
@@ -0,0 +1,70 @@
+"""Tests for local resolution of theme evidence references."""
+
+from app.models.session import MappedTurn, OrganisedTranscript, SectionMapping, Turn
+from app.services.evidence_resolver import resolve_evidence, source_turns
+
+ORGANISED = OrganisedTranscript(
+    session_id="s1",
+    participant_id="P01",
+    section_mappings=[
+        SectionMapping(
+            section_id="S01",
+            section_name="Exporting",
+            mapped_turns=[
+                MappedTurn(
+                    turn_index=3,
+                    speaker="P01",
+                    text="Honestly the export takes forever. I usually give up and copy it by hand.",
+                    timestamp="00:06:10",
+                ),
+                MappedTurn(
+                    turn_index=5,
+                    speaker="P01",
+                    text="My manager wants the report every Friday, so it's stressful.",
+                    timestamp="00:07:02",
+                ),
+            ],
+        )
+    ],
+    off_script_turns=[
+        Turn(turn_index=9, speaker="P01", text="I also hate the new logo, to be honest.", timestamp="00:20:00"),
+    ],
+)
+TURNS = source_turns(ORGANISED)
+
+
+def test_anchors_resolve_to_verbatim_quote_and_metadata():
+    e = resolve_evidence({"turn_index": 3, "start": "the export takes", "end": "by hand."}, TURNS, "P01")
+    assert e.quote == "the export takes forever. I usually give up and copy it by hand."
+    assert (e.timestamp, e.guide_section, e.unresolved) == ("00:06:10", "Exporting", False)
+
+
+def test_start_anchor_alone_runs_to_sentence_end():
+    e = resolve_evidence({"turn_index": 3, "start": "Honestly the export"}, TURNS, "P01")
+    assert e.quote == "Honestly the export takes forever."
+
+
+def test_normalised_and_fuzzy_anchors_match():
+    e = resolve_evidence({"turn_index": 5, "start": "my manager wants the report", "end": "its stressful"}, TURNS, "P01")
+    assert e.quote == "My manager wants the report every Friday, so it's stressful"
+
+    e = resolve_evidence({"turn_index": 9, "start": "I also hate the new logos"}, TURNS, "P01")
+    assert not e.unresolved
+    assert e.quote.startswith("I also hate the new logo")
+
+
+def test_wrong_turn_index_is_corrected():
+    e = resolve_evidence({"turn_index": 4, "start": "I also hate", "end": "honest."}, TURNS, "P01")
+    assert (e.turn_index, e.guide_section, e.timestamp) == (9, "Off-script", "00:20:00")
+
+
+def test_character_span():
+    e = resolve_evidence({"turn_index": 5, "span": [0, 10]}, TURNS, "P01")
+    assert e.quote == "My manager"
+
+
+def test_unresolvable_evidence_is_flagged():
+    e = resolve_evidence({"turn_index": 3, "start": "we never export anything"}, TURNS, "P01")
+    assert e.unresolved
+    assert e.quote == "we never export anything"
+    assert e.timestamp == ""
@@ -0,0 +1,95 @@
+"""Tests for evidence verification against source transcripts."""
+
+import time
+
+from app.models.session import Session, Turn
+from app.models.theme import SessionThemes, Theme, ThemeEvidence
+from app.models.verification import EvidenceStatus
+from app.services.aho_corasick import Automaton
+from app.services.evidence_verifier import verify_project, verify_session_themes
+
+TEXTS = [
+    "How do you handle the monthly export?",
+    "Honestly the export takes forever, I usually copy it by hand.",
+    "And who reads the report?",
+    "My manager wants it every Friday, which is stressful.",
+]
+
+
+def _session(session_id: str = "s1", texts: list[str] = TEXTS) -> Session:
+    return Session(
+        session_id=session_id,
+        project_id="p",
+        participant_id="P01",
+        transcript=[
+            Turn(turn_index=i, speaker="P01", text=t, timestamp=f"00:0{i}:00", is_interviewer=i % 2 == 0)
+            for i, t in enumerate(texts)
+        ],
+    )
+
+
+def _themes(*evidence: tuple[str, int], session_id: str = "s1") -> SessionThemes:
+    return SessionThemes(
+        session_id=session_id,
+        participant_id="P01",
+        themes=[
+            Theme(
+                theme_id="T01",
+                theme_name="Export pain",
+                theme_description="",
+                evidence=[ThemeEvidence(quote=q, participant_id="P01", turn_index=i) for q, i in evidence],
+            )
+        ],
+    )
+
+
+def test_automaton_finds_overlapping_and_whole_word_matches():
+    a = Automaton(["he", "she", "hers"])
+    assert sorted(a.iter_matches("ushers")) == [(1, 4, 1), (2, 4, 0), (2, 6, 2)]
+    assert list(Automaton(["ann"]).iter_matches("anna ann", whole_words=True)) == [(5, 8, 0)]
+
+
+def test_verified_and_corrected_quotes():
+    themes = _themes(
+        ("the export takes forever", 1),
+        ("my manager wants it every friday", 1),
+        ("Honestly the export … copy it by hand", 3),
+    )
+    report = verify_session_themes(_session(), themes)
+
+    assert (report.checked, report.verified, report.corrected, report.missing) == (3, 1, 2, 0)
+    evidence = themes.themes[0].evidence
+    assert (evidence[1].turn_index, evidence[1].timestamp) == (3, "00:03:00")
+    assert evidence[2].turn_index == 1
+    assert {m.claimed_turn_index for m in report.mismatches} == {1, 3}
+
+
+def test_fuzzy_and_missing_quotes():
+    themes = _themes(("My manager want it every Friday", 0), ("we never export anything at all", 1))
+    report = verify_session_themes(_session(), themes)
+
+    fuzzy, missing = report.mismatches
+    assert (fuzzy.status, fuzzy.resolved_turn_index) == (EvidenceStatus.FUZZY, 3)
+    assert (missing.status, missing.resolved_turn_index) == (EvidenceStatus.MISSING, None)
+    assert themes.themes[0].evidence[1].unresolved
+
+
+def test_project_verification_is_fast():
+    sessions, themes = [], []
+    for s in range(12):
+        texts = [f"participant {s} turn {i} talks about topic {i * 7 % 31} at length " * 8 for i in range(300)]
+        sid = f"s{s}"
+        sessions.append(_session(sid, texts))
+        # Half the quotes point at the wrong turn
+        themes.append(
+            _themes(*((f"turn {i} talks about topic", i + (i % 2)) for i in range(0, 300, 3)), session_id=sid)
+        )
+
+    start = time.perf_counter()
+    report, changed = verify_project(sessions, themes)
+    elapsed = time.perf_counter() - start
+
+    assert report.checked == 1200
+    assert report.missing == 0
+    assert len(changed) == 12
+    assert elapsed < 1.0
@@ -0,0 +1,117 @@
+"""Tests for map-reduce insight synthesis with a stubbed Claude client."""
+
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+from app.agents import insight_synthesiser, llm
+from app.models.theme import SessionThemes, Theme, ThemeEvidence, ThemeStatus
+
+
+class _FakeMessages:
+    def __init__(self):
+        self.calls: list[str] = []
+
+    async def create(self, system, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.calls.append(system)
+        if system == insight_synthesiser.MAP_SYSTEM_PROMPT:
+            data = {
+                "insights": [
+                    {"group_id": g, "theme_group": ["Slow export"], "insight_summary": f"Summary {g}",
+                     "highlight_evidence_id": "E1"}
+                    for g in re.findall(r"^## (G\d+)", prompt, re.M)
+                ]
+            }
+        else:
+            ids = re.findall(r"^## (D\d+)", prompt, re.M)
+            data = {"insights": [{"merge": ids, "theme_group": ["Slow export"],
+                                  "insight_summary": "Merged", "highlight_draft_id": ids[-1]}]}
+        return SimpleNamespace(content=[SimpleNamespace(text="```json\n" + json.dumps(data) + "\n```")])
+
+
+def _session(n: int, name: str = "Slow export", quote: str = "export is slow") -> SessionThemes:
+    pid = f"P{n:02d}"
+    return SessionThemes(
+        session_id=f"s{n}",
+        participant_id=pid,
+        themes=[
+            Theme(
+                theme_id="T01",
+                theme_name=name,
+                theme_description=f"{name} came up",
+                evidence=[ThemeEvidence(quote=f"{quote} ({pid})", participant_id=pid, turn_index=3)],
+                instance_count=1,
+                status=ThemeStatus.ACCEPTED,
+            )
+        ],
+    )
+
+
+def _fake_client(monkeypatch) -> _FakeMessages:
+    fake = _FakeMessages()
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=fake))
+    return fake
+
+
+def _synthesise(sessions, previous=None):
+    return asyncio.run(
+        insight_synthesiser.synthesise_insights("proj", "Study", sessions, previous=previous)
+    )
+
+
+def test_map_reduce_keeps_citation_trail(monkeypatch):
+    fake = _fake_client(monkeypatch)
+
+    sessions = [_session(n) for n in range(1, 10)]
+    result = _synthesise(sessions).result
+
+    # 9 sessions -> 3 map batches -> 1 reduce call
+    assert fake.calls.count(insight_synthesiser.MAP_SYSTEM_PROMPT) == 3
+    assert fake.calls.count(insight_synthesiser.REDUCE_SYSTEM_PROMPT) == 1
+
+    (insight,) = result.insights
+    assert insight.insight_summary == "Merged"
+    assert insight.participant_count == 9
+    assert insight.total_instances == 9
+    assert {(e.session_id, e.participant_id) for e in insight.supporting_evidence} == {
+        (f"s{n}", f"P{n:02d}") for n in range(1, 10)
+    }
+    assert insight.highlight_quote.session_id == "s9"
+    assert result.total_participants == 9
+
+
+def test_incremental_merges_only_the_delta(monkeypatch):
+    fake = _fake_client(monkeypatch)
+    sessions = [_session(n) for n in range(1, 7)]
+    snapshot = _synthesise(sessions)
+    assert len(fake.calls) == 3  # two map batches + one reduce
+
+    # Nothing changed: no calls, same snapshot
+    fake.calls.clear()
+    assert _synthesise(sessions, snapshot) is snapshot
+    assert fake.calls == []
+
+    # A matching new session is merged locally without calling Claude
+    sessions.append(_session(7))
+    snapshot = _synthesise(sessions, snapshot)
+    assert fake.calls == []
+    (insight,) = snapshot.result.insights
+    assert insight.insight_id == "INS-001"
+    assert insight.participant_count == 7
+    assert insight.total_instances == 7
+    assert snapshot.instance_counts["INS-001"]["s7"] == 1
+
+    # A new pattern costs one map call and gets the next id
+    sessions.append(_session(8, name="Pricing confusion", quote="the pricing tiers make no sense"))
+    snapshot = _synthesise(sessions, snapshot)
+    assert fake.calls == [insight_synthesiser.MAP_SYSTEM_PROMPT]
+    assert [i.insight_id for i in snapshot.result.insights] == ["INS-001", "INS-002"]
+
+    # Removing a session strips its evidence without any calls
+    fake.calls.clear()
+    snapshot = _synthesise(sessions[1:], snapshot)
+    assert fake.calls == []
+    assert snapshot.result.insights[0].participant_count == 6
+    assert "s1" not in snapshot.instance_counts["INS-001"]
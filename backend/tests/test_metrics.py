@@ -0,0 +1,117 @@
+"""Tests for the Prometheus metrics registry, middleware and trace spans."""
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from app.agents import llm
+from app.config import settings
+from app.services import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        h.observe(value, route="/a")
+    text = h.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 't_seconds_count{route="/a"} 4' in text
+    assert 't_seconds_sum{route="/a"} 4.25' in text
+
+
+def test_label_values_are_escaped():
+    c = metrics.Counter("t_total", "Test.", ("error",))
+    c.inc(error='bad "quote"\n')
+    assert 't_total{error="bad \\"quote\\"\\n"} 1' in c.render()
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/api/projects/{project_id}/sessions/{session_id}/thing")
+    async def thing(project_id: str, session_id: str):
+        with metrics.span("inner"):
+            return {"ok": True}
+
+    return app
+
+
+def _get(app: FastAPI, path: str) -> httpx.Response:
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await client.get(path)
+
+    return asyncio.run(go())
+
+
+def test_middleware_labels_by_route_template():
+    route = "/api/projects/{project_id}/sessions/{session_id}/thing"
+    before = metrics.http_request_seconds.count(method="GET", route=route, status="200")
+    assert _get(_app(), "/api/projects/p1/sessions/s1/thing").status_code == 200
+    assert _get(_app(), "/api/projects/p2/sessions/s2/thing").status_code == 200
+    assert metrics.http_request_seconds.count(method="GET", route=route, status="200") == before + 2
+    assert "/p1/" not in metrics.registry.render()
+    assert metrics.http_in_flight.value() == 0
+
+
+def test_route_template_survives_repeated_parameter_values():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+    router = APIRouter()
+
+    @router.get("/{session_id}")
+    async def session(project_id: str, session_id: str):
+        return {"ok": True}
+
+    app.include_router(router, prefix="/api/projects/{project_id}/sessions")
+    route = "/api/projects/{project_id}/sessions/{session_id}"
+    before = metrics.http_request_seconds.count(method="GET", route=route, status="200")
+    assert _get(app, "/api/projects/nope/sessions/nope").status_code == 200
+    assert metrics.http_request_seconds.count(method="GET", route=route, status="200") == before + 1
+
+
+def test_spans_share_the_session_trace_id(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "trace_spans", True)
+    with caplog.at_level(logging.INFO, logger="app.trace"):
+        _get(_app(), "/api/projects/p1/sessions/sess-42/thing")
+    lines = [r.getMessage() for r in caplog.records if r.name == "app.trace"]
+    assert len(lines) == 2
+    assert all("trace=sess-42" in line for line in lines)
+    assert any("span=GET /api/projects/p1/sessions/sess-42/thing/inner" in line for line in lines)
+
+
+def test_spans_are_off_by_default(caplog):
+    with caplog.at_level(logging.INFO, logger="app.trace"):
+        _get(_app(), "/api/projects/p1/sessions/s1/thing")
+    assert not [r for r in caplog.records if r.name == "app.trace"]
+
+
+def test_llm_calls_are_recorded(monkeypatch):
+    class _Messages:
+        async def create(self, **kwargs):
+            assert metrics.llm_in_flight.value(agent="metrics_test") == 1
+            return SimpleNamespace(usage=SimpleNamespace(input_tokens=1200, output_tokens=300))
+
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=_Messages()))
+    asyncio.run(llm.create_message(agent="metrics_test", system="s", user_content="u", max_tokens=10))
+
+    assert metrics.llm_request_seconds.count(agent="metrics_test", model=settings.claude_model) == 1
+    assert metrics.llm_input_tokens.count(agent="metrics_test") == 1
+    assert metrics.llm_in_flight.value(agent="metrics_test") == 0
+
+
+def test_recording_overhead_is_negligible():
+    h = metrics.Histogram("t_overhead_seconds", "Test.", ("function",))
+    start = time.perf_counter()
+    for _ in range(20_000):
+        h.observe(0.003, function="get_session")
+    per_sample = (time.perf_counter() - start) / 20_000
+    assert per_sample < 20e-6
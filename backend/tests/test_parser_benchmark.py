@@ -0,0 +1,92 @@
+"""Throughput, memory and scaling benchmarks for the markdown parser.
+
+``pytest tests/test_parser_benchmark.py --benchmark-only`` reports
+lines/sec and peak memory per transcript size (the throughput tests are
+skipped otherwise). The scaling guards run with the normal suite and
+fail if parsing turns super-linear: inputs grow 16x, so quadratic cost
+shows as ~16x growth per unit, far above the allowed margin, while
+scheduling noise is absorbed by taking the best of several runs.
+"""
+
+import time
+import tracemalloc
+
+import pytest
+
+from app.services.parser import parse_markdown_transcript
+from tests.transcript_generator import LAYOUTS, generate_transcript
+
+SIZES = [10, 1_000, 10_000, 100_000]
+
+# How much larger the big input of a scaling guard is than the small one
+SCALE = 16
+
+# Allowed growth in per-line (or per-character) cost between the small
+# and the large input before we call it super-linear. Linear parsing
+# stays near 1x; quadratic parsing would reach about SCALE.
+MAX_COST_GROWTH = 6.0
+
+# Timing runs per input; the fastest is kept
+REPEAT = 5
+
+
+@pytest.mark.parametrize("layout", [*LAYOUTS, None])
+def test_generator_round_trips(layout):
+    transcript = generate_transcript(200, seed=3, layout=layout, multiline_ratio=0.5, adversarial_ratio=0.1)
+    turns = parse_markdown_transcript(transcript.text)
+    assert [t.speaker for t in turns] == transcript.speakers
+
+
+def _peak_memory(text: str) -> int:
+    tracemalloc.start()
+    parse_markdown_transcript(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_parse_throughput(benchmark, size):
+    transcript = generate_transcript(size, seed=size, adversarial_ratio=0.01)
+
+    turns = benchmark.pedantic(
+        parse_markdown_transcript,
+        args=(transcript.text,),
+        rounds=max(1, 100_000 // (size * 10)),
+        warmup_rounds=1 if size < 100_000 else 0,
+    )
+
+    assert len(turns) == transcript.turn_count
+    if benchmark.stats:
+        benchmark.extra_info["lines"] = transcript.line_count
+        benchmark.extra_info["lines_per_sec"] = round(transcript.line_count / benchmark.stats["mean"])
+        benchmark.extra_info["peak_memory_bytes"] = _peak_memory(transcript.text)
+
+
+def _best_time(text: str, repeat: int = REPEAT) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_markdown_transcript(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_cost_per_line_is_linear_in_turns():
+    small = generate_transcript(1_000, seed=1, adversarial_ratio=0.01)
+    large = generate_transcript(1_000 * SCALE, seed=1, adversarial_ratio=0.01)
+    per_line_small = _best_time(small.text) / small.line_count
+    per_line_large = _best_time(large.text) / large.line_count
+    assert per_line_large < per_line_small * MAX_COST_GROWTH
+
+
+@pytest.mark.parametrize("length", [1_000, 8_000])
+def test_cost_per_char_is_linear_in_line_length(length):
+    """Long colon-free and colon-heavy lines must not make the speaker
+    pattern backtrack quadratically."""
+    small = generate_transcript(100, seed=2, adversarial_ratio=1.0, adversarial_length=length)
+    large = generate_transcript(100, seed=2, adversarial_ratio=1.0, adversarial_length=length * SCALE)
+    per_char_small = _best_time(small.text) / len(small.text)
+    per_char_large = _best_time(large.text) / len(large.text)
+    assert per_char_large < per_char_small * MAX_COST_GROWTH
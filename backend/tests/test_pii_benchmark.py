@@ -0,0 +1,179 @@
+"""Speed/accuracy benchmark for the anonymiser's NLP engine tiers.
+
+Builds a seeded, labelled synthetic interview corpus and reports
+turns/sec, precision and recall of ``scan_turns_for_pii`` for each
+engine tier whose model is installed. Tiers without a model are
+skipped. ``pytest tests/test_pii_benchmark.py --benchmark-only`` runs
+the tiers and records their scores in the benchmark report; the oracle
+check of the scoring harness runs with the normal suite.
+"""
+
+import importlib.util
+import random
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.models.session import Turn
+from app.services import anonymiser
+from app.services.pii_cache import pii_cache
+from app.services.pii_engine import SPACY_MODELS, build_analyzer
+
+FIRST_NAMES = ["Priya", "Tom", "Grace", "Mohammed", "Olivia", "Kenji", "Sofia", "Daniel"]
+SURNAMES = ["Patel", "Walker", "Okafor", "Nguyen", "Schmidt", "Evans"]
+CITIES = ["Leeds", "Manchester", "Bristol", "Glasgow", "Chicago", "Toronto"]
+COMPANIES = ["Microsoft", "Barclays", "Unilever", "Deloitte", "Siemens"]
+
+FILLER = [
+    "Yeah, so I think it mostly works.",
+    "Honestly it takes forever.",
+    "It is fine most of the time.",
+    "So the report goes out every week.",
+    "Mm-hmm.",
+    "I end up doing a lot of it by hand.",
+]
+QUESTIONS = [
+    "Can you tell me more about that?",
+    "How do you usually handle the monthly export?",
+    "What happens when it goes wrong?",
+]
+TEMPLATES = [
+    ("My manager {PERSON} signs everything off.", "PERSON"),
+    ("We moved the whole team to {LOCATION} last year.", "LOCATION"),
+    ("Before this I worked at {ORGANIZATION} for a while.", "ORGANIZATION"),
+    ("You can email me at {EMAIL_ADDRESS} if you need.", "EMAIL_ADDRESS"),
+    ("My number is {PHONE_NUMBER} if anything comes up.", "PHONE_NUMBER"),
+]
+PHONES = ["07700 900123", "+44 20 7946 0958", "(415) 555-2671"]
+
+# Share of labelled entities every installed tier must find. Emails and
+# phone numbers come from the fast tier; the names, places and companies
+# are common enough for any NER model.
+MIN_RECALL = 0.7
+
+
+@dataclass(frozen=True)
+class Label:
+    turn_index: int
+    start: int
+    end: int
+    entity_type: str
+
+
+def labelled_corpus(seed: int = 11, turns: int = 300) -> tuple[list[Turn], list[Label]]:
+    rng = random.Random(seed)
+    out: list[Turn] = []
+    labels: list[Label] = []
+    for i in range(turns):
+        if i % 2 == 0:
+            out.append(Turn(turn_index=i, speaker="Interviewer", text=rng.choice(QUESTIONS), is_interviewer=True))
+            continue
+        text = rng.choice(FILLER)
+        if rng.random() < 0.5:
+            template, kind = rng.choice(TEMPLATES)
+            value = {
+                "PERSON": lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+                "LOCATION": lambda: rng.choice(CITIES),
+                "ORGANIZATION": lambda: rng.choice(COMPANIES),
+                "EMAIL_ADDRESS": lambda: f"{rng.choice(FIRST_NAMES).lower()}@example.com",
+                "PHONE_NUMBER": lambda: rng.choice(PHONES),
+            }[kind]()
+            sentence = template.replace("{" + kind + "}", value)
+            text = f"{text} {sentence}"
+            start = text.index(value)
+            labels.append(Label(i, start, start + len(value), kind))
+        out.append(Turn(turn_index=i, speaker="Participant", text=text))
+    return out, labels
+
+
+def score(detections, labels: list[Label]) -> tuple[float, float]:
+    """Precision and recall; a detection counts if it overlaps a label
+    of the same entity type."""
+    by_turn: dict[int, list[Label]] = {}
+    for label in labels:
+        by_turn.setdefault(label.turn_index, []).append(label)
+    matched: set[Label] = set()
+    true_positives = 0
+    for d in detections:
+        kind = "ORGANIZATION" if d.pii_type == "ORG" else d.pii_type
+        hit = next(
+            (
+                label
+                for label in by_turn.get(d.turn_index, [])
+                if label.entity_type == kind and d.start_offset < label.end and label.start < d.end_offset
+            ),
+            None,
+        )
+        if hit is not None:
+            true_positives += 1
+            matched.add(hit)
+    precision = true_positives / len(detections) if detections else 1.0
+    recall = len(matched) / len(labels) if labels else 1.0
+    return precision, recall
+
+
+def _scan(turns: list[Turn]):
+    pii_cache.clear()
+    return anonymiser.scan_turns_for_pii(turns)
+
+
+class OracleNer:
+    """Knows the corpus vocabulary; validates the harness without a model."""
+
+    VOCAB = (
+        [(n, "PERSON") for n in FIRST_NAMES + SURNAMES]
+        + [(c, "LOCATION") for c in CITIES]
+        + [(c, "ORGANIZATION") for c in COMPANIES]
+    )
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        return [
+            [
+                SimpleNamespace(entity_type=kind, start=text.index(word), end=text.index(word) + len(word), score=0.85)
+                for word, kind in self.VOCAB
+                if word in text and kind in entities
+            ]
+            for text in texts
+        ]
+
+
+def test_harness_with_oracle_tier(monkeypatch):
+    turns, labels = labelled_corpus()
+    monkeypatch.setattr(anonymiser, "_get_analyzer", lambda: OracleNer())
+    precision, recall = score(_scan(turns), labels)
+    assert precision == 1.0
+    assert recall == 1.0
+
+
+TIERS = [("spacy", size) for size in SPACY_MODELS] + [("stanza", None), ("transformers", None)]
+
+
+def _installed(engine: str, size: str | None) -> bool:
+    if engine == "spacy":
+        return importlib.util.find_spec(SPACY_MODELS[size]) is not None
+    if engine == "transformers":
+        return all(importlib.util.find_spec(m) for m in ("transformers", SPACY_MODELS["sm"]))
+    return importlib.util.find_spec(engine) is not None
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("engine,size", TIERS, ids=[f"{e}-{s}" if s else e for e, s in TIERS])
+def test_engine_tier(benchmark, monkeypatch, engine, size):
+    if not _installed(engine, size):
+        pytest.skip(f"{engine} {size or ''} model not installed")
+    monkeypatch.setattr(settings, "pii_nlp_engine", engine)
+    if size:
+        monkeypatch.setattr(settings, "pii_model_size", size)
+    analyzer = build_analyzer(engine, size)
+    monkeypatch.setattr(anonymiser, "_get_analyzer", lambda: analyzer)
+
+    turns, labels = labelled_corpus()
+    detections = benchmark.pedantic(_scan, args=(turns,), rounds=1, iterations=1)
+    precision, recall = score(detections, labels)
+    if benchmark.stats:
+        benchmark.extra_info["turns_per_sec"] = round(len(turns) / benchmark.stats["mean"])
+    benchmark.extra_info["precision"] = round(precision, 3)
+    benchmark.extra_info["recall"] = round(recall, 3)
+    assert recall >= MIN_RECALL
@@ -0,0 +1,76 @@
+"""Tests for memoised PII analyzer results."""
+
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.session import Turn
+from app.services import anonymiser
+from app.services.pii_cache import PiiResultCache, pii_cache
+
+NAME = re.compile(r"\bAlice\b")
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, text, language, entities):
+        self.calls += 1
+        return [
+            SimpleNamespace(entity_type="PERSON", start=m.start(), end=m.end(), score=0.9)
+            for m in NAME.finditer(text)
+        ]
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        return [self.analyze(t, language, entities) for t in texts]
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    fake = FakeAnalyzer()
+    monkeypatch.setattr(anonymiser, "_get_analyzer", lambda: fake)
+    pii_cache.clear()
+    yield fake
+    pii_cache.clear()
+
+
+def test_repeated_turns_hit_cache_with_shifted_offsets(analyzer):
+    turns = [
+        Turn(turn_index=0, speaker="I", text="Did Alice say that?"),
+        Turn(turn_index=1, speaker="I", text="   Did Alice say that?  "),
+        Turn(turn_index=2, speaker="I", text="Did Alice say that?"),
+    ]
+    detections = anonymiser.scan_turns_for_pii(turns[:1]) + anonymiser.scan_turns_for_pii(turns[1:])
+
+    assert analyzer.calls == 1
+    for d in detections:
+        assert turns[d.turn_index].text[d.start_offset : d.end_offset] == "Alice"
+    assert [d.start_offset for d in detections] == [4, 7, 4]
+    # Repeats within one scan share a single lookup
+    stats = pii_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_cached_results_still_use_caller_names(analyzer):
+    turn = [Turn(turn_index=0, speaker="I", text="Thanks Alice")]
+    assert anonymiser.scan_turns_for_pii(turn)[0].replacement_token == "[NAME]"
+    assert anonymiser.scan_turns_for_pii(turn, participant_name="alice")[0].replacement_token == "[PARTICIPANT]"
+    assert analyzer.calls == 1
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = PiiResultCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", ())
+    cache.put("b", ())
+    cache.get("a")
+    cache.put("c", ())
+    assert cache.get("b") is None and cache.get("a") == ()
+    assert cache.evictions == 1
+
+    now = [0.0]
+    monkeypatch.setattr("app.services.pii_cache.time.monotonic", lambda: now[0])
+    cache.put("d", ())
+    now[0] = 11.0
+    assert cache.get("d") is None
@@ -0,0 +1,140 @@
+"""Tests and benchmark for tiered PII detection."""
+
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.session import Turn
+from app.services import anonymiser
+from app.services.pii_cache import pii_cache
+from app.services.pii_recognisers import compile_names, fast_results, needs_ner
+
+ENTITIES = ["PERSON", "LOCATION", "ORGANIZATION"]
+KNOWN = {"Priya": "PERSON", "Jane Doe": "PERSON", "Leeds": "LOCATION", "Acme": "ORGANIZATION"}
+
+
+class FakeNer:
+    """Stands in for spaCy: finds known entities, costs ~1ms per call."""
+
+    def __init__(self, cost: float = 0.001):
+        self.calls = 0
+        self.cost = cost
+
+    def analyze(self, text, language, entities):
+        self.calls += 1
+        deadline = time.perf_counter() + self.cost
+        while time.perf_counter() < deadline:
+            pass
+        results = []
+        for word, kind in KNOWN.items():
+            start = text.find(word)
+            if start >= 0 and kind in entities:
+                results.append(SimpleNamespace(entity_type=kind, start=start, end=start + len(word), score=0.85))
+        return results
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        return [self.analyze(t, language, entities) for t in texts]
+
+
+@pytest.fixture
+def ner(monkeypatch):
+    fake = FakeNer()
+    monkeypatch.setattr(anonymiser, "_get_analyzer", lambda: fake)
+    pii_cache.clear()
+    yield fake
+    pii_cache.clear()
+
+
+def test_fast_recognisers():
+    text = "Mail jo@example.com or ring +44 20 7946 0958. Jane Doe said hi."
+    results = fast_results(text, compile_names({"[PARTICIPANT]": "jane doe"}))
+    found = {(r.entity_type, text[r.start : r.end], r.token) for r in results}
+    assert found == {
+        ("EMAIL_ADDRESS", "jo@example.com", None),
+        ("PHONE_NUMBER", "+44 20 7946 0958", None),
+        ("PERSON", "Jane Doe", "[PARTICIPANT]"),
+    }
+    assert fast_results("Between 2019 and 2020 we had 1,234,567 users") == []
+
+
+def test_ner_prefilter():
+    assert not needs_ner("Yeah, so I think the export is slow. Honestly it is.")
+    assert not needs_ner("mm-hmm")
+    assert needs_ner("We moved the team to Leeds last year.")
+    assert needs_ner("Priya handles it.")
+
+
+def test_tiered_scan_keeps_auto_redaction_semantics(ner):
+    turns = [
+        Turn(turn_index=0, speaker="I", text="Thanks, Sam. Can you tell me more about that?"),
+        Turn(turn_index=1, speaker="P", text="Sure, I think so. It is slow."),
+        Turn(turn_index=2, speaker="P", text="Email sam@acme.io or ask Priya in Leeds."),
+    ]
+    detections = anonymiser.scan_turns_for_pii(turns, interviewer_name="Sam")
+    by_text = {d.original_text: d for d in detections}
+
+    assert ner.calls == 2  # turn 1 never reaches NER
+    assert by_text["Sam"].replacement_token == "[INTERVIEWER]"
+    assert by_text["sam@acme.io"].pii_type == "EMAIL_ADDRESS" and by_text["sam@acme.io"].status == "redacted"
+    assert by_text["Priya"].replacement_token == "[NAME]" and by_text["Priya"].status == "redacted"
+    assert by_text["Leeds"].replacement_token == "[LOCATION]"
+
+
+def test_known_first_name_inside_ner_name_covers_surname(ner):
+    turns = [Turn(turn_index=0, speaker="P", text="I spoke with Jane Doe yesterday.")]
+    (d,) = anonymiser.scan_turns_for_pii(turns, participant_name="Jane")
+    assert (d.original_text, d.replacement_token) == ("Jane Doe", "[NAME]")
+    assert d.status == "redacted"
+
+
+def test_known_name_matching_ner_span_keeps_its_token_and_ner_score(ner):
+    turns = [
+        Turn(turn_index=0, speaker="P", text="Priya sorted it."),
+        Turn(turn_index=1, speaker="P", text="priya sorted it."),
+    ]
+    confirmed, unconfirmed = anonymiser.scan_turns_for_pii(turns, participant_name="Priya")
+    assert (confirmed.replacement_token, confirmed.confidence, confirmed.status) == ("[PARTICIPANT]", 0.85, "redacted")
+    # Not seen by NER, so left for review as before tiering
+    assert (unconfirmed.replacement_token, unconfirmed.status) == ("[PARTICIPANT]", "pending")
+
+
+# ── Benchmark ────────────────────────────────────────────────
+
+QUESTIONS = [
+    "Can you tell me more about that?",
+    "How do you usually handle the monthly export?",
+    "What happens when it goes wrong?",
+    "And how did that make you feel?",
+]
+ANSWERS = [
+    "Yeah, so I think it mostly works. It is just slow.",
+    "Honestly it takes forever and I end up doing it by hand.",
+    "Mm-hmm.",
+    "Priya from the Leeds office usually sorts it out.",
+    "We tried Acme for a while but it was not great.",
+    "Right. So the report goes out every Friday.",
+    "You can reach me on 07700 900123 if you need more.",
+]
+
+
+def _transcript(seed: int, turns: int) -> list[Turn]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(turns):
+        interviewer = i % 2 == 0
+        text = rng.choice(QUESTIONS) if interviewer else " ".join(rng.sample(ANSWERS, 2))
+        out.append(Turn(turn_index=i, speaker="I" if interviewer else "P", text=text, is_interviewer=interviewer))
+    return out
+
+
+def test_tiered_scan_benchmark(ner):
+    turns = _transcript(seed=7, turns=400)
+
+    for t in turns:
+        ner.analyze(t.text, "en", ENTITIES + ["EMAIL_ADDRESS", "PHONE_NUMBER"])
+    full_calls, ner.calls = ner.calls, 0
+
+    anonymiser.scan_turns_for_pii(turns)
+    assert ner.calls < full_calls / 4
@@ -0,0 +1,72 @@
+"""Smoke tests for the end-to-end pipeline benchmark and its Claude stand-in."""
+
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import anthropic
+import pytest
+
+from app.agents import theme_extractor, transcript_organiser
+from benchmarks.stub_anthropic import StubAnthropic, StubConfig
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _create(stub: StubAnthropic, system: str, content: str):
+    return asyncio.run(
+        stub.messages.create(
+            model="stub", max_tokens=100, system=system, messages=[{"role": "user", "content": content}]
+        )
+    )
+
+
+def test_stub_answers_each_agent_with_its_schema():
+    stub = StubAnthropic()
+    organised = json.loads(
+        _create(
+            stub,
+            transcript_organiser.SYSTEM_PROMPT,
+            "## S01: Warm-up\n## S02: Workflow\n## Turns to map\n\n"
+            "[00:12:00] PARTICIPANT (turn 3): Fine.\nPARTICIPANT (turns 5, 6): Ok.",
+        ).content[0].text
+    )
+    mapped = {mt["turn_index"] for sm in organised["section_mappings"] for mt in sm["mapped_turns"]}
+    assert mapped == {3, 5}
+    assert organised["section_mappings"][1]["mapped_turns"][0]["turn_index"] == 3
+
+    message = _create(stub, theme_extractor.SYSTEM_PROMPT, '  (turn 4): "it takes forever to reconcile the totals"')
+    evidence = json.loads(message.content[0].text)["themes"][0]["evidence"][0]
+    assert evidence == {"turn_index": 4, "start": "it takes forever to reconcile", "end": "to reconcile the totals",
+                        "guide_question_id": None}
+    assert message.usage.output_tokens > 0
+    assert stub.calls == {"transcript_organiser": 1, "theme_extractor": 1}
+
+
+def test_stub_failure_rate():
+    stub = StubAnthropic(StubConfig(failure_rate=1.0))
+    with pytest.raises(anthropic.APIStatusError) as exc:
+        _create(stub, theme_extractor.SYSTEM_PROMPT, "")
+    assert exc.value.status_code == 529
+
+
+def test_pipeline_report(tmp_path):
+    out = tmp_path / "report.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--sessions", "4", "--concurrency", "2",
+         "--turns", "30", "--stub-ner", "--out", str(out)],
+        cwd=BACKEND,
+        check=True,
+        timeout=120,
+    )
+    report = json.loads(out.read_text())
+
+    assert report["sessions_completed"] == 4
+    assert set(report["stages"]) == {"upload", "scan_pii", "anonymise", "organise", "extract_themes"}
+    for stage in report["stages"].values():
+        assert stage["count"] == 4 and stage["errors"] == 0
+        assert stage["p50_ms"] <= stage["p95_ms"]
+    assert report["llm_calls"] == {"transcript_organiser": 4, "theme_extractor": 4}
+    assert report["store_calls"]["save_themes"] == 4
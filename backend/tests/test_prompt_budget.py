@@ -0,0 +1,64 @@
+"""Tests for prompt budgeting and compaction."""
+
+from app.models.guide import GuideSection, Question, ResearchGuide
+from app.models.session import Turn
+from app.services.prompt_budget import (
+    compact_turns,
+    estimate_tokens,
+    expansion_map,
+    format_compact_turns,
+    plan_call,
+    split_evenly,
+)
+
+GUIDE = ResearchGuide(
+    project_id="p",
+    project_name="Study",
+    sections=[
+        GuideSection(
+            section_id="S01",
+            section_name="Exporting",
+            questions=[Question(question_id="Q03", question_text="How do you export your monthly reports?")],
+        )
+    ],
+)
+
+
+def _turn(i: int, text: str, interviewer: bool = False) -> Turn:
+    return Turn(turn_index=i, speaker="I" if interviewer else "P", text=text, is_interviewer=interviewer)
+
+
+def test_compaction_passes():
+    turns = [
+        _turn(0, "So, how do you export your monthly reports?", interviewer=True),
+        _turn(1, "I use the CSV button."),
+        _turn(2, "Mm-hmm.", interviewer=True),
+        _turn(3, "Then I paste it into Excel."),
+        _turn(4, "Mm-hmm"),
+        _turn(5, "Okay, great.", interviewer=True),
+        _turn(6, "Yeah."),
+    ]
+    compact = compact_turns(turns, GUIDE)
+    assert format_compact_turns(compact) == (
+        "INTERVIEWER (turn 0): [asks Q03]\n"
+        "PARTICIPANT (turns 1, 3, 6): I use the CSV button. Then I paste it into Excel. Yeah."
+    )
+    assert expansion_map(compact) == {1: [1, 3, 6]}
+
+
+def test_unmatched_interviewer_turn_is_kept():
+    compact = compact_turns([_turn(0, "What did you have for lunch?", interviewer=True)], GUIDE)
+    assert compact[0].text == "What did you have for lunch?"
+
+
+def test_plan_call_chunks_on_input_or_output_pressure():
+    assert estimate_tokens("x" * 35) == 10
+    assert not plan_call("system", "x" * 3500, max_output_tokens=1000).chunked
+    assert plan_call("system", "x" * 35_000, max_output_tokens=1000, context_tokens=6000).chunks == 3
+    assert plan_call("system", "short", max_output_tokens=1000, expected_output_tokens=2000).chunks == 3
+
+
+def test_split_evenly():
+    assert split_evenly([5, 5, 5, 5], 2) == [[0, 1], [2, 3]]
+    assert split_evenly([10, 1, 1], 1) == [[0, 1, 2]]
+    assert split_evenly([], 3) == []
@@ -0,0 +1,146 @@
+"""Tests for rate-limit admission, priority classes and call retries."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import anthropic
+import httpx
+import pytest
+
+from app.agents import llm, scheduler
+from app.agents.scheduler import Priority, Scheduler, TokenBucket
+from app.config import settings
+
+
+def test_bucket_refills_continuously():
+    bucket = TokenBucket(60)
+    bucket._updated = 100.0
+    bucket.take(60, 100.0)
+    assert bucket.delay(1, 100.0) == pytest.approx(1.0)
+    assert bucket.delay(1, 100.5) == pytest.approx(0.5)
+    # A call larger than the bucket waits for a full one, not forever
+    assert bucket.delay(600, 100.5) == pytest.approx(59.5)
+    assert TokenBucket(0).delay(10**9, 0.0) == 0.0
+
+
+def test_output_debt_delays_admission():
+    bucket = TokenBucket(600)
+    bucket._updated = 0.0
+    bucket.take(700, 0.0)
+    assert bucket.delay(0, 0.0) == pytest.approx(10.0)
+
+
+def test_headers_set_limits_and_remaining():
+    sched = Scheduler(0, 0, 0)
+    sched.observe_headers(
+        {
+            "anthropic-ratelimit-requests-limit": "100",
+            "anthropic-ratelimit-requests-remaining": "0",
+            "anthropic-ratelimit-input-tokens-limit": "40000",
+            "anthropic-ratelimit-input-tokens-remaining": "39000",
+        }
+    )
+    now = time.monotonic()
+    assert sched.buckets["requests"].delay(1, now) == pytest.approx(0.6, abs=0.01)
+    assert sched.buckets["input_tokens"].level == pytest.approx(39000, abs=1)
+    assert not sched.buckets["output_tokens"].limited
+
+
+def test_retry_after_formats():
+    assert scheduler.retry_after({"retry-after": "2"}) == 2.0
+    assert scheduler.retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert scheduler.retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert scheduler.retry_after({}) is None
+
+
+def test_interactive_calls_jump_the_bulk_queue():
+    async def run():
+        sched = Scheduler(600, 0, 0)
+        sched.buckets["requests"].level = 0
+        order = []
+
+        async def call(name, level):
+            await sched.acquire(10, level)
+            order.append(name)
+
+        bulk = [asyncio.create_task(call(f"bulk{i}", Priority.BULK)) for i in range(2)]
+        await asyncio.sleep(0)
+        with scheduler.priority(Priority.INTERACTIVE):
+            interactive = asyncio.create_task(call("interactive", None))
+        await asyncio.gather(*bulk, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "bulk0", "bulk1"]
+
+
+def _error(status: int, headers: dict | None = None) -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "http://test/v1/messages")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    cls = {429: anthropic.RateLimitError, 400: anthropic.BadRequestError}[status]
+    return cls("error", response=response, body=None)
+
+
+class _FlakyMessages:
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(content=[SimpleNamespace(text="{}")])
+
+
+def _use(monkeypatch, messages):
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=messages))
+    monkeypatch.setattr(scheduler, "_scheduler", Scheduler(0, 0, 0))
+    monkeypatch.setattr(settings, "llm_backoff_base_seconds", 0.01)
+
+
+def _call():
+    return asyncio.run(llm.create_message(agent="test", system="s", user_content="u", max_tokens=10))
+
+
+def test_retries_rate_limits_after_retry_after(monkeypatch):
+    fake = _FlakyMessages([_error(429, {"retry-after": "0.05"}), _error(429)])
+    _use(monkeypatch, fake)
+    start = time.perf_counter()
+    _call()
+    assert fake.calls == 3
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_does_not_retry_client_errors(monkeypatch):
+    fake = _FlakyMessages([_error(400)])
+    _use(monkeypatch, fake)
+    with pytest.raises(anthropic.BadRequestError):
+        _call()
+    assert fake.calls == 1
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    fake = _FlakyMessages([_error(429) for _ in range(5)])
+    _use(monkeypatch, fake)
+    monkeypatch.setattr(settings, "llm_max_retries", 2)
+    with pytest.raises(anthropic.RateLimitError):
+        _call()
+    assert fake.calls == 3
+
+
+def test_reservation_counts_the_assistant_prefix(monkeypatch):
+    _use(monkeypatch, _FlakyMessages([]))
+    reserved = []
+    original = scheduler._scheduler.acquire
+
+    async def acquire(tokens, *args):
+        reserved.append(tokens)
+        await original(tokens, *args)
+
+    monkeypatch.setattr(scheduler._scheduler, "acquire", acquire)
+    prefix = '{"themes": [' + "x" * 4_000
+    asyncio.run(
+        llm.create_message(agent="test", system="s", user_content="u", max_tokens=10, assistant_prefix=prefix)
+    )
+    assert reserved == [2 + llm.estimate_tokens(prefix)]
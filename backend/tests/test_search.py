@@ -0,0 +1,131 @@
+"""Tests for the project search index."""
+
+import time
+
+from app.models.session import (
+    MappedTurn,
+    OrganisedTranscript,
+    SectionMapping,
+    Session,
+    SessionStatus,
+    Turn,
+)
+from app.models.theme import SessionThemes, Theme, ThemeEvidence
+from app.services.search import ProjectIndex, build_index, get_index, index_session, tokenise
+
+
+def _session(session_id: str, participant_id: str, texts: list[str], status=SessionStatus.ANONYMISED) -> Session:
+    turns = []
+    for i, text in enumerate(texts):
+        turns.append(Turn(turn_index=2 * i, speaker="Interviewer", text="And then?", is_interviewer=True))
+        turns.append(
+            Turn(turn_index=2 * i + 1, speaker="Participant", text=text, timestamp=f"00:{i * 5:02d}:00")
+        )
+    return Session(
+        session_id=session_id,
+        project_id="proj",
+        participant_id=participant_id,
+        transcript=turns,
+        status=status,
+    )
+
+
+def test_tokenise_drops_stopwords_and_redaction_tokens():
+    assert tokenise("I asked [NAME] about the Export button") == ["asked", "about", "export", "button"]
+
+
+def test_bm25_ranks_denser_match_first():
+    index = ProjectIndex("proj")
+    index.replace_session_turns(
+        _session("s1", "P01", ["The export is slow", "Export export export, always export"])
+    )
+    result = index.search("export")
+    assert result.total == 2
+    assert result.hits[0].turn_index == 3
+    assert all(h.participant_id == "P01" for h in result.hits)
+
+
+def test_skips_interviewer_and_unanonymised_sessions():
+    index = ProjectIndex("proj")
+    index.replace_session_turns(_session("s1", "P01", ["dashboard"], status=SessionStatus.UPLOADED))
+    assert index.search("dashboard").total == 0
+    index.replace_session_turns(_session("s2", "P02", ["dashboard"]))
+    assert index.search("then").total == 0
+    assert index.search("dashboard").total == 1
+
+
+def test_facets_and_filters():
+    s1 = _session("s1", "P01", ["navigation confusing", "settings hidden"])
+    s1.organised = OrganisedTranscript(
+        session_id="s1",
+        participant_id="P01",
+        section_mappings=[
+            SectionMapping(
+                section_id="S01",
+                section_name="Pain Points",
+                mapped_turns=[MappedTurn(turn_index=1, speaker="Participant", text="navigation confusing")],
+            )
+        ],
+    )
+    s2 = _session("s2", "P02", ["navigation fine", "confusing settings"])
+    index = ProjectIndex("proj")
+    index.replace_session_turns(s1)
+    index.replace_session_turns(s2)
+
+    result = index.search("confusing")
+    assert [f.value for f in result.facets.participant] == ["P01", "P02"]
+    assert [(f.value, f.count) for f in result.facets.section] == [("Pain Points", 1)]
+    assert [f.value for f in result.facets.timestamp] == ["0:00-10:00"]
+
+    assert index.search("confusing", participant="P02").total == 1
+    assert index.search("confusing", section="Pain Points").hits[0].session_id == "s1"
+    assert index.search("navigation", ts_from="00:04:00").total == 0
+    assert index.search("settings", ts_from="4:00", ts_to="00:06:00").total == 2
+
+
+def test_incremental_updates_replace_session_docs():
+    s1 = _session("s1", "P01", ["onboarding was slow"])
+    build_index("proj-inc", [s1.model_copy(update={"project_id": "proj-inc"})], [])
+    index = get_index("proj-inc")
+    assert index.search("slow").total == 1
+
+    updated = _session("s1", "P01", ["onboarding was quick"]).model_copy(update={"project_id": "proj-inc"})
+    index_session(updated)
+    assert index.search("slow").total == 0
+    assert index.search("quick").total == 1
+
+    index.replace_session_evidence(
+        SessionThemes(
+            session_id="s1",
+            participant_id="P01",
+            themes=[
+                Theme(
+                    theme_id="T01",
+                    theme_name="Speed",
+                    theme_description="",
+                    evidence=[ThemeEvidence(quote="onboarding was quick", participant_id="P01", turn_index=1)],
+                )
+            ],
+        )
+    )
+    hits = index.search("quick").hits
+    assert {h.source.value for h in hits} == {"transcript", "evidence"}
+    assert index.doc_count == 2
+
+
+def test_query_latency_on_fifty_sessions():
+    words = "dashboard export settings navigation slow confusing report filter search billing".split()
+    index = ProjectIndex("proj")
+    for s in range(50):
+        texts = [
+            " ".join(words[(s + t + k) % len(words)] for k in range(12)) + " really quite"
+            for t in range(60)
+        ]
+        index.replace_session_turns(_session(f"s{s}", f"P{s:02d}", texts))
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        index.search("confusing export settings")
+        timings.append(time.perf_counter() - start)
+    assert sorted(timings)[2] < 0.05
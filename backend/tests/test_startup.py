@@ -0,0 +1,108 @@
+"""Tests for application import cost and the readiness warm-ups."""
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.services import readiness
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# SDKs that must only load on first use, not when the app is imported
+DEFERRED_MODULES = ("anthropic", "supabase", "postgrest", "scipy", "presidio_analyzer", "spacy")
+
+# app.main may take at most this many times as long to import as
+# FastAPI itself (about 2x today; over 5x with the SDKs imported eagerly)
+MAX_STARTUP_RATIO = 3.0
+
+
+def _import_app() -> tuple[dict[str, int], list[str]]:
+    """Import app.main in a fresh interpreter, returning cumulative
+    import times in microseconds and the deferred modules it loaded."""
+    script = (
+        "import sys, app.main\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    env = {**os.environ, "STORE_BACKEND": "supabase"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True, timeout=60,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return cumulative, loaded
+
+
+def test_import_defers_heavy_sdks():
+    _, loaded = _import_app()
+    assert loaded == []
+
+
+def test_import_time_budget():
+    cumulative, _ = _import_app()
+    ratio = cumulative["app.main"] / cumulative["fastapi"]
+    assert ratio <= MAX_STARTUP_RATIO, f"app.main imports in {ratio:.1f}x FastAPI's time"
+
+
+def _reset(monkeypatch):
+    monkeypatch.setattr(readiness, "_started", False)
+    monkeypatch.setattr(readiness, "_status", {})
+
+
+def test_ready_only_after_warmups(monkeypatch):
+    _reset(monkeypatch)
+    calls = []
+    monkeypatch.setitem(readiness.WARMUPS, "analyzer", lambda: calls.append("analyzer"))
+    monkeypatch.setitem(readiness.WARMUPS, "llm", lambda: calls.append("llm"))
+
+    assert readiness.status()["status"] == "starting"
+    asyncio.run(readiness.run_warmups(["analyzer", "llm"]))
+
+    report = readiness.status()
+    assert report["status"] == "ready"
+    assert sorted(calls) == ["analyzer", "llm"]
+    assert report["warmups"]["analyzer"]["state"] == "ready"
+
+
+def test_failed_warmup_reports_failed_and_is_retried(monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.setattr(readiness, "RETRY_BASE_SECONDS", 0.01)
+    outages = [ConnectionError("store unreachable")] * 2
+
+    def store_up():
+        if outages:
+            raise outages.pop()
+
+    monkeypatch.setitem(readiness.WARMUPS, "store", store_up)
+
+    async def run():
+        warmups = asyncio.create_task(readiness.run_warmups(["store"]))
+        await asyncio.sleep(0.005)
+        during = readiness.status()
+        await warmups
+        return during
+
+    during = asyncio.run(run())
+    assert during["status"] == "failed"
+    assert during["warmups"]["store"]["error"] == "ConnectionError: store unreachable"
+
+    report = readiness.status()
+    assert report["status"] == "ready"
+    assert report["warmups"]["store"]["attempts"] == 3
+    assert report["warmups"]["store"]["error"] is None
+
+
+def test_unknown_warmup_fails_without_retrying(monkeypatch):
+    _reset(monkeypatch)
+    asyncio.run(readiness.run_warmups(["gpu"]))
+
+    report = readiness.status()
+    assert report["status"] == "failed"
+    assert report["warmups"]["gpu"]["state"] == "failed"
@@ -0,0 +1,193 @@
+"""Tests for structured-output parsing, repair and continuation."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import guide_reviewer, llm, structured, transcript_organiser
+from app.config import AgentRoute, settings
+from app.main import app
+from app.models.guide import GuideSection, ResearchGuide
+from app.models.session import SessionStatus, Turn
+from app.services import metrics
+
+
+def test_parses_fenced_json_with_preamble_and_trailing_prose():
+    text = 'Here are the themes:\n```json\n{"themes": [1, 2]}\n```\nLet me know if that helps.'
+    assert structured.parse_json(text) == ({"themes": [1, 2]}, "parsed")
+    assert structured.parse_json('Sure! {"a": 1} Hope this helps.') == ({"a": 1}, "parsed")
+
+
+def test_repairs_comments_and_trailing_commas():
+    text = '{\n  "a": [1, 2,], // two items\n  /* note */ "b": "x // not a comment",\n}'
+    assert structured.parse_json(text) == ({"a": [1, 2], "b": "x // not a comment"}, "repaired")
+
+
+def test_salvages_complete_elements_of_truncated_output():
+    text = '{"themes": [{"theme_id": "T01", "tags": ["a", "b"]}, {"theme_id": "T02", "tags": ["c"]}, {"theme_id": "T0'
+    data, how = structured.parse_json(text)
+    assert how == "salvaged"
+    assert data == {"themes": [{"theme_id": "T01", "tags": ["a", "b"]}, {"theme_id": "T02", "tags": ["c"]}]}
+
+
+def test_salvage_ignores_brackets_inside_strings():
+    text = '{"items": ["a ] b", "c, [d", "unterminated'
+    assert structured.parse_json(text) == ({"items": ["a ] b", "c, [d"]}, "salvaged")
+
+
+def test_raises_when_no_json():
+    with pytest.raises(structured.StructuredOutputError):
+        structured.parse_json("I could not find any themes.")
+    with pytest.raises(structured.StructuredOutputError):
+        structured.parse_json('{"a": "never closed')
+
+
+class _TruncatingMessages:
+    """Returns a document in two halves, the first stopped at max_tokens."""
+
+    def __init__(self, document: str):
+        self.parts = [document[: len(document) // 2], document[len(document) // 2 :]]
+        self.calls: list[list[dict]] = []
+
+    async def create(self, messages, **kwargs):
+        self.calls.append(messages)
+        text = self.parts[len(self.calls) - 1]
+        stop = "max_tokens" if len(self.calls) == 1 else "end_turn"
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], stop_reason=stop)
+
+
+def test_continues_after_max_tokens(monkeypatch):
+    document = json.dumps({"themes": [{"theme_id": f"T{i:02d}", "theme_name": "Slow export"} for i in range(6)]})
+    fake = _TruncatingMessages(document)
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=fake))
+
+    data = asyncio.run(
+        structured.create_json(agent="theme_extractor", system="s", user_content="u", max_tokens=100)
+    )
+
+    assert data == json.loads(document)
+    assert len(fake.calls) == 2
+    continued = fake.calls[1]
+    assert [m["role"] for m in continued] == ["user", "assistant"]
+    assert continued[1]["content"] == fake.parts[0].rstrip()
+
+
+class _ModelMessages:
+    """Answers with a fixed text per model."""
+
+    def __init__(self, answers: dict[str, str]):
+        self.answers = answers
+        self.calls: list[dict] = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.answers[kwargs["model"]])])
+
+
+def _route(monkeypatch, answers: dict[str, str], **route) -> _ModelMessages:
+    fake = _ModelMessages(answers)
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=fake))
+    monkeypatch.setattr(settings, "agent_routes", {"transcript_organiser": AgentRoute(**route)})
+    return fake
+
+
+def _organise(assess=None):
+    return asyncio.run(
+        structured.create_json(
+            agent="transcript_organiser", system="s", user_content="u", max_tokens=100, temperature=0.5, assess=assess
+        )
+    )
+
+
+def _confidence(data) -> float:
+    return data["confidence"]
+
+
+def test_route_overrides_model_and_limits(monkeypatch):
+    fake = _route(monkeypatch, {"fast": '{"confidence": 0.9}'}, model="fast", max_tokens=50)
+    assert _organise() == {"confidence": 0.9}
+    assert fake.calls[0]["model"] == "fast"
+    assert fake.calls[0]["max_tokens"] == 50
+    assert fake.calls[0]["temperature"] == 0.5
+    assert metrics.llm_request_seconds.count(agent="transcript_organiser", model="fast") >= 1
+
+
+def test_escalates_low_confidence(monkeypatch):
+    answers = {"fast": '{"confidence": 0.3}', "strong": '{"confidence": 0.95}'}
+    fake = _route(monkeypatch, answers, model="fast", escalate_to="strong", min_confidence=0.6)
+    before = metrics.llm_escalations.value(
+        agent="transcript_organiser", model="fast", escalated_to="strong", reason="low_confidence"
+    )
+
+    assert _organise(_confidence) == {"confidence": 0.95}
+    assert [c["model"] for c in fake.calls] == ["fast", "strong"]
+    assert metrics.llm_escalations.value(
+        agent="transcript_organiser", model="fast", escalated_to="strong", reason="low_confidence"
+    ) == before + 1
+
+
+def test_escalates_unparseable_output_and_keeps_confident_answers(monkeypatch):
+    fake = _route(monkeypatch, {"fast": "Sorry, I cannot.", "strong": '{"confidence": 0.8}'},
+                  model="fast", escalate_to="strong")
+    assert _organise(_confidence) == {"confidence": 0.8}
+    assert len(fake.calls) == 2
+
+    fake = _route(monkeypatch, {"fast": '{"confidence": 0.7}'}, model="fast", escalate_to="strong", min_confidence=0.6)
+    assert _organise(_confidence) == {"confidence": 0.7}
+    assert len(fake.calls) == 1
+
+
+def test_missing_coverage_status_is_not_escalated(monkeypatch):
+    mapping = {"section_id": "S01", "mapped_turns": [{"turn_index": 1, "mapping_confidence": 0.9}]}
+    answer = json.dumps({"section_mappings": [mapping]})
+    fake = _route(
+        monkeypatch, {"fast": answer, "strong": answer}, model="fast", escalate_to="strong", min_confidence=0.6
+    )
+    assert _organise(transcript_organiser._assess)["section_mappings"][0]["section_id"] == "S01"
+    assert [c["model"] for c in fake.calls] == ["fast"]
+
+
+@pytest.mark.parametrize(
+    "assess, data",
+    [
+        (guide_reviewer._assess, {"sections": [{"section_id": "S01"}]}),
+        (guide_reviewer._assess, {"sections": [{"section_id": "S01", "section_name": "Intro", "questions": ["Q1"]}]}),
+        (guide_reviewer._assess, {"sections": [], "flags": [{"flag_type": "nonsense", "message": "m"}]}),
+        (transcript_organiser._assess, {"section_mappings": [{"coverage_status": "covered", "mapped_turns": 3}]}),
+    ],
+)
+def test_malformed_answers_are_unusable(assess, data):
+    with pytest.raises(ValueError):
+        assess(data)
+
+
+def test_unrecoverable_output_is_a_bad_gateway(monkeypatch, memory_backend):
+    class _Messages:
+        async def create(self, **kwargs):
+            text = "Sorry, I can't map these turns."
+            return SimpleNamespace(content=[SimpleNamespace(text=text)], stop_reason="end_turn")
+
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=_Messages()))
+    project = memory_backend.create_project("Unreadable")
+    memory_backend.save_guide(
+        project.project_id,
+        ResearchGuide(
+            project_id=project.project_id,
+            project_name=project.name,
+            sections=[GuideSection(section_id="S01", section_name="Intro")],
+            locked=True,
+        ),
+    )
+    session = memory_backend.create_session(project.project_id)
+    session.transcript = [Turn(turn_index=0, speaker="P", text="We export every Friday.")]
+    session.status = SessionStatus.ANONYMISED
+    memory_backend.update_session(session)
+
+    response = TestClient(app).post(f"/api/projects/{project.project_id}/sessions/{session.session_id}/organise")
+
+    assert response.status_code == 502
+    assert "could not be read as JSON" in response.json()["detail"]
+    memory_backend.delete_project(project.project_id)
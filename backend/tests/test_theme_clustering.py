@@ -0,0 +1,57 @@
+"""Tests for local theme pre-grouping."""
+
+from app.models.theme import SessionThemes, Theme, ThemeEvidence, ThemeStatus
+from app.services.theme_clustering import group_themes
+
+
+def _themes(session_id: str, participant_id: str, *themes: tuple[str, str, str]) -> SessionThemes:
+    return SessionThemes(
+        session_id=session_id,
+        participant_id=participant_id,
+        themes=[
+            Theme(
+                theme_id=f"T{i:02d}",
+                theme_name=name,
+                theme_description=desc,
+                evidence=[ThemeEvidence(quote=quote, participant_id=participant_id, turn_index=i)],
+                instance_count=2,
+                status=ThemeStatus.ACCEPTED,
+            )
+            for i, (name, desc, quote) in enumerate(themes, 1)
+        ],
+    )
+
+
+def test_groups_similar_themes_across_participants():
+    sessions = [
+        _themes(
+            "s1", "P01",
+            ("Navigation confusion", "Struggles to find settings in the menu", "I never know where the settings are"),
+            ("Export frustration", "CSV export is slow and unreliable", "The export takes forever"),
+        ),
+        _themes(
+            "s2", "P02",
+            ("Confusing navigation", "Cannot find settings page", "Where are the settings, the menu is confusing"),
+        ),
+        _themes(
+            "s3", "P03",
+            ("Slow export", "Exporting reports to CSV is painfully slow", "Export is so slow"),
+        ),
+    ]
+    groups = group_themes(sessions)
+    assert len(groups) == 2
+    names = [sorted(m.theme.theme_name for m in g.members) for g in groups]
+    assert ["Confusing navigation", "Navigation confusion"] in names
+    assert ["Export frustration", "Slow export"] in names
+    assert all(g.participant_count == 2 and g.total_instances == 4 for g in groups)
+    assert [g.group_id for g in groups] == ["G01", "G02"]
+
+
+def test_only_accepted_themes_are_grouped():
+    st = _themes("s1", "P01", ("Pricing", "Too expensive", "It costs too much"))
+    st.themes[0].status = ThemeStatus.PROPOSED
+    assert group_themes([st]) == []
+    st.themes[0].status = ThemeStatus.ACCEPTED
+    (group,) = group_themes([st])
+    assert group.participants == ["P01"]
+    assert "pricing" in group.top_terms
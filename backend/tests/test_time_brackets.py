@@ -0,0 +1,86 @@
+"""Tests for local time-bracket pre-assignment."""
+
+import asyncio
+
+from app.agents import llm, transcript_organiser
+from app.models.guide import GuideSection, Question, ResearchGuide
+from app.models.session import CoverageStatus, Turn
+from app.services.time_brackets import parse_time_bracket, pre_assign_turns
+
+GUIDE = ResearchGuide(
+    project_id="p",
+    project_name="Study",
+    sections=[
+        GuideSection(
+            section_id="S01",
+            section_name="Warm-up",
+            time_bracket="0:00-5:00",
+            questions=[Question(question_id="Q01", question_text="Tell me about your role")],
+        ),
+        GuideSection(
+            section_id="S02",
+            section_name="Exporting",
+            time_bracket="5:00–15:00",
+            questions=[Question(question_id="Q02", question_text="How do you export monthly reports?")],
+        ),
+    ],
+)
+
+
+def _turns(*rows: tuple[str, str, str]) -> list[Turn]:
+    return [
+        Turn(turn_index=i, speaker=spk, text=text, timestamp=ts, is_interviewer=spk == "Interviewer")
+        for i, (spk, ts, text) in enumerate(rows)
+    ]
+
+
+def test_parse_time_bracket():
+    assert parse_time_bracket("0:00-10:00") == (0, 600)
+    assert parse_time_bracket("5–15 mins") == (300, 900)
+    assert parse_time_bracket("00:05:00 to 00:15:00") == (300, 900)
+    assert parse_time_bracket("") is None
+    assert parse_time_bracket("10:00-5:00") is None
+
+
+def test_confident_and_ambiguous_turns():
+    turns = _turns(
+        ("Interviewer", "00:00:10", "Tell me about your role."),
+        ("P", "00:01:00", "I run the finance team."),  # well inside S01
+        ("P", "00:04:50", "Mostly spreadsheets."),  # 10s from the S01/S02 boundary
+        ("Interviewer", "00:08:00", "How do you export monthly reports?"),
+        ("P", "00:09:00", "Through the CSV button."),  # well inside S02
+        ("P", "", "It is slow."),  # no timestamp
+        ("P", "00:20:00", "Anything else?"),  # past every bracket
+    )
+    pre = pre_assign_turns(turns, GUIDE)
+    assert [mt.turn_index for mt in pre.assigned["S01"]] == [1]
+    assert [mt.turn_index for mt in pre.assigned["S02"]] == [4]
+    assert [t.turn_index for t in pre.ambiguous] == [2, 5, 6]
+    assert pre.assigned["S02"][0].mapping_confidence >= 0.8
+
+
+def test_off_topic_turn_goes_to_model():
+    turns = _turns(
+        ("Interviewer", "00:02:00", "Going back — how do you export monthly reports?"),
+        ("P", "00:02:30", "With the CSV button."),
+    )
+    pre = pre_assign_turns(turns, GUIDE)
+    assert pre.assigned == {}
+    assert [t.turn_index for t in pre.ambiguous] == [1]
+
+
+def test_organiser_skips_model_when_everything_is_confident(monkeypatch):
+    def _no_client():
+        raise AssertionError("Claude should not be called")
+
+    monkeypatch.setattr(llm, "get_client", _no_client)
+    turns = _turns(
+        ("Interviewer", "00:00:10", "Tell me about your role."),
+        ("P", "00:01:00", "I run the finance team and have done for about six years now, mostly reporting."),
+    )
+    organised = asyncio.run(transcript_organiser.organise_transcript(turns, GUIDE, "s1", "P01"))
+    s01, s02 = organised.section_mappings
+    assert s01.coverage_status == CoverageStatus.COVERED
+    assert [mt.turn_index for mt in s01.mapped_turns] == [1]
+    assert s02.coverage_status == CoverageStatus.NOT_COVERED
+    assert s02.time_bracket == "5:00–15:00"
@@ -0,0 +1,179 @@
+"""Tests for caption and JSON transcript formats."""
+
+import io
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from app.services.transcript_formats import (
+    TranscriptFormat,
+    detect_format,
+    iter_turns,
+    parse_transcript,
+)
+
+VTT = """WEBVTT
+
+1
+00:00:01.000 --> 00:00:03.500
+<v Interviewer>Thanks for joining today.</v>
+
+2
+00:00:03.500 --> 00:00:06.000
+<v Interviewer>Can you tell me about your role?</v>
+
+3
+00:00:06.200 --> 00:00:09.000
+<v Sam Lee>Sure, I run the finance team
+and handle month end.</v>
+
+NOTE this is a comment
+
+4
+00:01:02.000 --> 00:01:05.000
+<v Sam Lee>It takes about a week.</v>
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:03,000
+Interviewer: Let's get started.
+
+2
+00:00:03,000 --> 00:00:05,000
+Participant: Sounds good.
+
+3
+00:00:05,000 --> 00:00:07,000
+I've been here three years.
+"""
+
+
+def test_vtt_merges_same_speaker_cues():
+    turns = parse_transcript(VTT, "call.vtt")
+    assert [t.speaker for t in turns] == ["Interviewer", "Sam Lee"]
+    assert turns[0].text == "Thanks for joining today. Can you tell me about your role?"
+    assert turns[0].is_interviewer is True
+    assert turns[1].text == "Sure, I run the finance team and handle month end. It takes about a week."
+    assert turns[1].timestamp == "00:00:06"
+    assert [t.turn_index for t in turns] == [0, 1]
+
+
+def test_srt_unlabelled_cue_keeps_speaker_and_its_own_timing():
+    turns = parse_transcript(SRT)
+    assert [(t.speaker, t.timestamp, t.text) for t in turns] == [
+        ("Interviewer", "00:00:01", "Let's get started."),
+        ("Participant", "00:00:03", "Sounds good."),
+        ("Participant", "00:00:05", "I've been here three years."),
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["srt", "vtt"])
+def test_unlabelled_captions_stay_one_turn_per_cue(fmt):
+    sep = "," if fmt == "srt" else "."
+    cues = [f"00:00:{i:02d}{sep}000 --> 00:00:{i:02d}{sep}900\nLine {i}.\n" for i in range(5)]
+    if fmt == "srt":
+        text = "\n".join(f"{i + 1}\n{cue}" for i, cue in enumerate(cues))
+    else:
+        text = "WEBVTT\n\n" + "\n".join(cues)
+    turns = parse_transcript(text, f"call.{fmt}")
+    assert [(t.speaker, t.timestamp, t.text) for t in turns] == [
+        ("Speaker", f"00:00:{i:02d}", f"Line {i}.") for i in range(5)
+    ]
+
+
+@pytest.mark.parametrize("layout", ["array", "lines", "object"])
+def test_json_cue_layouts(layout):
+    cues = [
+        {"speaker": "Interviewer", "start": 1.2, "text": "Hello"},
+        {"speaker": "Ana", "start": "65", "text": "Hi there"},
+        {"speaker": "Ana", "start": 3725, "text": "Go on"},
+    ]
+    if layout == "array":
+        text = json.dumps(cues, indent=2)
+    elif layout == "lines":
+        text = "\n".join(json.dumps(c) for c in cues)
+    else:
+        text = json.dumps({"segments": cues})
+    turns = parse_transcript(text, "call.json")
+    assert [(t.speaker, t.timestamp, t.text) for t in turns] == [
+        ("Interviewer", "00:00:01", "Hello"),
+        ("Ana", "00:01:05", "Hi there Go on"),
+    ]
+
+
+def test_malformed_json_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_transcript('[{"speaker": "A", "text": "hi"}, {"speaker": ', "x.json")
+
+
+@pytest.mark.parametrize(
+    "document",
+    ['"hello"', '42', '[{"speaker": "A", "text": "hi", "start": {"s": 1}}]'],
+)
+def test_unexpected_json_raises_value_error(document):
+    with pytest.raises(ValueError):
+        parse_transcript(document, "x.json")
+
+
+def test_detect_format():
+    assert detect_format("WEBVTT\n\n1") == TranscriptFormat.VTT
+    assert detect_format("1\n00:00:01,000 --> 00:00:02,000\nHi") == TranscriptFormat.SRT
+    assert detect_format('[{"text": "hi"}]') == TranscriptFormat.JSON
+    assert detect_format("[00:00:12] Interviewer: Hi") == TranscriptFormat.MARKDOWN
+    assert detect_format("**Interviewer:** Hi") == TranscriptFormat.MARKDOWN
+    assert detect_format("anything", "call.srt") == TranscriptFormat.SRT
+
+
+def _vtt_lines(cues: int):
+    yield "WEBVTT\n"
+    yield "\n"
+    for i in range(cues):
+        speaker = "Interviewer" if i // 3 % 2 == 0 else "Participant"
+        yield f"{i}\n"
+        yield f"00:{i // 60 % 60:02d}:{i % 60:02d}.000 --> 00:{i // 60 % 60:02d}:{i % 60:02d}.900\n"
+        yield f"<v {speaker}>Caption number {i} with a little text.</v>\n"
+        yield "\n"
+
+
+def _peak_while_streaming(cues: int) -> int:
+    tracemalloc.start()
+    count = sum(1 for _ in iter_turns(_vtt_lines(cues), TranscriptFormat.VTT))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert count == cues // 3
+    return peak
+
+
+def test_streaming_memory_is_constant():
+    small = _peak_while_streaming(3_000)
+    large = _peak_while_streaming(30_000)
+    assert large < small * 2
+
+
+def _one_line_array(cues: int) -> str:
+    return json.dumps(
+        [{"speaker": f"Speaker {i % 2}", "start": i, "text": f"Caption number {i} with a little text."}
+         for i in range(cues)]
+    )
+
+
+def _best_time_per_cue(cues: int, repeat: int = 3) -> float:
+    text = _one_line_array(cues)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        assert len(parse_transcript(text, "call.json")) == cues
+        best = min(best, time.perf_counter() - start)
+    return best / cues
+
+
+def test_one_line_json_array_parses_in_linear_time():
+    # 16x the cues: quadratic decoding would cost ~16x more per cue
+    assert _best_time_per_cue(16_000) < _best_time_per_cue(1_000) * 6
+
+
+def test_iter_turns_reads_a_file_object():
+    turns = list(iter_turns(io.StringIO(SRT), TranscriptFormat.SRT))
+    assert len(turns) == 3
@@ -0,0 +1,85 @@
+"""Tests for the organiser's index-only response handling."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.agents import llm, transcript_organiser
+from app.models.guide import GuideSection, ResearchGuide
+from app.models.session import CoverageStatus, Turn
+
+GUIDE = ResearchGuide(
+    project_id="p",
+    project_name="Study",
+    sections=[
+        GuideSection(section_id="S01", section_name="Warm-up"),
+        GuideSection(section_id="S02", section_name="Exporting"),
+    ],
+)
+
+TURNS = [
+    Turn(turn_index=0, speaker="Interviewer", text="Tell me about exports.", is_interviewer=True),
+    Turn(turn_index=1, speaker="Sam", text="I export every Friday.", timestamp="00:06:00"),
+    Turn(turn_index=2, speaker="Interviewer", text="And lunch?", is_interviewer=True),
+    Turn(turn_index=3, speaker="Sam", text="Sandwiches, usually."),
+]
+
+
+def _respond(monkeypatch, data: dict) -> list[str]:
+    prompts = []
+
+    class _Messages:
+        async def create(self, messages, **kwargs):
+            prompts.append(messages[0]["content"])
+            return SimpleNamespace(
+                content=[SimpleNamespace(text=json.dumps(data))],
+                usage=SimpleNamespace(input_tokens=100, output_tokens=20),
+            )
+
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=_Messages()))
+    return prompts
+
+
+def test_rehydrates_turns_from_indices(monkeypatch):
+    prompts = _respond(
+        monkeypatch,
+        {
+            "section_mappings": [
+                {"section_id": "S01", "coverage_status": "not_covered", "mapped_turns": [],
+                 "coverage_notes": "Skipped"},
+                {"section_id": "S02", "coverage_status": "covered",
+                 "mapped_turns": [{"turn_index": 1, "mapping_confidence": 0.9}, {"turn_index": 99}]},
+                {"section_id": "S99", "coverage_status": "covered", "mapped_turns": [{"turn_index": 3}]},
+            ],
+            "off_script_turns": [3, 42],
+        },
+    )
+    organised = asyncio.run(transcript_organiser.organise_transcript(TURNS, GUIDE, "s1", "P01"))
+
+    assert len(prompts) == 1
+    s01, s02 = organised.section_mappings
+    assert s01.coverage_status == CoverageStatus.NOT_COVERED
+    assert s01.coverage_notes == "Skipped"
+    (mapped,) = s02.mapped_turns
+    assert (mapped.turn_index, mapped.speaker, mapped.text, mapped.timestamp) == (
+        1, "Sam", "I export every Friday.", "00:06:00"
+    )
+    assert mapped.mapping_confidence == 0.9
+    assert [t.text for t in organised.off_script_turns] == ["Sandwiches, usually."]
+
+
+def test_missing_or_unknown_coverage_counts_as_not_covered(monkeypatch, caplog):
+    _respond(
+        monkeypatch,
+        {
+            "section_mappings": [
+                {"section_id": "S01", "mapped_turns": []},
+                {"section_id": "S02", "coverage_status": "mostly", "mapped_turns": []},
+            ],
+            "off_script_turns": [],
+        },
+    )
+    organised = asyncio.run(transcript_organiser.organise_transcript(TURNS, GUIDE, "s1", "P01"))
+
+    assert [s.coverage_status for s in organised.section_mappings] == [CoverageStatus.NOT_COVERED] * 2
+    assert "invalid coverage status 'mostly'" in caplog.text
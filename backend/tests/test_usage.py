@@ -0,0 +1,132 @@
+"""Tests for LLM token and cost accounting."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import llm
+from app.config import settings
+from app.db import store
+from app.models.project import Project
+from app.models.usage import BudgetUpdate, LlmUsage
+from app.services import usage
+
+
+@pytest.fixture
+def recorded(monkeypatch) -> list[LlmUsage]:
+    rows: list[LlmUsage] = []
+    monkeypatch.setattr(store, "record_llm_usage", rows.append)
+    monkeypatch.setattr(store, "list_llm_usage", lambda project_id: [r for r in rows if r.project_id == project_id])
+    return rows
+
+
+def _fake_client(monkeypatch, input_tokens=2_000, output_tokens=500, cache_read=0):
+    class _Messages:
+        async def create(self, **kwargs):
+            return SimpleNamespace(
+                usage=SimpleNamespace(
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    cache_creation_input_tokens=None,
+                    cache_read_input_tokens=cache_read,
+                )
+            )
+
+    monkeypatch.setattr(llm, "get_client", lambda: SimpleNamespace(messages=_Messages()))
+
+
+def _call(agent: str):
+    return llm.create_message(agent=agent, system="s", user_content="u", max_tokens=10)
+
+
+def test_cost_uses_longest_matching_price(monkeypatch):
+    monkeypatch.setattr(settings, "llm_prices", {"claude-sonnet-4-5": (6.0, 30.0)})
+    assert usage.cost_usd("claude-sonnet-4-20250514", 1_000_000, 0) == 3.0
+    assert usage.cost_usd("claude-sonnet-4-5-20250929", 1_000_000, 0) == 6.0
+    assert usage.cost_usd("claude-sonnet-4-20250514", 0, 0, cache_read_input_tokens=1_000_000) == pytest.approx(0.3)
+    assert usage.cost_usd("some-other-model", 1_000, 1_000) == 0.0
+
+
+def test_newer_opus_models_are_not_priced_as_opus_4():
+    assert usage.cost_usd("claude-opus-4-1-20250805", 1_000_000, 1_000_000) == 90.0
+    assert usage.cost_usd("claude-opus-4-5-20251101", 1_000_000, 1_000_000) == 30.0
+    assert usage.cost_usd("claude-opus-4-6", 1_000_000, 1_000_000) == 30.0
+
+
+def test_calls_are_attributed_to_the_current_scope(monkeypatch, recorded):
+    _fake_client(monkeypatch, cache_read=1_000)
+
+    async def run():
+        await _call("guide_reviewer")  # outside any scope: not recorded
+        with usage.attribute("p1"):
+            await _call("guide_reviewer")
+        with usage.attribute("p1", "s1"):
+            # Gathered chunks inherit the scope
+            await asyncio.gather(_call("theme_extractor"), _call("theme_extractor"))
+
+    asyncio.run(run())
+
+    assert [(r.project_id, r.session_id, r.stage) for r in recorded] == [
+        ("p1", None, "guide_reviewer"),
+        ("p1", "s1", "theme_extractor"),
+        ("p1", "s1", "theme_extractor"),
+    ]
+    assert recorded[0].cache_creation_input_tokens == 0
+    assert recorded[0].cache_read_input_tokens == 1_000
+    assert recorded[0].cost_usd > 0
+
+
+def test_summary_and_budget(monkeypatch, recorded):
+    _fake_client(monkeypatch, input_tokens=1_000_000, output_tokens=0)
+    project = Project(project_id="p1", name="Study", budget_usd=5.0)
+
+    async def run():
+        with usage.attribute("p1", "s1"):
+            await _call("transcript_organiser")
+        with usage.attribute("p1", "s2"):
+            await _call("theme_extractor")
+
+    asyncio.run(run())
+    summary = usage.project_usage(project)
+
+    assert summary.total.calls == 2
+    assert summary.total.input_tokens == 2_000_000
+    assert summary.by_stage["theme_extractor"].calls == 1
+    assert set(summary.by_session) == {"s1", "s2"}
+    assert summary.by_model[settings.claude_model].cost_usd == pytest.approx(6.0)
+    assert summary.budget_exceeded is True
+    assert summary.budget_remaining_usd == 0.0
+
+    with pytest.raises(usage.BudgetExceededError):
+        usage.check_budget(project)
+    usage.check_budget(project.model_copy(update={"budget_usd": 10.0}))
+
+
+def test_default_budget_and_unlimited(monkeypatch, recorded):
+    monkeypatch.setattr(settings, "project_budget_usd", 0.0)
+    assert usage.budget_for(Project(project_id="p", name="x")) is None
+    monkeypatch.setattr(settings, "project_budget_usd", 25.0)
+    assert usage.budget_for(Project(project_id="p", name="x")) == 25.0
+    assert usage.budget_for(Project(project_id="p", name="x", budget_usd=0)) is None
+
+
+def test_negative_budgets_are_rejected():
+    assert BudgetUpdate(budget_usd=0).budget_usd == 0
+    with pytest.raises(ValueError):
+        BudgetUpdate(budget_usd=-1)
+
+
+def test_accounting_failure_does_not_fail_the_call(monkeypatch):
+    _fake_client(monkeypatch)
+
+    def broken(_):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(store, "record_llm_usage", broken)
+
+    async def run():
+        with usage.attribute("p1"):
+            return await _call("guide_reviewer")
+
+    assert asyncio.run(run()).usage.input_tokens == 2_000
@@ -0,0 +1,105 @@
+"""Seeded synthetic transcripts for parser tests and benchmarks."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+
+LAYOUTS = ("bold", "plain", "timestamped", "standalone")
+
+PARTICIPANTS = ["Sarah", "Tom Walker", "Priya", "Dr. Okafor", "J. Smith", "Mei-Ling"]
+INTERVIEWERS = ["Interviewer", "Moderator", "Researcher"]
+
+QUESTIONS = [
+    "Can you walk me through a typical day?",
+    "What happens when the export fails?",
+    "How do you decide what to report on?",
+    "Tell me more about that.",
+    "Who else is involved at that point?",
+]
+ANSWERS = [
+    "I usually start by opening the dashboard and checking overnight numbers.",
+    "Honestly it takes forever, so I end up doing a lot of it by hand.",
+    "We tried a couple of tools but none of them really stuck.",
+    "It depends on the client, some of them want it weekly.",
+    "Mostly it's fine, but month end is painful.",
+    "Yeah, that's the bit that breaks: the totals never match.",
+]
+
+
+@dataclass
+class SyntheticTranscript:
+    text: str
+    speakers: list[str]  # expected speaker per turn
+
+    @property
+    def turn_count(self) -> int:
+        return len(self.speakers)
+
+    @property
+    def line_count(self) -> int:
+        return self.text.count("\n") + 1
+
+
+def _adversarial_line(rng: random.Random, length: int) -> str:
+    """A continuation line that is expensive for SPEAKER_LINE_PATTERN to
+    reject: it looks like the start of a speaker line but never reaches
+    a colon, or is mostly colons."""
+    kind = rng.randrange(4)
+    words = ("word " * (length // 5 + 1))[:length].strip()
+    if kind == 0:
+        return words
+    if kind == 1:
+        return f"[00:{rng.randrange(60):02d}:{rng.randrange(60):02d}] {words}"
+    if kind == 2:
+        return f"**{words}**"
+    return ":".join(str(rng.randrange(10)) for _ in range(length // 2))
+
+
+def generate_transcript(
+    turns: int,
+    seed: int = 0,
+    layout: str | None = None,
+    multiline_ratio: float = 0.2,
+    adversarial_ratio: float = 0.0,
+    adversarial_length: int = 2_000,
+) -> SyntheticTranscript:
+    """Build a transcript of ``turns`` alternating turns.
+
+    ``layout`` is one of ``LAYOUTS``; None mixes them per turn. A share of
+    participant turns continue over several lines, and with
+    ``adversarial_ratio`` some continuation lines are pathological.
+    """
+    rng = random.Random(seed)
+    interviewer = rng.choice(INTERVIEWERS)
+    participant = rng.choice(PARTICIPANTS)
+    lines = ["# Session transcript", ""]
+    speakers: list[str] = []
+    seconds = 0
+
+    for i in range(turns):
+        speaker = interviewer if i % 2 == 0 else participant
+        text = rng.choice(QUESTIONS if i % 2 == 0 else ANSWERS)
+        # The parser reads at most two-digit hours
+        seconds = (seconds + rng.randint(3, 40)) % (100 * 3600)
+        ts = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        style = layout or rng.choice(LAYOUTS)
+        if style == "bold":
+            lines.append(f"**{speaker}:** {text}")
+        elif style == "plain":
+            lines.append(f"{speaker}: {text}")
+        elif style == "timestamped":
+            lines.append(f"[{ts}] {speaker}: {text}")
+        else:
+            lines.extend([ts, f"{speaker}: {text}"])
+        speakers.append(speaker)
+
+        if i % 2 == 1 and rng.random() < multiline_ratio:
+            for _ in range(rng.randint(1, 3)):
+                lines.append(rng.choice(ANSWERS).replace(":", ","))
+        if rng.random() < adversarial_ratio:
+            lines.append(_adversarial_line(rng, adversarial_length))
+        if rng.random() < 0.3:
+            lines.append("")
+
+    return SyntheticTranscript("\n".join(lines), speakers)
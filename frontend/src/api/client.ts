@@ -33,6 +33,31 @@ export async function deleteProject(projectId: string) {
   return request(`/projects/${projectId}`, { method: "DELETE" });
 }
 
+export async function getDenyList(projectId: string) {
+  return request(`/projects/${projectId}/deny-list`);
+}
+
+export async function updateDenyList(
+  projectId: string,
+  entries: { term: string; replacement_token: string; pii_type?: string }[]
+) {
+  return request(`/projects/${projectId}/deny-list`, {
+    method: "PUT",
+    body: JSON.stringify(entries),
+  });
+}
+
+export async function getUsage(projectId: string) {
+  return request(`/projects/${projectId}/usage`);
+}
+
+export async function updateBudget(projectId: string, budgetUsd: number | null) {
+  return request(`/projects/${projectId}/budget`, {
+    method: "PUT",
+    body: JSON.stringify({ budget_usd: budgetUsd }),
+  });
+}
+
 // --- Guides ---
 
 export async function uploadGuide(
@@ -73,12 +98,34 @@ export async function lockGuide(projectId: string) {
 
 // --- Sessions ---
 
-export async function uploadTranscript(projectId: string, file: File) {
+export async function uploadTranscript(
+  projectId: string,
+  file: File,
+  allowDuplicate = false
+) {
   const formData = new FormData();
   formData.append("file", file);
+  const params = allowDuplicate ? "?allow_duplicate=true" : "";
+
+  const res = await fetch(
+    `${BASE_URL}/projects/${projectId}/sessions/upload${params}`,
+    { method: "POST", body: formData }
+  );
+  if (!res.ok) throw new Error(`API ${res.status}: ${await res.text()}`);
+  return res.json();
+}
+
+export async function bulkUploadTranscripts(
+  projectId: string,
+  files: File[],
+  scanPii = false
+) {
+  const formData = new FormData();
+  for (const file of files) formData.append("files", file);
+  const params = scanPii ? "?scan_pii=true" : "";
 
   const res = await fetch(
-    `${BASE_URL}/projects/${projectId}/sessions/upload`,
+    `${BASE_URL}/projects/${projectId}/sessions/bulk-upload${params}`,
     { method: "POST", body: formData }
   );
   if (!res.ok) throw new Error(`API ${res.status}: ${await res.text()}`);
@@ -134,6 +181,16 @@ export async function extractThemes(projectId: string, sessionId: string) {
   });
 }
 
+// --- Bulk runs ---
+
+export async function startBulkRun(projectId: string) {
+  return request(`/projects/${projectId}/bulk`, { method: "POST" });
+}
+
+export async function listBulkBatches(projectId: string) {
+  return request(`/projects/${projectId}/bulk`);
+}
+
 // --- Themes ---
 
 export async function listAllThemes(projectId: string) {
@@ -161,3 +218,34 @@ export async function updateThemeStatus(
     { method: "PUT" }
   );
 }
+
+export async function verifyEvidence(projectId: string) {
+  return request(`/projects/${projectId}/themes/verify`, { method: "POST" });
+}
+
+// --- Search ---
+
+export async function searchProject(
+  projectId: string,
+  query: string,
+  filters: { participant?: string; section?: string; ts_from?: string; ts_to?: string } = {}
+) {
+  const params = new URLSearchParams({ q: query });
+  for (const [key, value] of Object.entries(filters)) {
+    if (value) params.set(key, value);
+  }
+  return request(`/projects/${projectId}/search?${params.toString()}`);
+}
+
+// --- Insights ---
+
+export async function getInsights(projectId: string) {
+  return request(`/projects/${projectId}/insights`);
+}
+
+export async function synthesiseInsights(projectId: string, full = false) {
+  const params = full ? "?full=true" : "";
+  return request(`/projects/${projectId}/insights/synthesise${params}`, {
+    method: "POST",
+  });
+}
@@ -37,13 +37,13 @@ export default function TranscriptUpload() {
       <div className="upload-zone">
         <input
           type="file"
-          accept=".md,.txt,.markdown"
+          accept=".md,.txt,.markdown,.vtt,.srt,.json,.jsonl"
           multiple
           onChange={handleFiles}
           disabled={uploading}
         />
         <p className="muted">
-          Upload one or more markdown transcripts from Askable.
+          Upload one or more transcripts: Askable markdown, or Zoom/Teams captions (VTT, SRT, JSON).
           Each file becomes a separate session.
         </p>
       </div>
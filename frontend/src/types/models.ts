@@ -1,4 +1,10 @@
 // --- Project ---
+export interface DenyListEntry {
+  term: string;
+  replacement_token: string;
+  pii_type: string;
+}
+
 export interface Project {
   project_id: string;
   name: string;
@@ -6,6 +12,29 @@ export interface Project {
   status: string;
   session_count: number;
   participant_count: number;
+  deny_list?: DenyListEntry[];
+  budget_usd?: number | null;
+}
+
+export interface UsageTotals {
+  calls: number;
+  input_tokens: number;
+  output_tokens: number;
+  cache_creation_input_tokens: number;
+  cache_read_input_tokens: number;
+  latency_ms: number;
+  cost_usd: number;
+}
+
+export interface ProjectUsage {
+  project_id: string;
+  total: UsageTotals;
+  by_stage: Record<string, UsageTotals>;
+  by_model: Record<string, UsageTotals>;
+  by_session: Record<string, UsageTotals>;
+  budget_usd: number | null;
+  budget_remaining_usd: number | null;
+  budget_exceeded: boolean;
 }
 
 // --- Guide ---
@@ -111,6 +140,43 @@ export interface Session {
   organised: OrganisedTranscript | null;
   upload_timestamp: string;
   status: string;
+  content_hash?: string | null;
+}
+
+export interface BulkUploadItem {
+  filename: string;
+  status: "created" | "duplicate" | "failed";
+  session_id: string | null;
+  participant_id: string | null;
+  turn_count: number;
+  error: string | null;
+}
+
+export interface BulkUploadReport {
+  items: BulkUploadItem[];
+  created: number;
+  duplicates: number;
+  failed: number;
+  pii_scan_started: boolean;
+}
+
+// --- Bulk runs ---
+export interface BatchJob {
+  batch_id: string;
+  project_id: string;
+  stage: "organise" | "extract_themes";
+  status: "submitted" | "completed" | "failed";
+  session_ids: string[];
+  request_count: number;
+  request_digests: Record<string, string>;
+  claimed_by: string | null;
+  lease_until: string | null;
+  sessions_saved: number;
+  failed_session_ids: string[];
+  fallback_requests: number;
+  error: string | null;
+  created_at: string;
+  ended_at: string | null;
 }
 
 // --- Themes ---
@@ -121,6 +187,7 @@ export interface ThemeEvidence {
   turn_index: number;
   guide_section: string;
   guide_question_id: string | null;
+  unresolved?: boolean;
 }
 
 export interface Theme {
@@ -138,3 +205,33 @@ export interface SessionThemes {
   participant_id: string;
   themes: Theme[];
 }
+
+// --- Search ---
+export interface SearchHit {
+  source: "transcript" | "evidence";
+  session_id: string;
+  participant_id: string;
+  turn_index: number;
+  timestamp: string;
+  section: string;
+  text: string;
+  score: number;
+  theme_id: string | null;
+  theme_name: string | null;
+}
+
+export interface FacetCount {
+  value: string;
+  count: number;
+}
+
+export interface SearchResponse {
+  query: string;
+  total: number;
+  hits: SearchHit[];
+  facets: {
+    participant: FacetCount[];
+    section: FacetCount[];
+    timestamp: FacetCount[];
+  };
+}